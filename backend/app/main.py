@@ -9,9 +9,20 @@ os.environ["TF_USE_LEGACY_KERAS"] = "1"
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.api import api_router
-from app.services import ai_engine
-from typing import List
+from app.services import ai_engine, inference_batcher
+from app.services.workers import worker_pools
+from app.services.feature_store import feature_store
+from app.services.history import history_store
+from app.services.alert_fanout import ConnectionManager
+from app.services.alert_bus import alert_bus
+from app.services.summary import summary_service
+from app.services.geoip import geoip
+from app.services.mailer import email_dispatcher
+from app.services.reports import report_service
+from app.services.fraud_graph import fraud_graph
+from app.services.metrics import metrics
 
 app = FastAPI(title="AI Financial Security System")
 
@@ -27,21 +38,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
-
 manager = ConnectionManager()
 
 @app.websocket("/ws/alerts")
@@ -51,6 +47,8 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 app.state.manager = manager
@@ -58,10 +56,37 @@ app.state.manager = manager
 @app.on_event("startup")
 async def startup_event():
     print("🚀 Starting AI Engine...")
-    ai_engine.load_models()
+    ai_engine.start()
+    history_store.open()
+    await worker_pools.run_io(geoip.load)
+    # Alerts raised on any worker reach the dashboards connected to this one
+    alert_bus.subscribe(manager.publish)
+    await alert_bus.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await alert_bus.close()
+    email_dispatcher.stop()
+    history_store.close()
+    report_service.shutdown()
+    worker_pools.shutdown()
 
 app.include_router(api_router)
 
 @app.get("/")
 def home():
-    return {"status": "System Active", "version": "2.0.0"}
\ No newline at end of file
+    return {"status": "System Active", "version": "2.0.0"}
+
+@app.get("/ready")
+def readiness():
+    status = ai_engine.readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/engine/stats")
+def engine_stats():
+    return {"batching": inference_batcher.stats(), "workers": worker_pools.stats(), "feature_store": feature_store.stats(), "history": history_store.stats(), "alerts": manager.stats(), "alert_bus": alert_bus.stats(), "summaries": summary_service.stats(), "geoip": geoip.stats(), "email": email_dispatcher.stats(), "reports": report_service.stats(), "fraud_graph": fraud_graph.stats(), "latency": metrics.stats()}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    # Per process: with several uvicorn workers each one is scraped (or aggregated) separately
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -1,10 +1,27 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import AfterValidator, BaseModel, Field, IPvAnyAddress
+from typing import Annotated, List, Optional, Union
+from datetime import datetime
+
+# Inputs the scaler / isolation forest / autoencoder were fitted on
+FEATURE_COUNT = 4
 
 class LoginEvent(BaseModel):
     user_id: str
-    features: List[float] 
-    sequence_data: List[List[float]]
+    # Precomputed [velocity_kmh, time_diff_hours, device_trust_score, hour_of_day].
+    # When omitted, the server derives them from the raw fields below (feature store).
+    # Checked here so a malformed event is rejected on its own instead of failing its micro-batch.
+    features: Optional[List[float]] = Field(None, min_length=FEATURE_COUNT, max_length=FEATURE_COUNT)
+    # When omitted, the user's recent actions are used. One action token per step: [[1], [2], [8]]
+    sequence_data: Optional[List[Annotated[List[float], Field(min_length=1, max_length=1)]]] = None
+    # Raw login fields
+    timestamp: Optional[datetime] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    device: Optional[str] = None
+    # Client address when scoring on someone else's behalf (defaults to the caller's).
+    # Rejected with a 422 unless it is an IPv4/IPv6 address; passed on as its canonical string.
+    ip: Optional[Annotated[IPvAnyAddress, AfterValidator(str)]] = None
+    actions: Optional[List[Union[int, str]]] = None
     # ✨ NEW FIELD: Optional email for the demo
     target_email: Optional[str] = None 
 
@@ -12,4 +29,4 @@ class AnalysisResponse(BaseModel):
     user_id: str
     verdict: str
     risk_score: float
-    breakdown: dict
\ No newline at end of file
+    breakdown: dict
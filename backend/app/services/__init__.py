@@ -1 +1 @@
-from .ai_engine import ai_engine
\ No newline at end of file
+from .ai_engine import ai_engine, inference_batcher
\ No newline at end of file
@@ -1,13 +1,37 @@
 import os
+import time
+import asyncio
+import threading
 import joblib
 import numpy as np
-import pandas as pd
-import tensorflow as tf
 import warnings
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from .iforest_scorer import FlatIsolationForest
+from .numpy_models import NumpySequential
+from .workers import worker_pools
+from .risk_index import open_index
+from .fraud_graph import fraud_graph
+from .meta_fusion import FlatBoostedTrees
+from .risk_engine import RISK_FUSION
+from .metrics import metrics
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 
+# "keras" runs the .h5 models through TensorFlow, "numpy" evaluates the same weights
+# with app.services.numpy_models and never imports TensorFlow.
+AI_INFERENCE_BACKEND = os.getenv("AI_INFERENCE_BACKEND", "keras").lower()
+# "flat" scores the pickled IsolationForest with app.services.iforest_scorer, "sklearn" calls it directly
+AI_IFOREST_BACKEND = os.getenv("AI_IFOREST_BACKEND", "flat").lower()
+
+# "eager" loads every artifact (concurrently) before the server accepts traffic,
+# "background" starts serving immediately while loading in a thread (see /ready),
+# "lazy" defers loading until the first prediction.
+AI_STARTUP_MODE = os.getenv("AI_STARTUP_MODE", "eager").lower()
+# graph: live user-device-IP fraud graph | static: network_risk_scores.csv | max: the higher of both
+NETWORK_RISK_SOURCE = os.getenv("NETWORK_RISK_SOURCE", "max").lower()
+
 class AIEngine:
     def __init__(self):
         self.scaler = None
@@ -15,46 +39,120 @@ class AIEngine:
         self.model_autoencoder = None
         self.model_lstm = None
         self.network_scores = {}
+        self.meta_model = None
         self.ARTIFACTS_DIR = os.path.join(os.getcwd(), "ml_artifacts")
+        self.load_status = {}
+        self._load_lock = threading.Lock()
+        self._keras_lock = threading.Lock()
+        self._pickle_lock = threading.Lock()
+        self._load_attempted = False
 
-    def load_models(self):
-        print(f"⏳ Loading AI Models from {self.ARTIFACTS_DIR}...")
+    def start(self, mode: str = AI_STARTUP_MODE):
+        if mode == "background":
+            threading.Thread(target=self.load_models, name="ai-model-loader", daemon=True).start()
+        elif mode != "lazy":
+            self.load_models()
+
+    def _artifact_loaders(self):
+        # attribute -> loader; each one runs in its own thread
+        return {
+            "scaler": lambda: self._load_pickle("scaler.pkl"),
+            "model_iforest": self._load_iforest,
+            "model_autoencoder": lambda: self._load_keras_model("model_autoencoder.h5"),
+            "model_lstm": lambda: self._load_keras_model("model_lstm.h5"),
+            "network_scores": self._load_network_scores,
+            **({"meta_model": self._load_meta_model} if RISK_FUSION == "learned" else {}),
+        }
+
+    def _load_one(self, name, loader):
+        started = time.perf_counter()
         try:
-            self.scaler = joblib.load(os.path.join(self.ARTIFACTS_DIR, "scaler.pkl"))
-            self.model_iforest = joblib.load(os.path.join(self.ARTIFACTS_DIR, "model_isolation_forest.pkl"))
-            
-            # compile=False prevents version errors
-            self.model_autoencoder = tf.keras.models.load_model(
-                os.path.join(self.ARTIFACTS_DIR, "model_autoencoder.h5"), compile=False
-            )
-            self.model_lstm = tf.keras.models.load_model(
-                os.path.join(self.ARTIFACTS_DIR, "model_lstm.h5"), compile=False
-            )
-            
-            csv_path = os.path.join(self.ARTIFACTS_DIR, "network_risk_scores.csv")
-            if os.path.exists(csv_path):
-                df = pd.read_csv(csv_path)
-                self.network_scores = dict(zip(df['user_id'].astype(str), df['network_risk_score']))
-            
-            print("✅ AI Engine Online: All models loaded.")
+            setattr(self, name, loader())
+            self.load_status[name] = {"loaded": True, "seconds": round(time.perf_counter() - started, 4), "error": None}
         except Exception as e:
-            print(f"❌ Critical Error Loading Models: {e}")
+            self.load_status[name] = {"loaded": False, "seconds": round(time.perf_counter() - started, 4), "error": str(e)}
+            print(f"❌ Critical Error Loading {name}: {e}")
 
-    def predict(self, user_id: str, features: list, sequence_data: list):
-        # --- Preprocessing ---
-        features_arr = np.array(features).reshape(1, -1)
-        scaled_features = self.scaler.transform(features_arr)
-        
-        # --- Model A1: Isolation Forest ---
-        iso_pred = self.model_iforest.predict(scaled_features)
-        score_iso = 1.0 if iso_pred[0] == -1 else 0.0
-        
-        # --- Model A2: Autoencoder ---
-        reconstructed = self.model_autoencoder.predict(scaled_features, verbose=0)
-        mse = np.mean(np.power(scaled_features - reconstructed, 2), axis=1)
-        score_ae = min(float(mse[0]) * 10, 1.0) 
-        
-        # --- Model B: LSTM (Robust Fix) ---
+    def load_models(self):
+        with self._load_lock:
+            if self._load_attempted:
+                return
+            self._load_attempted = True
+            print(f"⏳ Loading AI Models from {self.ARTIFACTS_DIR}...")
+            started = time.perf_counter()
+            loaders = self._artifact_loaders()
+            with ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix="ai-load") as pool:
+                list(pool.map(lambda item: self._load_one(*item), loaders.items()))
+            if self.is_ready():
+                print(f"✅ AI Engine Online: All models loaded in {time.perf_counter() - started:.2f}s.")
+
+    def ensure_loaded(self):
+        if not self._load_attempted:
+            self.load_models()
+        elif not self.is_ready():
+            # Background load still running: wait for it instead of failing
+            with self._load_lock:
+                pass
+
+    def is_ready(self):
+        loaders = self._artifact_loaders()
+        return all(self.load_status.get(name, {}).get("loaded") for name in loaders)
+
+    def readiness(self):
+        return {
+            "ready": self.is_ready(),
+            "startup_mode": AI_STARTUP_MODE,
+            "inference_backend": AI_INFERENCE_BACKEND,
+            "iforest_backend": AI_IFOREST_BACKEND,
+            "network_risk_source": NETWORK_RISK_SOURCE,
+            "risk_fusion": RISK_FUSION,
+            "models": {name: self.load_status.get(name, {"loaded": False, "seconds": None, "error": None}) for name in self._artifact_loaders()}
+        }
+
+    def _load_network_scores(self):
+        # Memory-mapped index compiled from network_risk_scores.csv (rebuilt when the CSV changes)
+        return open_index(self.ARTIFACTS_DIR) or {}
+
+    def _static_network_risk(self, user_ids):
+        if isinstance(self.network_scores, dict):
+            return [self.network_scores.get(user_id, 0.0) for user_id in user_ids]
+        return self.network_scores.lookup_many(user_ids).tolist()
+
+    def _network_risk(self, user_ids):
+        if NETWORK_RISK_SOURCE == "static":
+            # Known / confirmed fraudsters stay blocked without the graph
+            return [1.0 if user_id in fraud_graph.flagged else score for user_id, score in zip(user_ids, self._static_network_risk(user_ids))]
+        graph = fraud_graph.risk_many(user_ids)
+        if NETWORK_RISK_SOURCE == "max":
+            return [max(a, b) for a, b in zip(graph, self._static_network_risk(user_ids))]
+        return graph
+
+    def _load_meta_model(self):
+        # XGBoost JSON dump flattened into NumPy arrays; xgboost itself is never imported
+        return FlatBoostedTrees.from_json(os.path.join(self.ARTIFACTS_DIR, "model_risk_engine.json"))
+
+    def _load_pickle(self, filename):
+        # Unpickling triggers the first sklearn import, which is not safe to run from two threads at once
+        with self._pickle_lock:
+            return joblib.load(os.path.join(self.ARTIFACTS_DIR, filename))
+
+    def _load_iforest(self):
+        model = self._load_pickle("model_isolation_forest.pkl")
+        if AI_IFOREST_BACKEND == "flat":
+            return FlatIsolationForest.from_sklearn(model)
+        return model
+
+    def _load_keras_model(self, filename):
+        path = os.path.join(self.ARTIFACTS_DIR, filename)
+        if AI_INFERENCE_BACKEND == "numpy":
+            return NumpySequential.from_h5(path)
+        # TensorFlow is imported on first use; Keras model loading is not thread-safe
+        with self._keras_lock:
+            import tensorflow as tf
+            # compile=False prevents version errors
+            return tf.keras.models.load_model(path, compile=False)
+
+    def _prepare_sequence(self, sequence_data: list):
         seq_arr = np.array(sequence_data)
 
         # 1. Flatten [[1], [2]] -> [1, 2]
@@ -69,23 +167,205 @@ class AIEngine:
         # 3. Truncate if longer than 10
         seq_arr = seq_arr[:10]
 
-        # 4. Safety: Cap values > 8 to 0 (Fixes Index Out of Bounds)
-        seq_arr = np.where(seq_arr >= 9, 0, seq_arr)
+        # 4. Safety: Map ids outside the 0-8 vocabulary to 0 (Fixes Index Out of Bounds;
+        #    a negative id would otherwise wrap around in the NumPy embedding lookup)
+        return np.where((seq_arr < 0) | (seq_arr >= 9), 0, seq_arr)
+
+    def _prepare_sequences(self, sequences_list):
+        if isinstance(sequences_list, np.ndarray) and sequences_list.ndim == 2:
+            # Already tokenized (N, L): pad/truncate to 10 and mask unknown ids in one step
+            seq_arr = np.zeros((len(sequences_list), 10))
+            width = min(10, sequences_list.shape[1])
+            seq_arr[:, :width] = sequences_list[:, :width]
+            return np.where((seq_arr < 0) | (seq_arr >= 9), 0, seq_arr)
+        return np.stack([self._prepare_sequence(seq) for seq in sequences_list])
+
+    def predict_batch(self, user_ids: list, features_list: list, sequences_list: list):
+        """Scores N login events with a single call into each model."""
+        self.ensure_loaded()
+        # --- Preprocessing ---
+        with metrics.stage("model_scaling"):
+            features_arr = np.array(features_list, dtype=float).reshape(len(features_list), -1)
+            scaled_features = self.scaler.transform(features_arr)
         
-        # 5. Reshape (1, 10)
-        lstm_input = seq_arr.reshape(1, 10)
+        # --- Model A1: Isolation Forest ---
+        with metrics.stage("model_iforest"):
+            iso_pred = self.model_iforest.predict(scaled_features)
+            scores_iso = np.where(iso_pred == -1, 1.0, 0.0)
         
-        lstm_pred = self.model_lstm.predict(lstm_input, verbose=0)
-        score_lstm = float(lstm_pred[0][0])
+        # --- Model A2: Autoencoder ---
+        with metrics.stage("model_autoencoder"):
+            reconstructed = self.model_autoencoder.predict(scaled_features, verbose=0)
+            mse = np.mean(np.power(scaled_features - reconstructed, 2), axis=1)
+            scores_ae = np.minimum(mse * 10, 1.0)
         
-        # --- Model C: Network Lookup ---
-        score_network = self.network_scores.get(str(user_id), 0.0)
+        # --- Model B: LSTM (stacked to (N, 10)) ---
+        with metrics.stage("model_lstm"):
+            lstm_input = self._prepare_sequences(sequences_list)
+            lstm_pred = self.model_lstm.predict(lstm_input, verbose=0)
         
+        # --- Model C: Network Risk ---
+        with metrics.stage("model_network"):
+            scores_network = self._network_risk([str(user_id) for user_id in user_ids])
+        results = [
+            {
+                "iso": float(scores_iso[i]),
+                "ae": float(scores_ae[i]),
+                "lstm": float(lstm_pred[i][0]),
+                "network": scores_network[i]
+            }
+            for i in range(len(user_ids))
+        ]
+
+        # --- Learned fusion (trained on the raw autoencoder MSE, not the capped score) ---
+        if self.meta_model is not None:
+            with metrics.stage("model_meta"):
+                meta = self.meta_model.predict_proba(np.column_stack([scores_iso, mse, lstm_pred[:, 0], scores_network]))
+            for result, score in zip(results, meta.tolist()):
+                result["meta"] = score
+        return results
+
+    def predict_batch_isolated(self, user_ids: list, features_list: list, sequences_list: list):
+        """predict_batch, falling back to scoring events one by one when the stacked call
+        fails, so one malformed event only fails itself. Failed events get their exception
+        in place of the score dict."""
+        try:
+            return self.predict_batch(user_ids, features_list, sequences_list)
+        except Exception as e:
+            if len(user_ids) == 1:
+                return [e]
+        results = []
+        for user_id, features, sequence_data in zip(user_ids, features_list, sequences_list):
+            try:
+                results.append(self.predict_batch([user_id], [features], [sequence_data])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def predict(self, user_id: str, features: list, sequence_data: list):
+        return self.predict_batch([user_id], [features], [sequence_data])[0]
+
+
+# --- MICRO-BATCHING SCHEDULER ---
+# Concurrent requests are parked for up to AI_BATCH_MAX_WAIT_MS (or until
+# AI_BATCH_MAX_SIZE events are waiting) and scored together, so the fixed
+# per-call cost of Keras .predict() is paid once per batch instead of per login.
+AI_BATCH_MAX_SIZE = int(os.getenv("AI_BATCH_MAX_SIZE", "32"))
+AI_BATCH_MAX_WAIT_MS = float(os.getenv("AI_BATCH_MAX_WAIT_MS", "3"))
+
+class MicroBatcher:
+    def __init__(self, engine: AIEngine, max_batch_size: int = AI_BATCH_MAX_SIZE, max_wait_ms: float = AI_BATCH_MAX_WAIT_MS, pools=worker_pools):
+        self.engine = engine
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.pools = pools
+        self._queue = None
+        self._worker = None
+        self._slots = None
+        self._inflight = set()
+        self.batch_size_counts = Counter()
+
+    async def submit(self, user_id: str, features: list, sequence_data: list):
+        """Queues one event and waits for its score dict from the next batch."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            # One batch per CPU worker; while they are busy new events keep
+            # accumulating, so batches grow with load instead of queueing up.
+            self._slots = asyncio.Semaphore(self.pools.cpu_workers)
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        # The batch runs in the worker task, outside this request's context, so its
+        # timings dict travels with the event
+        await self._queue.put((user_id, features, sequence_data, future, metrics.request_timings()))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            # Requests whose client already went away are skipped
+            batch = [item for item in batch if not item[3].done()]
+            if not batch:
+                return
+            self.batch_size_counts[len(batch)] += 1
+            user_ids, features_list, sequences_list, futures, timings_list = zip(*batch)
+            # Every request in the batch is charged the batch's model_* stage times
+            batch_timings = metrics.begin_batch(timings_list)
+            try:
+                results = await self.pools.run_cpu(
+                    self.engine.predict_batch_isolated, list(user_ids), list(features_list), list(sequences_list)
+                )
+            except Exception as e:
+                for future in futures:
+                    if not future.done(): future.set_exception(e)
+                return
+            finally:
+                metrics.end_batch(batch_timings, timings_list)
+            for future, result in zip(futures, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception): future.set_exception(result)
+                else: future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        batches = sum(self.batch_size_counts.values())
+        events = sum(size * count for size, count in self.batch_size_counts.items())
         return {
-            "iso": score_iso,
-            "ae": score_ae,
-            "lstm": score_lstm,
-            "network": score_network
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": batches,
+            "events": events,
+            "avg_batch_size": round(events / batches, 2) if batches else 0.0,
+            "largest_batch": max(self.batch_size_counts, default=0),
+            "batch_size_histogram": dict(sorted(self.batch_size_counts.items()))
         }
 
-ai_engine = AIEngine()
\ No newline at end of file
+ai_engine = AIEngine()
+inference_batcher = MicroBatcher(ai_engine)
+
+# --- SERVER-TIMING CHECK ---
+# Usage (from backend/): AI_INFERENCE_BACKEND=numpy python -m app.services.ai_engine
+if __name__ == "__main__":
+    ai_engine.load_models()
+
+    async def request(user_id, collect):
+        timings = metrics.begin_request() if collect else None
+        with metrics.stage("inference"):
+            await inference_batcher.submit(user_id, [1.0, 1.0, 1.0, 12], [[1], [2], [8]])
+        return timings
+
+    async def main():
+        # Concurrent requests share one micro-batch; each traced one gets the model stages
+        return await asyncio.gather(*(request(f"user_{i}", collect=i % 2 == 0) for i in range(8)))
+
+    results = asyncio.run(main())
+    traced = [metrics.server_timing(t) for t in results if t is not None]
+    ok = metrics.enabled and all(all(f"model_{m};" in header for m in ("scaling", "iforest", "autoencoder", "lstm")) for header in traced)
+    print(f"{'✅' if ok else '❌'} Server-Timing of a batched request: {traced[0]}")
+    print(f"   batches: {inference_batcher.stats()['batch_size_histogram']}")
+    worker_pools.shutdown()
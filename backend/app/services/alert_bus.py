@@ -0,0 +1,201 @@
+import os
+import json
+import socket
+import asyncio
+import tempfile
+
+# --- CONFIGURATION ---
+# unix: alerts are relayed between uvicorn workers over a local Unix socket
+# local: in-process only (single worker, tests)
+ALERT_BUS = os.getenv("ALERT_BUS", "unix")
+ALERT_BUS_SOCKET = os.getenv("ALERT_BUS_SOCKET", os.path.join(tempfile.gettempdir(), "securewatch-alerts.sock"))
+# Peers whose unsent backlog exceeds this are disconnected (they reconnect on their own)
+ALERT_BUS_MAX_BACKLOG_BYTES = int(os.getenv("ALERT_BUS_MAX_BACKLOG_BYTES", str(4 * 1024 * 1024)))
+ALERT_BUS_RECONNECT_SECONDS = 1.0
+
+class InProcessAlertBus:
+    """Pub/sub for dashboard alerts. Subscribers are callables receiving the JSON text."""
+
+    def __init__(self):
+        self.subscribers = []
+        self.published = 0
+        self.received = 0
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    async def publish(self, message: dict):
+        try:
+            text = json.dumps(message, default=str)
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Alert not published: {e}")
+            return
+        self.published += 1
+        self._deliver(text)
+        await self._forward(text)
+
+    async def _forward(self, text):
+        pass
+
+    def _deliver(self, text):
+        for callback in self.subscribers:
+            try:
+                callback(text)
+            except Exception as e:
+                print(f"⚠️ Alert subscriber failed: {e}")
+
+    def stats(self):
+        return {"backend": "local", "subscribers": len(self.subscribers), "published": self.published, "received": self.received}
+
+class UnixSocketAlertBus(InProcessAlertBus):
+    """The first worker to bind ALERT_BUS_SOCKET becomes the broker; the others connect
+    to it. Alerts are newline-delimited JSON. The broker relays every line it receives to
+    all other peers and delivers it locally; a worker that loses the broker reconnects,
+    taking over the socket if the broker is gone."""
+
+    def __init__(self, path: str = ALERT_BUS_SOCKET):
+        super().__init__()
+        self.path = path
+        self.role = None
+        self.server = None
+        self.peers = set()
+        self.upstream = None
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            try:
+                await self._connect_or_serve()
+            except OSError as e:
+                # The supervisor keeps retrying; until then alerts stay local
+                print(f"⚠️ Alert bus unavailable ({e}), retrying in the background")
+            self._task = asyncio.create_task(self._supervise())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self.peers): writer.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        if self.upstream is not None:
+            self.upstream[1].close()
+
+    def _claim_socket(self):
+        """Returns a listening socket if no broker is alive, else None. Serialized across
+        workers with a lock file so two workers never both replace a stale socket."""
+        import fcntl
+        with open(self.path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                return None
+            except (FileNotFoundError, ConnectionRefusedError):
+                pass
+            finally:
+                probe.close()
+            # No live broker: clear a stale socket file and become the broker
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(self.path)
+            sock.listen(128)
+            return sock
+
+    async def _connect_or_serve(self):
+        sock = self._claim_socket()
+        if sock is None:
+            self.upstream = await asyncio.open_unix_connection(self.path)
+            self.role = "client"
+        else:
+            self.server = await asyncio.start_unix_server(self._serve_peer, sock=sock)
+            self.role = "broker"
+            print(f"📡 Alert bus broker listening on {self.path}")
+
+    async def _supervise(self):
+        while True:
+            if self.role == "broker":
+                await asyncio.Event().wait()
+            try:
+                if self.upstream is None: raise ConnectionError("not connected")
+                reader, _ = self.upstream
+                async for line in reader:
+                    self.received += 1
+                    self._deliver(line.decode().rstrip("\n"))
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except (asyncio.LimitOverrunError, ValueError) as e:
+                # Over-long line or undecodable frame: the stream position is unknown, so resync
+                print(f"⚠️ Alert bus frame rejected ({e}), resyncing...")
+            print("📡 Alert bus broker lost, reconnecting...")
+            if self.upstream is not None:
+                self.upstream[1].close()
+            self.upstream = None
+            self.role = None
+            while self.role is None:
+                await asyncio.sleep(ALERT_BUS_RECONNECT_SECONDS)
+                try:
+                    await self._connect_or_serve()
+                except OSError:
+                    pass
+
+    async def _serve_peer(self, reader, writer):
+        self.peers.add(writer)
+        try:
+            async for line in reader:
+                self.received += 1
+                self._relay(line, exclude=writer)
+                self._deliver(line.decode().rstrip("\n"))
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            # A peer sending an over-long or undecodable frame is dropped; it reconnects and resyncs
+            pass
+        finally:
+            self.peers.discard(writer)
+            writer.close()
+
+    def _relay(self, line: bytes, exclude=None):
+        for writer in list(self.peers):
+            if writer is exclude: continue
+            if writer.transport.get_write_buffer_size() > ALERT_BUS_MAX_BACKLOG_BYTES:
+                self.peers.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+
+    async def _forward(self, text):
+        line = (text + "\n").encode()
+        if self.role == "broker":
+            self._relay(line)
+        elif self.upstream is not None:
+            try:
+                self.upstream[1].write(line)
+            except (ConnectionError, RuntimeError) as e:
+                print(f"⚠️ Alert bus publish failed, delivered locally only: {e}")
+
+    def stats(self):
+        return {
+            **super().stats(), "backend": "unix", "role": self.role, "socket": self.path,
+            "peers": len(self.peers) if self.role == "broker" else None
+        }
+
+def create_alert_bus(kind: str = ALERT_BUS):
+    if kind == "unix" and hasattr(socket, "AF_UNIX") and hasattr(asyncio, "start_unix_server"):
+        return UnixSocketAlertBus()
+    if kind not in ("unix", "local"):
+        print(f"⚠️ Unknown ALERT_BUS '{kind}', using in-process bus")
+    return InProcessAlertBus()
+
+alert_bus = create_alert_bus()
@@ -0,0 +1,129 @@
+import os
+import json
+import asyncio
+from collections import deque
+
+# --- CONFIGURATION ---
+# Messages buffered per dashboard connection before the slow-consumer policy applies
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "64"))
+# drop_oldest | drop_newest | coalesce (keep only the latest) | disconnect
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+# A send stuck longer than this marks the connection dead
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+
+class _Subscriber:
+    __slots__ = ("websocket", "queue", "wakeup", "writer", "dropped")
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        # Unbounded on purpose: ConnectionManager enforces queue_size per slow-consumer policy
+        self.queue = deque()
+        self.wakeup = asyncio.Event()
+        self.writer = None
+        self.dropped = 0
+
+class ConnectionManager:
+    """Fans alerts out to /ws/alerts clients. Each connection has its own bounded
+    queue drained by its own writer task, so broadcast() never waits on a client
+    and never raises into the request that raised the alert."""
+
+    def __init__(self, queue_size: int = WS_QUEUE_SIZE, policy: str = WS_SLOW_CONSUMER_POLICY, send_timeout: float = WS_SEND_TIMEOUT_SECONDS):
+        if policy not in ("drop_oldest", "drop_newest", "coalesce", "disconnect"):
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.queue_size = max(1, queue_size)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.subscribers = {}
+        self.broadcasts = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    @property
+    def active_connections(self):
+        return list(self.subscribers)
+
+    async def connect(self, websocket):
+        await websocket.accept()
+        subscriber = _Subscriber(websocket)
+        subscriber.writer = asyncio.create_task(self._write_loop(subscriber))
+        self.subscribers[websocket] = subscriber
+
+    def disconnect(self, websocket):
+        subscriber = self.subscribers.pop(websocket, None)
+        if subscriber is not None and subscriber.writer is not asyncio.current_task():
+            subscriber.writer.cancel()
+
+    async def broadcast(self, message: dict):
+        self.publish(message)
+
+    def publish(self, message):
+        """Queues a message (dict, or already-serialized JSON text) for every connection."""
+        try:
+            # Serialized once, whatever the number of clients
+            text = message if isinstance(message, str) else json.dumps(message, default=str)
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Alert not broadcast: {e}")
+            return
+        self.broadcasts += 1
+        for subscriber in list(self.subscribers.values()):
+            self._enqueue(subscriber, text)
+
+    def _enqueue(self, subscriber, text):
+        queue = subscriber.queue
+        if len(queue) >= self.queue_size:
+            subscriber.dropped += 1
+            self.dropped += 1
+            if self.policy == "disconnect":
+                self._drop_connection(subscriber, "slow consumer")
+                return
+            if self.policy == "drop_newest":
+                return
+            if self.policy == "coalesce":
+                queue.clear()
+            else:
+                queue.popleft()
+        queue.append(text)
+        subscriber.wakeup.set()
+
+    async def _write_loop(self, subscriber):
+        websocket = subscriber.websocket
+        try:
+            while True:
+                await subscriber.wakeup.wait()
+                subscriber.wakeup.clear()
+                while subscriber.queue:
+                    text = subscriber.queue.popleft()
+                    await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+                    self.delivered += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._drop_connection(subscriber, type(e).__name__)
+
+    def _drop_connection(self, subscriber, why):
+        if self.subscribers.pop(subscriber.websocket, None) is None:
+            return
+        self.disconnected += 1
+        print(f"🔌 Dropping dashboard connection ({why})")
+        if subscriber.writer is not asyncio.current_task():
+            subscriber.writer.cancel()
+        asyncio.ensure_future(self._close(subscriber.websocket))
+
+    @staticmethod
+    async def _close(websocket):
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+    def stats(self):
+        return {
+            "connections": len(self.subscribers),
+            "queued": sum(len(s.queue) for s in self.subscribers.values()),
+            "policy": self.policy,
+            "broadcasts": self.broadcasts,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected
+        }
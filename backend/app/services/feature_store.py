@@ -0,0 +1,132 @@
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# --- ONLINE FEATURE STORE ---
+# Keeps the per-user history that preprocess_data (research/phase1/feature_engine.py)
+# derives from the full login table, so raw login events can be scored without the
+# client precomputing [velocity_kmh, time_diff_hours, device_trust_score, hour_of_day].
+# Every update is O(1); users are evicted after FEATURE_STORE_TTL_SECONDS of inactivity
+# or least-recently-seen first once FEATURE_STORE_MAX_USERS is reached.
+FEATURE_STORE_MAX_USERS = int(os.getenv("FEATURE_STORE_MAX_USERS", "1000000"))
+FEATURE_STORE_TTL_SECONDS = float(os.getenv("FEATURE_STORE_TTL_SECONDS", str(30 * 24 * 3600)))
+MAX_DEVICES_PER_USER = 8
+
+# LSTM vocabulary (phase1_train_lstm.ipynb); 0 is padding / unknown
+ACTIONS = {
+    'LOGIN': 1, 'VIEW_BALANCE': 2, 'VIEW_TRANSACTIONS': 3,
+    'TRANSFER_SMALL': 4, 'TRANSFER_LARGE': 5,
+    'CHANGE_PASSWORD': 6, 'ADD_RECIPIENT': 7, 'LOGOUT': 8
+}
+MAX_SEQ_LENGTH = 10
+EARTH_RADIUS_KM = 6371.0088
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+def utc(timestamp: datetime):
+    return timestamp.replace(tzinfo=timezone.utc) if timestamp.tzinfo is None else timestamp.astimezone(timezone.utc)
+
+def tokenize_actions(actions):
+    return [action if isinstance(action, int) else ACTIONS.get(str(action).upper(), 0) for action in actions]
+
+class UserState:
+    # Device counts are keyed by hash(device string); recent actions are packed
+    # into a bytes object (tokens < 256) instead of a list/deque.
+    __slots__ = ("last_ts", "last_lat", "last_lon", "total", "devices", "actions", "seen_at")
+
+    def __init__(self):
+        self.last_ts = None
+        self.last_lat = None
+        self.last_lon = None
+        self.total = 0
+        self.devices = {}
+        self.actions = b""
+        self.seen_at = 0.0
+
+class FeatureStore:
+    def __init__(self, max_users: int = FEATURE_STORE_MAX_USERS, ttl_seconds: float = FEATURE_STORE_TTL_SECONDS):
+        self.max_users = max(1, max_users)
+        self.ttl_seconds = ttl_seconds
+        # Ordered by last access: the front is always the stalest user
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def observe(self, user_id: str, timestamp: datetime = None, lat: float = None, lon: float = None, device: str = None, actions: list = None):
+        """Records one login and returns its model features, mirroring preprocess_data:
+        [velocity_kmh, time_diff_hours, device_trust_score, hour_of_day].
+        Timestamps are kept as aware UTC; naive ones are taken to be UTC already."""
+        timestamp = utc(timestamp) if timestamp is not None else datetime.now(timezone.utc)
+        now = time.monotonic()
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is None:
+                state = self._users[user_id] = UserState()
+            else:
+                self._users.move_to_end(user_id)
+            state.seen_at = now
+
+            # A. Time Diff
+            time_diff_hours = 0.0
+            if state.last_ts is not None:
+                time_diff_hours = max(0.0, (timestamp - state.last_ts).total_seconds() / 3600)
+
+            # B. Distance & Velocity
+            dist_km = 0.0
+            if lat is not None and lon is not None and state.last_lat is not None:
+                dist_km = haversine_km(state.last_lat, state.last_lon, lat, lon)
+            velocity_kmh = dist_km / (time_diff_hours + 0.1)
+
+            # C. Device Trust: share of this user's logins (so far) made from this device
+            key = hash(device or "")
+            state.total += 1
+            state.devices[key] = state.devices.get(key, 0) + 1
+            device_trust_score = state.devices[key] / state.total
+            if len(state.devices) > MAX_DEVICES_PER_USER:
+                rarest = min(state.devices, key=state.devices.get)
+                if rarest != key: del state.devices[rarest]
+
+            # D. Temporal + session state
+            state.last_ts = timestamp
+            if lat is not None and lon is not None:
+                state.last_lat, state.last_lon = lat, lon
+            if actions:
+                tokens = bytes(min(max(t, 0), 255) for t in tokenize_actions(actions))
+                state.actions = (state.actions + tokens)[-MAX_SEQ_LENGTH:]
+
+            self._evict(now)
+            return [velocity_kmh, time_diff_hours, device_trust_score, float(timestamp.hour)]
+
+    def recent_sequence(self, user_id: str):
+        """Last MAX_SEQ_LENGTH actions of the user in LoginEvent.sequence_data format."""
+        with self._lock:
+            state = self._users.get(user_id)
+            return [[float(t)] for t in state.actions] if state is not None else []
+
+    def _evict(self, now):
+        users = self._users
+        while users:
+            user_id, state = next(iter(users.items()))
+            if len(users) <= self.max_users and now - state.seen_at <= self.ttl_seconds:
+                break
+            del users[user_id]
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self._users)
+
+    def stats(self):
+        return {
+            "users": len(self._users),
+            "max_users": self.max_users,
+            "ttl_seconds": self.ttl_seconds,
+            "evicted": self.evicted
+        }
+
+feature_store = FeatureStore()
@@ -0,0 +1,205 @@
+import os
+import threading
+from collections import deque
+
+# --- CONFIGURATION ---
+# Users flagged as fraudsters at startup (confirmed fraud feedback adds more at runtime)
+KNOWN_FRAUD_USERS = [u.strip() for u in os.getenv("KNOWN_FRAUD_USERS", "user_101").split(",") if u.strip()]
+# Memory bound: once this many nodes exist the graph is rebuilt from the newest edges
+FRAUD_GRAPH_MAX_NODES = int(os.getenv("FRAUD_GRAPH_MAX_NODES", "5000000"))
+# Fraction of linking edges kept when the graph is rebuilt
+FRAUD_GRAPH_KEEP_FRACTION = float(os.getenv("FRAUD_GRAPH_KEEP_FRACTION", "0.5"))
+# A device or IP that has linked this many accounts is a hub (office NAT, shared kiosk)
+# and stops joining further accounts into the same ring
+FRAUD_GRAPH_MAX_LINKS = int(os.getenv("FRAUD_GRAPH_MAX_LINKS", "50"))
+# Risk of any user sharing a component with a flagged user. Above the 0.8 ring rule
+# in risk_engine, so being linked to a confirmed fraudster is enough for the ring verdict;
+# the share of flagged users in the component adds the rest up to 1.0
+FRAUD_GRAPH_LINKED_RISK = float(os.getenv("FRAUD_GRAPH_LINKED_RISK", "0.85"))
+
+class FraudGraph:
+    """User-device-IP graph kept as a union-find forest.
+
+    Every login adds user->device and user->ip edges. Only edges that merge two
+    components change anything, so only those are stored (in arrival order); they
+    form a spanning forest of the graph and are what a rebuild replays. Each
+    component root carries its number of users and of flagged users, so the risk
+    of a user is O(α(n)): 1.0 for a flagged user, FRAUD_GRAPH_LINKED_RISK plus
+    the rest scaled by sqrt(flagged users / users) for anyone linked to one, 0
+    otherwise."""
+
+    def __init__(self, known_fraud=KNOWN_FRAUD_USERS, max_nodes: int = FRAUD_GRAPH_MAX_NODES, max_links: int = FRAUD_GRAPH_MAX_LINKS):
+        self.max_nodes = max(16, max_nodes)
+        self.max_links = max_links
+        self.flagged = set(known_fraud)
+        self._lock = threading.Lock()
+        self.logins = 0
+        self.rebuilds = 0
+        self._reset()
+        for user_id in self.flagged:
+            self._flag_node(self._node("u:" + user_id, is_user=True), +1)
+
+    def _reset(self):
+        self._ids = {}          # node name -> node id
+        self._parent = []
+        self._users = []        # per root: users in the component
+        self._flagged = []      # per root: flagged users in the component
+        self._links = []        # per node: merges made through it (hub detection)
+        self._edges = deque()   # merging edges, oldest first
+
+    # --- UNION-FIND ---
+    def _node(self, name, is_user=False):
+        node = self._ids.get(name)
+        if node is None:
+            node = self._ids[name] = len(self._parent)
+            self._parent.append(node)
+            self._users.append(1 if is_user else 0)
+            self._flagged.append(0)
+            self._links.append(0)
+        return node
+
+    def _find(self, node):
+        parent = self._parent
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    def _union(self, a, b):
+        ra, rb = self._find(a), self._find(b)
+        if ra == rb:
+            return False
+        if self._users[ra] < self._users[rb]:
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._users[ra] += self._users[rb]
+        self._flagged[ra] += self._flagged[rb]
+        return True
+
+    def _flag_node(self, node, delta):
+        self._flagged[self._find(node)] += delta
+
+    def _link(self, user_name, other_name):
+        user, other = self._node(user_name, is_user=True), self._node(other_name)
+        if self._links[other] >= self.max_links:
+            return
+        if self._union(user, other):
+            self._links[other] += 1
+            self._edges.append((user_name, other_name))
+
+    # --- PUBLIC API ---
+    def add_login(self, user_id: str, device: str = None, ip: str = None):
+        with self._lock:
+            self.logins += 1
+            user_name = "u:" + user_id
+            self._node(user_name, is_user=True)
+            if device: self._link(user_name, "d:" + device)
+            if ip: self._link(user_name, "ip:" + ip)
+            if len(self._parent) > self.max_nodes:
+                self._rebuild()
+
+    def _rebuild(self):
+        """Drops the oldest linking edges and replays the rest into a fresh forest."""
+        keep = int(len(self._edges) * FRAUD_GRAPH_KEEP_FRACTION)
+        edges = list(self._edges)[len(self._edges) - keep:] if keep else []
+        self._reset()
+        for user_id in self.flagged:
+            self._flag_node(self._node("u:" + user_id, is_user=True), +1)
+        for user_name, other_name in edges:
+            self._link(user_name, other_name)
+        self.rebuilds += 1
+        print(f"🕸️ Fraud graph rebuilt: kept {len(edges)} links, {len(self._parent)} nodes")
+
+    def flag(self, user_id: str, fraudulent: bool = True):
+        with self._lock:
+            if fraudulent == (user_id in self.flagged):
+                return
+            node = self._node("u:" + user_id, is_user=True)
+            if fraudulent:
+                self.flagged.add(user_id)
+                self._flag_node(node, +1)
+            else:
+                self.flagged.discard(user_id)
+                self._flag_node(node, -1)
+
+    def risk(self, user_id: str):
+        with self._lock:
+            return self._risk(user_id)
+
+    def risk_many(self, user_ids):
+        with self._lock:
+            return [self._risk(user_id) for user_id in user_ids]
+
+    def _risk(self, user_id):
+        if user_id in self.flagged:
+            return 1.0
+        node = self._ids.get("u:" + user_id)
+        if node is None:
+            return 0.0
+        root = self._find(node)
+        flagged = self._flagged[root]
+        if not flagged:
+            return 0.0
+        return FRAUD_GRAPH_LINKED_RISK + (1.0 - FRAUD_GRAPH_LINKED_RISK) * (flagged / self._users[root]) ** 0.5
+
+    def component_size(self, user_id: str):
+        with self._lock:
+            node = self._ids.get("u:" + user_id)
+            return self._users[self._find(node)] if node is not None else 0
+
+    def stats(self):
+        return {
+            "nodes": len(self._parent), "links": len(self._edges), "max_nodes": self.max_nodes,
+            "flagged_users": len(self.flagged), "logins": self.logins, "rebuilds": self.rebuilds
+        }
+
+fraud_graph = FraudGraph()
+
+# --- BENCHMARK ---
+# Usage (from backend/): python -m app.services.fraud_graph [edges]
+if __name__ == "__main__":
+    import sys
+    import time
+    import random
+    import tracemalloc
+
+    # A new account sharing a device with a flagged one gets the ring verdict
+    from app.services.risk_engine import assess_risk
+    ring = FraudGraph(known_fraud=["mule_0"])
+    ring.add_login("mule_0", "dev_shared", "203.0.113.7")
+    ring.add_login("mule_1", "dev_other", "203.0.113.7")
+    ring.add_login("newcomer", "dev_shared", None)
+    ring.add_login("bystander", "dev_clean", "198.51.100.1")
+    scores = {"iso": 0.0, "ae": 0.0, "lstm": 0.0}
+    _, reason, verdict = assess_risk("newcomer", [1.0, 1.0, 1.0, 12], [[1]], {**scores, "network": ring.risk("newcomer")})
+    assert (reason, verdict) == ("🕸️ Linked to Known Fraud Ring", "BLOCK"), (reason, verdict, ring.risk("newcomer"))
+    assert ring.risk("mule_1") > 0.8 and ring.risk("bystander") == 0.0
+    print(f"✅ New ring member blocked: newcomer risk {ring.risk('newcomer'):.3f}, bystander {ring.risk('bystander')}")
+
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(3)
+    users, devices, ips = logins // 2, logins // 2, logins // 4
+    events = [(f"user_{rng.randrange(users)}", f"dev_{rng.randrange(devices)}", f"10.{rng.randrange(ips)}") for _ in range(logins)]
+
+    tracemalloc.start()
+    graph = FraudGraph(known_fraud=[f"user_{n}" for n in range(0, users, 1000)])
+    started = time.perf_counter()
+    for user_id, device, ip in events:
+        graph.add_login(user_id, device, ip)
+    insert_s = time.perf_counter() - started
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+
+    probes = [f"user_{rng.randrange(users)}" for _ in range(100_000)]
+    started = time.perf_counter()
+    risks = graph.risk_many(probes)
+    risk_us = (time.perf_counter() - started) / len(probes) * 1e6
+    print(f"   {logins} logins ({2 * logins} edges): {logins / insert_s:,.0f} logins/s, {memory_mb:.0f} MB, {graph.stats()}")
+    print(f"   risk lookup {risk_us:.2f}us | users at risk > 0: {sum(r > 0 for r in risks) / len(risks):.1%}")
+
+    bounded = FraudGraph(known_fraud=[], max_nodes=200_000)
+    for user_id, device, ip in events[:500_000]:
+        bounded.add_login(user_id, device, ip)
+    print(f"   bounded to 200k nodes: {bounded.stats()}")
@@ -0,0 +1,219 @@
+import os
+import csv
+import socket
+import struct
+import ipaddress
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+
+# --- CONFIGURATION ---
+# IPv4 range database: .npz (built by `python -m app.services.geoip build`), .csv or .mmdb
+GEOIP_DB_PATH = os.getenv("GEOIP_DB_PATH", os.path.join(os.getcwd(), "ml_artifacts", "geoip.npz"))
+GEOIP_CACHE_SIZE = int(os.getenv("GEOIP_CACHE_SIZE", "65536"))
+# Only enable behind a proxy that overwrites X-Forwarded-For (Render, a load balancer):
+# otherwise any client picks the IP used for geolocation and fraud-graph links
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "false").lower() in ("1", "true", "yes")
+
+UNKNOWN_LOCATION = "Unknown Location"
+LOCAL_NETWORK = "Local Network"
+_unpack_ipv4 = struct.Struct("!I").unpack
+
+def ipv4_to_int(ip: str):
+    return _unpack_ipv4(socket.inet_aton(ip))[0]
+
+def _parse_bound(value: str):
+    value = value.strip()
+    return int(value) if value.isdigit() else ipv4_to_int(value)
+
+class GeoIPDatabase:
+    """Non-overlapping IPv4 ranges as sorted start/end arrays. A /16 prefix table narrows
+    each lookup to the few ranges starting inside that prefix before bisecting."""
+
+    def __init__(self, starts, ends, locations, labels):
+        self.starts = array("I", starts)
+        self.ends = array("I", ends)
+        self.locations = array("I", locations)
+        self.labels = list(labels)
+        self._index_prefixes()
+
+    def _index_prefixes(self):
+        import numpy as np
+        # prefix[p] = first range starting at or after p.0.0 (p = top 16 bits)
+        bounds = np.arange(65537, dtype=np.uint64) << np.uint64(16)
+        self.prefix = array("I", np.searchsorted(np.frombuffer(self.starts, dtype=np.uint32), bounds).astype(np.uint32).tobytes())
+
+    def __len__(self):
+        return len(self.starts)
+
+    def lookup_int(self, ip: int):
+        p = ip >> 16
+        i = bisect_right(self.starts, ip, self.prefix[p], self.prefix[p + 1]) - 1
+        if i >= 0 and ip <= self.ends[i]:
+            return self.labels[self.locations[i]]
+        return None
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: (start, end, label) with start/end as ints."""
+        rows = sorted(rows)
+        label_ids = {}
+        starts, ends, locations = [], [], []
+        for start, end, label in rows:
+            starts.append(start); ends.append(end)
+            locations.append(label_ids.setdefault(label, len(label_ids)))
+        return cls(starts, ends, locations, list(label_ids))
+
+    @classmethod
+    def from_csv(cls, path):
+        """Rows of `start,end,city,country` (dotted or integer bounds) or `cidr,city,country`.
+        IPv6 rows and a header line are skipped."""
+        rows = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for record in csv.reader(f):
+                if not record or ":" in record[0]: continue
+                try:
+                    if "/" in record[0]:
+                        network = ipaddress.IPv4Network(record[0].strip(), strict=False)
+                        start, end, fields = int(network.network_address), int(network.broadcast_address), record[1:]
+                    else:
+                        start, end, fields = _parse_bound(record[0]), _parse_bound(record[1]), record[2:]
+                except (ValueError, OSError, IndexError):
+                    continue  # header or malformed line
+                fields = [field.strip() for field in fields if field.strip()]
+                rows.append((start, end, ", ".join(fields[:2]) if fields else UNKNOWN_LOCATION))
+        return cls.from_rows(rows)
+
+    @classmethod
+    def from_npz(cls, path):
+        import numpy as np
+        data = np.load(path, allow_pickle=False)
+        db = cls.__new__(cls)
+        db.starts = array("I", data["starts"].astype(np.uint32).tobytes())
+        db.ends = array("I", data["ends"].astype(np.uint32).tobytes())
+        db.locations = array("I", data["locations"].astype(np.uint32).tobytes())
+        db.labels = data["labels"].tolist()
+        db._index_prefixes()
+        return db
+
+    def save_npz(self, path):
+        import numpy as np
+        np.savez_compressed(
+            path, starts=np.frombuffer(self.starts, dtype=np.uint32), ends=np.frombuffer(self.ends, dtype=np.uint32),
+            locations=np.frombuffer(self.locations, dtype=np.uint32), labels=np.array(self.labels, dtype=str)
+        )
+
+class MMDBDatabase:
+    """MaxMind / DB-IP .mmdb files, via the optional `maxminddb` package."""
+
+    def __init__(self, path):
+        import maxminddb
+        self.reader = maxminddb.open_database(path)
+
+    def __len__(self):
+        return self.reader.metadata().node_count
+
+    def lookup_int(self, ip: int):
+        record = self.reader.get(str(ipaddress.IPv4Address(ip)))
+        if not record: return None
+        city = record.get("city", {}).get("names", {}).get("en")
+        country = record.get("country", {}).get("names", {}).get("en")
+        return ", ".join(filter(None, (city, country))) or None
+
+class GeoIPResolver:
+    def __init__(self, path: str = GEOIP_DB_PATH, cache_size: int = GEOIP_CACHE_SIZE):
+        self.path = path
+        self.db = None
+        self.loaded = False
+        self.locate = lru_cache(maxsize=cache_size)(self._locate)
+
+    def load(self):
+        self.loaded = True
+        if not self.path or not os.path.exists(self.path):
+            # The database is not shipped with the repo; it has to be built from a range CSV / .mmdb
+            print(f"⚠️ GeoIP database not found at {self.path}; locations will be '{UNKNOWN_LOCATION}'. "
+                  f"Build one with `python -m app.services.geoip build ranges.csv ml_artifacts/geoip.npz` or set GEOIP_DB_PATH")
+            return
+        try:
+            if self.path.endswith(".npz"): self.db = GeoIPDatabase.from_npz(self.path)
+            elif self.path.endswith(".mmdb"): self.db = MMDBDatabase(self.path)
+            else: self.db = GeoIPDatabase.from_csv(self.path)
+            self.locate.cache_clear()
+            print(f"✅ GeoIP: {len(self.db)} ranges loaded from {self.path}")
+        except Exception as e:
+            print(f"⚠️ GeoIP load failed: {e}")
+
+    def _locate(self, ip: str):
+        try:
+            value = ipv4_to_int(ip)
+        except (OSError, TypeError, ValueError):
+            # IPv6 and malformed addresses (inet_aton raises ValueError on an embedded NUL)
+            return UNKNOWN_LOCATION
+        # 10/8, 127/8, 172.16/12, 192.168/16
+        if value >> 24 in (10, 127) or value >> 20 == 0xAC1 or value >> 16 == 0xC0A8:
+            return LOCAL_NETWORK
+        if self.db is None:
+            return UNKNOWN_LOCATION
+        return self.db.lookup_int(value) or UNKNOWN_LOCATION
+
+    def stats(self):
+        info = self.locate.cache_info()
+        return {
+            "path": self.path, "ranges": len(self.db) if self.db is not None else 0,
+            "cache_hits": info.hits, "cache_misses": info.misses, "cached": info.currsize
+        }
+
+def is_public_ip(ip: str):
+    try:
+        return ipaddress.ip_address(ip).is_global
+    except ValueError:
+        return False
+
+def client_ip(request):
+    if TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "127.0.0.1"
+
+def describe_user_agent(user_agent: str):
+    """'Chrome / Windows'-style label for the dashboard."""
+    if not user_agent: return "Unknown Device"
+    ua = user_agent.lower()
+    browser = next((name for key, name in (("edg/", "Edge"), ("opr/", "Opera"), ("firefox", "Firefox"), ("headless", "Headless Chrome"),
+                                           ("chrome", "Chrome"), ("safari", "Safari"), ("python", "Script"), ("curl", "Script")) if key in ua), "Browser")
+    system = next((name for key, name in (("android", "Android"), ("iphone", "iOS"), ("ipad", "iOS"), ("windows", "Windows"),
+                                          ("mac os", "macOS"), ("linux", "Linux")) if key in ua), None)
+    return f"{browser} / {system}" if system else browser
+
+geoip = GeoIPResolver()
+
+# --- BUILD & BENCHMARK ---
+# Usage (from backend/):
+#   python -m app.services.geoip build ranges.csv ml_artifacts/geoip.npz
+#   python -m app.services.geoip bench
+if __name__ == "__main__":
+    import sys
+    import time
+    import random
+
+    if len(sys.argv) == 4 and sys.argv[1] == "build":
+        started = time.perf_counter()
+        db = GeoIPDatabase.from_csv(sys.argv[2])
+        db.save_npz(sys.argv[3])
+        print(f"✅ {len(db)} ranges, {len(db.labels)} locations -> {sys.argv[3]} ({time.perf_counter() - started:.1f}s)")
+    else:
+        rng = random.Random(7)
+        bounds = sorted(rng.sample(range(1 << 32), 2_000_000))
+        db = GeoIPDatabase.from_rows([(bounds[i], bounds[i + 1] - 1, f"City {i % 5000}, Country {i % 200}") for i in range(0, len(bounds) - 1, 2)])
+        resolver = GeoIPResolver(path=None)
+        resolver.db = db
+        ips = [socket.inet_ntoa(struct.pack("!I", rng.getrandbits(32))) for _ in range(200_000)]
+
+        ips = ips[:GEOIP_CACHE_SIZE]
+        def per_lookup_ns():
+            start = time.perf_counter()
+            for ip in ips: resolver.locate(ip)
+            return (time.perf_counter() - start) / len(ips) * 1e9
+        cold, warm = per_lookup_ns(), per_lookup_ns()
+        print(f"   {len(db)} ranges | uncached lookup {cold:.0f}ns | cached lookup {warm:.0f}ns")
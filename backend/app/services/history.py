@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+
+# --- CONFIGURATION ---
+# Entries kept in memory (the dashboard only shows the newest 50)
+HISTORY_CAPACITY = int(os.getenv("HISTORY_CAPACITY", "5000"))
+# Optional SQLite file; when set, history survives restarts and is shared by all uvicorn workers
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "")
+# Writes are queued and committed in batches by a background thread
+HISTORY_FLUSH_BATCH = int(os.getenv("HISTORY_FLUSH_BATCH", "256"))
+HISTORY_FLUSH_INTERVAL_MS = float(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "200"))
+
+class HistoryStore:
+    """Alert history: fixed-size ring buffer plus an id -> slot index, optionally
+    mirrored to SQLite (WAL mode, batched writes)."""
+
+    def __init__(self, capacity: int = HISTORY_CAPACITY, db_path: str = HISTORY_DB_PATH):
+        self.capacity = max(1, capacity)
+        self.db_path = db_path
+        self._ring = [None] * self.capacity
+        self._next = 0      # slot the next entry is written to
+        self._size = 0
+        self._index = {}    # log id -> slot
+        self._lock = threading.Lock()
+        self._writes = None
+        self._writer = None
+        self._local = threading.local()
+
+    # --- PERSISTENCE ---
+    def open(self):
+        """Creates the SQLite schema, warms the ring from it and starts the writer thread."""
+        if not self.db_path or self._writer is not None:
+            return
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS history (
+                id TEXT PRIMARY KEY, ts REAL NOT NULL, user_id TEXT, verdict TEXT, entry TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_ts ON history(ts);
+            CREATE INDEX IF NOT EXISTS idx_history_user_ts ON history(user_id, ts);
+            CREATE INDEX IF NOT EXISTS idx_history_verdict_ts ON history(verdict, ts);
+        """)
+        rows = conn.execute("SELECT entry FROM history ORDER BY ts DESC LIMIT ?", (self.capacity,)).fetchall()
+        self._append([json.loads(row[0]) for row in reversed(rows)])
+        print(f"🗄️ History: {len(rows)} entries restored from {self.db_path}")
+
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def close(self):
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join(timeout=5)
+            self._writer = None
+
+    def flush(self):
+        """Blocks until every queued write is committed."""
+        if self._writer is not None:
+            self._writes.join()
+
+    def _connection(self):
+        # sqlite3 connections are per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write_loop(self):
+        conn = self._connection()
+        stop = False
+        while not stop:
+            batch = [self._writes.get()]
+            deadline = time.monotonic() + HISTORY_FLUSH_INTERVAL_MS / 1000
+            while len(batch) < HISTORY_FLUSH_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0: break
+                try:
+                    batch.append(self._writes.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    for op in batch:
+                        if op is None:
+                            stop = True
+                        elif op == "clear":
+                            conn.execute("DELETE FROM history")
+                        else:
+                            conn.executemany("INSERT OR REPLACE INTO history (id, ts, user_id, verdict, entry) VALUES (?, ?, ?, ?, ?)", op)
+            except sqlite3.Error as e:
+                print(f"⚠️ History write failed ({len(batch)} batches dropped): {e}")
+            finally:
+                for _ in batch: self._writes.task_done()
+
+    def _persist(self, entries):
+        if self._writer is not None and entries:
+            self._writes.put([
+                (e["id"], e["ts"], e.get("user_id"), e.get("verdict"), json.dumps(e, default=str)) for e in entries
+            ])
+
+    # --- RING BUFFER ---
+    def _append(self, entries):
+        with self._lock:
+            for entry in entries:
+                evicted = self._ring[self._next]
+                if evicted is not None:
+                    self._index.pop(evicted["id"], None)
+                self._ring[self._next] = entry
+                self._index[entry["id"]] = self._next
+                self._next = (self._next + 1) % self.capacity
+                self._size = min(self._size + 1, self.capacity)
+
+    def _newest_first(self):
+        with self._lock:
+            slots = [(self._next - 1 - i) % self.capacity for i in range(self._size)]
+            return [self._ring[slot] for slot in slots]
+
+    # --- PUBLIC API ---
+    def add(self, entries):
+        """Appends entries given oldest to newest."""
+        self._append(entries)
+        self._persist(entries)
+
+    def get(self, log_id: str):
+        with self._lock:
+            slot = self._index.get(log_id)
+            if slot is not None:
+                return self._ring[slot]
+        if self._writer is not None:
+            # Older than the ring, or written by another worker
+            self.flush()
+            row = self._connection().execute("SELECT entry FROM history WHERE id = ?", (log_id,)).fetchone()
+            if row: return json.loads(row[0])
+        return None
+
+    def update(self, log_id: str, **fields):
+        """Applies fields to an entry and persists it. Returns the entry or None."""
+        entry = self.get(log_id)
+        if entry is None:
+            return None
+        with self._lock:
+            entry.update(fields)
+        self._persist([entry])
+        return entry
+
+    def query(self, verdict: str = None, user_id: str = None, since: float = None, until: float = None, offset: int = 0, limit: int = 50):
+        """Newest-first page of entries matching every given filter (times are epoch seconds)."""
+        if self._writer is not None:
+            self.flush()
+            clauses, params = [], []
+            if verdict: clauses.append("verdict = ?"); params.append(verdict)
+            if user_id: clauses.append("user_id = ?"); params.append(user_id)
+            if since is not None: clauses.append("ts >= ?"); params.append(since)
+            if until is not None: clauses.append("ts <= ?"); params.append(until)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            rows = self._connection().execute(
+                f"SELECT entry FROM history {where} ORDER BY ts DESC LIMIT ? OFFSET ?", (*params, limit, offset)
+            ).fetchall()
+            return [json.loads(row[0]) for row in rows]
+
+        page = []
+        for entry in self._newest_first():
+            # The ring is in time order, so nothing older can match
+            if since is not None and entry["ts"] < since: break
+            if until is not None and entry["ts"] > until: continue
+            if verdict and entry.get("verdict") != verdict: continue
+            if user_id and entry.get("user_id") != user_id: continue
+            if offset: offset -= 1; continue
+            page.append(entry)
+            if len(page) >= limit: break
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._ring = [None] * self.capacity
+            self._index.clear()
+            self._next = self._size = 0
+        if self._writer is not None:
+            self._writes.put("clear")
+            self.flush()
+
+    def __len__(self):
+        return self._size
+
+    def stats(self):
+        return {
+            "entries": self._size,
+            "capacity": self.capacity,
+            "db_path": self.db_path or None,
+            "queued_writes": self._writes.qsize() if self._writes is not None else 0
+        }
+
+history_store = HistoryStore()
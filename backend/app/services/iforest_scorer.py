@@ -0,0 +1,133 @@
+import numpy as np
+
+# --- FLATTENED ISOLATION FOREST ---
+# sklearn's IsolationForest.predict validates input and walks each of its 100
+# trees through a separate Python-level call. Here every tree is packed into one
+# set of contiguous node arrays and all rows descend all trees together, one
+# vectorized step per tree level.
+
+EULER_GAMMA = np.euler_gamma
+
+def average_path_length(n_samples):
+    """Expected path length of an unsuccessful BST search, c(n) in the iForest paper."""
+    n = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n)
+    result[n == 2] = 1.0
+    big = n > 2
+    result[big] = 2.0 * (np.log(n[big] - 1.0) + EULER_GAMMA) - 2.0 * (n[big] - 1.0) / n[big]
+    return result
+
+# Rows are scored in blocks so the (rows x trees) working set stays cache-resident
+SCORE_BLOCK_ROWS = 256
+
+class FlatIsolationForest:
+    def __init__(self, feature, threshold, left, right, path_length, roots, max_depth, max_samples, offset):
+        self.feature = feature
+        self.threshold = threshold
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.stack([left, right], axis=1).ravel()
+        self.path_length = path_length
+        self.roots = roots
+        self.max_depth = max_depth
+        self.offset = offset
+        self.normalizer = float(average_path_length([max_samples])[0]) * len(roots)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        features, thresholds, lefts, rights, path_lengths, roots = [], [], [], [], [], []
+        base = 0
+        for estimator, used_features in zip(model.estimators_, model.estimators_features_):
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+
+            # Nodes are stored parent-before-child, so depths resolve in one pass
+            depth = np.zeros(n, dtype=np.int64)
+            for node in np.flatnonzero(~is_leaf):
+                depth[tree.children_left[node]] = depth[node] + 1
+                depth[tree.children_right[node]] = depth[node] + 1
+
+            local = np.arange(n)
+            # Leaves point at themselves so extra descent steps are no-ops
+            lefts.append(np.where(is_leaf, local, tree.children_left) + base)
+            rights.append(np.where(is_leaf, local, tree.children_right) + base)
+            features.append(np.where(is_leaf, 0, np.asarray(used_features)[np.maximum(tree.feature, 0)]))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            path_lengths.append(np.where(is_leaf, depth + average_path_length(tree.n_node_samples), 0.0))
+            roots.append(base)
+            base += n
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            path_length=np.concatenate(path_lengths),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max(estimator.tree_.max_depth for estimator in model.estimators_),
+            max_samples=model.max_samples_,
+            offset=float(model.offset_),
+        )
+
+    def anomaly_score(self, X):
+        """iForest score 2^(-E[h(x)] / c(max_samples)); higher is more anomalous."""
+        # sklearn's trees split on float32 features
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        depths = np.empty(len(X))
+        for start in range(0, len(X), SCORE_BLOCK_ROWS):
+            depths[start:start + SCORE_BLOCK_ROWS] = self._path_lengths(X[start:start + SCORE_BLOCK_ROWS])
+        return np.power(2.0, -depths / self.normalizer)
+
+    def _path_lengths(self, X):
+        flat_x = X.ravel()
+        row_base = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = np.take(flat_x, row_base + np.take(self.feature, node))
+            go_right = x > np.take(self.threshold, node)
+            node = np.take(self.children, 2 * node + go_right)
+        return np.take(self.path_length, node).sum(axis=1)
+
+    def score_samples(self, X):
+        return -self.anomaly_score(X)
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset
+
+    def score(self, X):
+        """Returns (labels, anomaly scores); labels follow sklearn: -1 outlier, 1 inlier."""
+        anomaly = self.anomaly_score(X)
+        labels = np.where(-anomaly - self.offset < 0, -1, 1)
+        return labels, anomaly
+
+    def predict(self, X):
+        return self.score(X)[0]
+
+# --- PARITY CHECK & BENCHMARK ---
+# Usage (from backend/): python -m app.services.iforest_scorer
+if __name__ == "__main__":
+    import os
+    import time
+    import joblib
+
+    model = joblib.load(os.path.join(os.getcwd(), "ml_artifacts", "model_isolation_forest.pkl"))
+    flat = FlatIsolationForest.from_sklearn(model)
+    X = np.random.default_rng(42).random((4096, model.n_features_in_))
+
+    max_err = float(np.max(np.abs(model.score_samples(X) - flat.score_samples(X))))
+    mismatches = int(np.sum(model.predict(X) != flat.predict(X)))
+    status = "✅" if max_err < 1e-9 and mismatches == 0 else "❌"
+    print(f"{status} score_samples max |sklearn - flat| = {max_err:.2e} | label mismatches: {mismatches}/{len(X)}")
+
+    for batch_size in (1, 64, 4096):
+        batch = X[:batch_size]
+        repeats = max(5, 2000 // batch_size)
+        start = time.perf_counter()
+        for _ in range(repeats): model.predict(batch)
+        sklearn_us = (time.perf_counter() - start) / repeats * 1e6
+        start = time.perf_counter()
+        for _ in range(repeats): flat.predict(batch)
+        flat_us = (time.perf_counter() - start) / repeats * 1e6
+        print(f"   batch {batch_size:>5}: sklearn {sklearn_us:>9.0f}us | flat {flat_us:>9.0f}us | {sklearn_us / flat_us:5.1f}x")
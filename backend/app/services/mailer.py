@@ -0,0 +1,221 @@
+import os
+import time
+import heapq
+import smtplib
+import itertools
+import threading
+from app import utils
+
+# --- CONFIGURATION ---
+# A recipient gets at most one mail per window; everything raised in between is sent as one digest
+MAIL_DIGEST_WINDOW_SECONDS = float(os.getenv("MAIL_DIGEST_WINDOW_SECONDS", "60"))
+# Messages sent over one SMTP session before the dispatcher looks at the queue again
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", "4"))
+MAIL_RETRY_BACKOFF_SECONDS = float(os.getenv("MAIL_RETRY_BACKOFF_SECONDS", "2"))
+# Idle SMTP connections are closed after this long
+MAIL_IDLE_CLOSE_SECONDS = float(os.getenv("MAIL_IDLE_CLOSE_SECONDS", "30"))
+# Incidents held per recipient while rate limited; older ones are dropped from the digest
+MAIL_MAX_PENDING_PER_RECIPIENT = int(os.getenv("MAIL_MAX_PENDING_PER_RECIPIENT", "500"))
+
+class EmailDispatcher:
+    """Single background thread owning one persistent SMTP connection.
+
+    notify() only appends the incident to its recipient's pending list. The thread
+    sends a recipient's pending incidents once their rate-limit window allows it:
+    a lone incident as the regular alert mail, several as one deduplicated digest.
+    Failed sends are retried with exponential backoff, reconnecting as needed."""
+
+    def __init__(self, window: float = MAIL_DIGEST_WINDOW_SECONDS, connect=None):
+        self.window = window
+        self._connect = connect or utils.open_smtp_connection
+        self._cond = threading.Condition()
+        self._pending = {}      # recipient -> [incidents]
+        self._next_send = {}    # recipient -> earliest time of the next mail
+        self._retries = []      # heap of (due, seq, attempt, recipient, subject, body, incident_count)
+        self._seq = itertools.count()
+        self._thread = None
+        self._running = False
+        self._server = None
+        self._last_used = 0.0
+        self.metrics = {
+            "incidents_queued": 0, "incidents_dropped": 0, "messages_sent": 0, "digests_sent": 0,
+            "incidents_delivered": 0, "retries": 0, "failed": 0, "connections_opened": 0
+        }
+
+    @property
+    def enabled(self):
+        return bool(utils.SENDER_EMAIL)
+
+    # --- PRODUCER SIDE (request handlers) ---
+    def notify(self, to_email: str, incident: dict):
+        self.notify_many(to_email, [incident])
+
+    def notify_many(self, to_email: str, incidents: list):
+        if not self.enabled or not incidents:
+            return
+        with self._cond:
+            pending = self._pending.setdefault(to_email, [])
+            pending.extend(incidents)
+            self.metrics["incidents_queued"] += len(incidents)
+            overflow = len(pending) - MAIL_MAX_PENDING_PER_RECIPIENT
+            if overflow > 0:
+                del pending[:overflow]
+                self.metrics["incidents_dropped"] += overflow
+            self._ensure_thread()
+            self._cond.notify()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="email-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Sends whatever is pending (ignoring rate limits) and stops the thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- DISPATCHER THREAD ---
+    def _run(self):
+        while True:
+            with self._cond:
+                batch, wait = self._take_due(flush=not self._running)
+                if not batch:
+                    if not self._running and not self._retries:
+                        break
+                    idle = self._server is not None and time.monotonic() - self._last_used > MAIL_IDLE_CLOSE_SECONDS
+                    if not idle:
+                        self._cond.wait(timeout=min(wait, MAIL_IDLE_CLOSE_SECONDS) if self._server else wait)
+                        continue
+            if batch:
+                self._send_batch(batch)
+            else:
+                self._close_connection()
+        self._close_connection()
+
+    def _take_due(self, flush=False):
+        """Returns (messages due now, seconds until the next one is due). Caller holds the lock."""
+        now = time.monotonic()
+        batch, next_due = [], 3600.0
+        while self._retries and len(batch) < MAIL_BATCH_SIZE and (flush or self._retries[0][0] <= now):
+            _, _, attempt, recipient, subject, body, count = heapq.heappop(self._retries)
+            batch.append((attempt, recipient, subject, body, count))
+        if self._retries:
+            next_due = min(next_due, self._retries[0][0] - now)
+
+        for recipient in list(self._pending):
+            allowed_at = self._next_send.get(recipient, 0.0)
+            if not flush and allowed_at > now:
+                next_due = min(next_due, allowed_at - now)
+                continue
+            if len(batch) >= MAIL_BATCH_SIZE:
+                next_due = 0.0
+                break
+            incidents = self._pending.pop(recipient)
+            self._next_send[recipient] = now + self.window
+            if len(incidents) == 1:
+                i = incidents[0]
+                subject, body = utils.build_alert_email(i['reason'], i['location'], i['ip'], is_safe=i['verdict'] != "BLOCK")
+            else:
+                subject, body = utils.build_digest_email(incidents)
+                self.metrics["digests_sent"] += 1
+            batch.append((0, recipient, subject, body, len(incidents)))
+
+        # Forget rate-limit windows that have expired so the dict stays bounded
+        if len(self._next_send) > 1024:
+            self._next_send = {r: t for r, t in self._next_send.items() if t > now}
+        return batch, max(0.0, next_due)
+
+    def _send_batch(self, batch):
+        for attempt, recipient, subject, body, count in batch:
+            try:
+                if self._server is None:
+                    self._server = self._connect()
+                    self.metrics["connections_opened"] += 1
+                self._server.send_message(utils.build_message(recipient, subject, body))
+                self._last_used = time.monotonic()
+                self.metrics["messages_sent"] += 1
+                self.metrics["incidents_delivered"] += count
+            except Exception as e:
+                # The connection may be half-dead: rebuild it on the next attempt
+                self._close_connection()
+                self._schedule_retry(attempt, recipient, subject, body, count, e)
+
+    def _schedule_retry(self, attempt, recipient, subject, body, count, error):
+        if attempt >= MAIL_MAX_RETRIES:
+            self.metrics["failed"] += 1
+            print(f"❌ Email to {recipient} failed after {attempt + 1} attempts: {error}")
+            return
+        delay = MAIL_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+        print(f"⚠️ Email to {recipient} failed ({error}), retrying in {delay:.1f}s")
+        self.metrics["retries"] += 1
+        with self._cond:
+            heapq.heappush(self._retries, (time.monotonic() + delay, next(self._seq), attempt + 1, recipient, subject, body, count))
+
+    def _close_connection(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+    def stats(self):
+        with self._cond:
+            return {
+                **self.metrics, "enabled": self.enabled, "connected": self._server is not None,
+                "pending_recipients": len(self._pending),
+                "pending_incidents": sum(len(p) for p in self._pending.values()),
+                "pending_retries": len(self._retries)
+            }
+
+email_dispatcher = EmailDispatcher()
+
+# --- LOCAL SMTP CHECK ---
+# Usage (from backend/): python -m app.services.mailer   (needs `pip install aiosmtpd`)
+if __name__ == "__main__":
+    from aiosmtpd.controller import Controller
+
+    class Inbox:
+        def __init__(self): self.messages, self.sessions = [], set()
+        async def handle_DATA(self, server, session, envelope):
+            self.sessions.add(id(session))
+            self.messages.append((envelope.rcpt_tos[0], envelope.content))
+            return "250 OK"
+
+    inbox = Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=8025)
+    controller.start()
+    utils.SENDER_EMAIL = "alerts@securewatch.local"
+
+    flaky = {"failures": 1}
+    def connect():
+        if flaky["failures"]:
+            flaky["failures"] -= 1
+            raise ConnectionRefusedError("simulated outage")
+        return smtplib.SMTP("127.0.0.1", 8025)
+
+    MAIL_RETRY_BACKOFF_SECONDS = 0.1
+    dispatcher = EmailDispatcher(window=0.5, connect=connect)
+    incident = {"time": "Jan 01, 09:00 AM", "reason": "🤖 Automated Bot Behavior Detected", "location": "Beijing, China",
+                "ip": "203.0.113.89", "status": "Blocked", "verdict": "BLOCK"}
+    started = time.perf_counter()
+    for n in range(500):
+        dispatcher.notify("victim@example.com", dict(incident))
+    dispatcher.notify("other@example.com", dict(incident, verdict="ALLOW", status="Success"))
+    time.sleep(1.5)
+    dispatcher.stop()
+    controller.stop()
+
+    per_recipient = {}
+    for recipient, _ in inbox.messages:
+        per_recipient[recipient] = per_recipient.get(recipient, 0) + 1
+    print(f"   {len(inbox.messages)} mails over {len(inbox.sessions)} SMTP session(s) in {time.perf_counter() - started:.2f}s: {per_recipient}")
+    print(f"   {dispatcher.stats()}")
+    ok = dispatcher.metrics["incidents_delivered"] == 501 and len(inbox.messages) <= 3 and dispatcher.metrics["retries"] == 1
+    print("✅ 501 incidents delivered as a handful of mails" if ok else "❌ Unexpected delivery pattern")
@@ -0,0 +1,155 @@
+import json
+import numpy as np
+
+# --- FLATTENED XGBOOST META-MODEL ---
+# research/phase2 trains an XGBoost classifier that fuses the four model scores
+# (score_if, score_ae, score_lstm, network_risk_score) into one fraud probability.
+# Its JSON dump is packed into contiguous node arrays, the same way
+# iforest_scorer flattens the IsolationForest, so the backend evaluates all trees
+# for a whole batch with a few NumPy steps and never imports xgboost.
+
+FEATURE_NAMES = ("score_if", "score_ae", "score_lstm", "network_risk_score")
+# Rows are scored in blocks so the (rows x trees) working set stays cache-resident
+SCORE_BLOCK_ROWS = 256
+
+def _parse_base_score(value):
+    # Stored as "5E-1" by xgboost 1.x/2.x and as "[5E-1]" by 3.x
+    return float(str(value).strip("[]").split(",")[0])
+
+class FlatBoostedTrees:
+    def __init__(self, feature, threshold, default_left, left, right, value, roots, max_depth, base_margin, feature_names):
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.stack([left, right], axis=1).ravel()
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.base_margin = base_margin
+        self.feature_names = feature_names
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path) as f:
+            model = json.load(f)
+        learner = model["learner"]
+        objective = learner["objective"]["name"]
+        booster = learner["gradient_booster"]
+        if objective != "binary:logistic" or booster["name"] != "gbtree":
+            raise ValueError(f"{path}: only binary:logistic gbtree models are supported, got {objective} / {booster['name']}")
+
+        features, thresholds, defaults, lefts, rights, values, roots = [], [], [], [], [], [], []
+        max_depth = 0
+        base = 0
+        for tree in booster["model"]["trees"]:
+            if any(tree["split_type"]):
+                raise ValueError(f"{path}: categorical splits are not supported")
+            left = np.asarray(tree["left_children"], dtype=np.intp)
+            right = np.asarray(tree["right_children"], dtype=np.intp)
+            n = len(left)
+            is_leaf = left == -1
+
+            # Children always have larger ids than their parent, so depths resolve in one pass
+            depth = np.zeros(n, dtype=np.int64)
+            for node in np.flatnonzero(~is_leaf):
+                depth[left[node]] = depth[node] + 1
+                depth[right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+
+            local = np.arange(n)
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            # Leaves point at themselves so extra descent steps are no-ops; their
+            # split_conditions entry holds the leaf value
+            lefts.append(np.where(is_leaf, local, left) + base)
+            rights.append(np.where(is_leaf, local, right) + base)
+            features.append(np.where(is_leaf, 0, tree["split_indices"]))
+            thresholds.append(np.where(is_leaf, np.inf, conditions))
+            defaults.append(np.asarray(tree["default_left"], dtype=bool) | is_leaf)
+            values.append(np.where(is_leaf, conditions, 0.0))
+            roots.append(base)
+            base += n
+
+        base_score = _parse_base_score(learner["learner_model_param"]["base_score"])
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float32),
+            default_left=np.concatenate(defaults),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            # binary:logistic stores base_score as a probability; trees add to its logit
+            base_margin=float(np.log(base_score / (1.0 - base_score))),
+            feature_names=tuple(learner.get("feature_names") or FEATURE_NAMES),
+        )
+
+    def margin(self, X):
+        # XGBoost compares float32 features against float32 split values
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        margins = np.empty(len(X))
+        for start in range(0, len(X), SCORE_BLOCK_ROWS):
+            margins[start:start + SCORE_BLOCK_ROWS] = self._leaf_sums(X[start:start + SCORE_BLOCK_ROWS])
+        return self.base_margin + margins
+
+    def _leaf_sums(self, X):
+        flat_x = X.ravel()
+        has_missing = bool(np.isnan(flat_x).any())
+        row_base = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = np.take(flat_x, row_base + np.take(self.feature, node))
+            go_left = x < np.take(self.threshold, node)
+            if has_missing:
+                # Missing values follow the node's default direction
+                go_left |= np.isnan(x) & np.take(self.default_left, node)
+            node = np.take(self.children, 2 * node + ~go_left)
+        return np.take(self.value, node).sum(axis=1, dtype=np.float64)
+
+    def predict_proba(self, X):
+        """Fraud probability per row; columns follow feature_names."""
+        return 1.0 / (1.0 + np.exp(-self.margin(X)))
+
+# --- PARITY CHECK & BENCHMARK ---
+# Usage (from backend/): python -m app.services.meta_fusion   (parity needs `pip install xgboost`)
+if __name__ == "__main__":
+    import os
+    import time
+
+    path = os.path.join(os.getcwd(), "ml_artifacts", "model_risk_engine.json")
+    flat = FlatBoostedTrees.from_json(path)
+    rng = np.random.default_rng(42)
+    n = 4096
+    # Shaped like the real inputs: binary iForest flag, raw autoencoder MSE, probabilities
+    X = np.column_stack([
+        rng.integers(0, 2, n).astype(float), rng.exponential(0.2, n), rng.random(n), rng.random(n) ** 3
+    ])
+    X[rng.random(X.shape) < 0.02] = np.nan
+
+    try:
+        import xgboost as xgb
+        booster = xgb.Booster(model_file=path)
+        reference = booster.predict(xgb.DMatrix(X, feature_names=list(flat.feature_names)))
+        max_err = float(np.max(np.abs(reference - flat.predict_proba(X))))
+        status = "✅" if max_err < 1e-5 else "❌"
+        print(f"{status} predict max |xgboost - flat| = {max_err:.2e} over {n} rows")
+    except ImportError:
+        booster = None
+        print("⚠️ xgboost not installed; skipping parity check")
+
+    for batch_size in (1, 32, 4096):
+        batch = X[:batch_size]
+        repeats = max(5, 2000 // batch_size)
+        start = time.perf_counter()
+        for _ in range(repeats): flat.predict_proba(batch)
+        flat_us = (time.perf_counter() - start) / repeats * 1e6
+        line = f"   batch {batch_size:>5}: flat {flat_us:>9.0f}us"
+        if booster is not None:
+            start = time.perf_counter()
+            for _ in range(repeats): booster.predict(xgb.DMatrix(batch, feature_names=list(flat.feature_names)))
+            xgb_us = (time.perf_counter() - start) / repeats * 1e6
+            line += f" | xgboost {xgb_us:>9.0f}us"
+        print(line)
@@ -0,0 +1,270 @@
+import os
+import time
+import threading
+from contextvars import ContextVar
+
+# --- CONFIGURATION ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Requests carrying this header get a Server-Timing header with their per-stage breakdown
+METRICS_DEBUG_HEADER = os.getenv("METRICS_DEBUG_HEADER", "X-Debug-Timing")
+
+# --- HDR-STYLE BUCKETS ---
+# Latencies are recorded in whole microseconds. Values below 2^SUB_BUCKET_BITS get
+# a bucket each; above that every power of two is split into 2^SUB_BUCKET_BITS
+# equal sub-buckets, so the relative error stays under 25% from 1us to ~67s and
+# the bucket index is a bit_length() and a shift, no search.
+SUB_BUCKET_BITS = 2
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_EXPONENT = 26
+BUCKETS = (MAX_EXPONENT - SUB_BUCKET_BITS + 2) * SUB_BUCKETS
+
+def bucket_index(micros: int):
+    if micros < SUB_BUCKETS:
+        return max(micros, 0)
+    exponent = micros.bit_length() - 1
+    index = (exponent - SUB_BUCKET_BITS + 1) * SUB_BUCKETS + ((micros >> (exponent - SUB_BUCKET_BITS)) & (SUB_BUCKETS - 1))
+    return min(index, BUCKETS - 1)
+
+# Precomputed indexes for everything under ~65ms, which is nearly every stage
+_TABLE_SIZE = 1 << 16
+_BUCKET_OF = [bucket_index(micros) for micros in range(_TABLE_SIZE)]
+
+def bucket_upper_bound(index: int):
+    """Exclusive upper bound (microseconds) of a bucket."""
+    if index < SUB_BUCKETS:
+        return index + 1
+    exponent = index // SUB_BUCKETS + SUB_BUCKET_BITS - 1
+    width = 1 << (exponent - SUB_BUCKET_BITS)
+    return (SUB_BUCKETS + index % SUB_BUCKETS) * width + width
+
+class Histogram:
+    """Latency histogram with one shard per recording thread.
+
+    A thread only ever writes its own shard (a plain list: bucket counts, then the
+    running sum), so recording takes no lock; readers add the shards up."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _new_shard(self):
+        shard = self._local.shard = [0] * (BUCKETS + 1)
+        with self._lock:
+            self._shards.append(shard)
+        return shard
+
+    def observe(self, micros: int):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[_BUCKET_OF[micros] if micros < _TABLE_SIZE else bucket_index(micros)] += 1
+        shard[BUCKETS] += micros
+
+    def snapshot(self):
+        """Returns (bucket counts, count, sum in microseconds)."""
+        with self._lock:
+            shards = list(self._shards)
+        counts = [0] * BUCKETS
+        total = 0
+        for shard in shards:
+            for i, c in enumerate(shard[:BUCKETS]):
+                if c: counts[i] += c
+            total += shard[BUCKETS]
+        return counts, sum(counts), total
+
+    @staticmethod
+    def percentile(counts, count, q):
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                return float(bucket_upper_bound(i))
+        return float(bucket_upper_bound(BUCKETS - 1))
+
+class Counter:
+    """Monotonic counter with per-thread shards, like Histogram."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = [0]
+            with self._lock:
+                self._shards.append(shard)
+        shard[0] += amount
+
+    def value(self):
+        with self._lock:
+            return sum(shard[0] for shard in self._shards)
+
+class _StageTimer:
+    __slots__ = ("metrics", "stage", "started")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter_ns() - self.started)
+        return False
+
+class _NoopTimer:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NOOP = _NoopTimer()
+
+# Per-request stage timings (only set while a debug-header request is being handled)
+_request_timings = ContextVar("request_timings", default=None)
+
+class Metrics:
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._stages = {}     # stage -> Histogram
+        self._counters = {}   # (name, label value) -> Counter
+        self._lock = threading.Lock()
+
+    # --- RECORDING ---
+    def stage(self, name: str):
+        """Context manager timing one stage: `with metrics.stage("lstm"): ...`"""
+        return _StageTimer(self, name) if self.enabled else _NOOP
+
+    def observe(self, stage: str, nanos: int):
+        if not self.enabled:
+            return
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(stage, Histogram())
+        histogram.observe(nanos // 1000)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0) + nanos
+
+    def count(self, name: str, amount: int = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        counter = self._counters.get(key)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(key, Counter())
+        counter.inc(amount)
+
+    # --- PER-REQUEST BREAKDOWN ---
+    def begin_request(self):
+        """Starts collecting this request's stage timings; returns the dict they land in."""
+        timings = {}
+        _request_timings.set(timings)
+        return timings
+
+    def request_timings(self):
+        """The current request's timings dict, or None when it did not ask for them."""
+        return _request_timings.get()
+
+    def begin_batch(self, requests_timings):
+        """Starts collecting the stage timings of work shared by several requests (a micro-batch),
+        if any of their timings dicts is set; pass the result to end_batch once it is done."""
+        timings = {} if any(t is not None for t in requests_timings) else None
+        _request_timings.set(timings)
+        return timings
+
+    @staticmethod
+    def end_batch(batch_timings, requests_timings):
+        """Adds the batch's stage times to each request that collects timings."""
+        if not batch_timings:
+            return
+        for timings in requests_timings:
+            if timings is None:
+                continue
+            for stage, nanos in batch_timings.items():
+                timings[stage] = timings.get(stage, 0) + nanos
+
+    @staticmethod
+    def server_timing(timings):
+        return ", ".join(f"{stage};dur={nanos / 1e6:.3f}" for stage, nanos in timings.items())
+
+    # --- EXPORT ---
+    def render_prometheus(self):
+        lines = [
+            "# HELP securewatch_stage_latency_seconds Latency of each login scoring stage",
+            "# TYPE securewatch_stage_latency_seconds histogram",
+        ]
+        for stage, histogram in sorted(self._stages.items()):
+            counts, count, total = histogram.snapshot()
+            # Exported at power-of-two boundaries (sub-buckets line up with them), so
+            # the bucket set is the same for every stage and scrape
+            cumulative = 0
+            for i, c in enumerate(counts):
+                cumulative += c
+                upper = bucket_upper_bound(i)
+                if upper & (upper - 1) == 0 and i < BUCKETS - 1:
+                    lines.append(f'securewatch_stage_latency_seconds_bucket{{stage="{stage}",le="{upper / 1e6}"}} {cumulative}')
+            lines.append(f'securewatch_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'securewatch_stage_latency_seconds_sum{{stage="{stage}"}} {total / 1e6:.6f}')
+            lines.append(f'securewatch_stage_latency_seconds_count{{stage="{stage}"}} {count}')
+
+        current = None
+        for (name, labels), counter in sorted(self._counters.items()):
+            if name != current:
+                lines.append(f"# TYPE {name} counter")
+                current = name
+            label_text = "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+            lines.append(f"{name}{label_text} {counter.value()}")
+        return "\n".join(lines) + "\n"
+
+    def stats(self):
+        """Per-stage count and p50/p90/p99 in milliseconds (bucket upper bounds)."""
+        result = {}
+        for stage, histogram in sorted(self._stages.items()):
+            counts, count, total = histogram.snapshot()
+            result[stage] = {
+                "count": count, "mean_ms": round(total / count / 1000, 3) if count else 0.0,
+                **{f"p{int(q * 100)}_ms": Histogram.percentile(counts, count, q) / 1000 for q in (0.5, 0.9, 0.99)}
+            }
+        return result
+
+metrics = Metrics()
+
+# --- OVERHEAD CHECK ---
+# Usage (from backend/): python -m app.services.metrics
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    m = Metrics(enabled=True)
+    for micros in (0, 3, 4, 7, 8, 1000, 123_456):
+        i = bucket_index(micros)
+        assert (bucket_upper_bound(i - 1) if i else 0) <= micros < bucket_upper_bound(i), micros
+
+    n = 200_000
+    started = time.perf_counter()
+    for _ in range(n):
+        with m.stage("noop"): pass
+    per_call_ns = (time.perf_counter() - started) / n * 1e9
+    print(f"   stage timer: {per_call_ns:.0f}ns per use")
+
+    def hammer(_):
+        for k in range(n // 4):
+            m.observe("threads", (k % 5000) * 1000)
+            m.count("securewatch_logins_total", verdict="ALLOW")
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(hammer, range(4)))
+    snapshot = m.stats()["threads"]
+    ok = snapshot["count"] == n and m._counters[("securewatch_logins_total", (("verdict", "ALLOW"),))].value() == n
+    print(f"{'✅' if ok else '❌'} 4 threads x {n // 4} observations, none lost: {snapshot}")
+    print(m.render_prometheus().splitlines()[-1])
@@ -0,0 +1,143 @@
+import json
+import numpy as np
+import h5py
+
+# --- PURE-NUMPY INFERENCE FOR THE KERAS .h5 MODELS ---
+# Both production networks are tiny (a 4-8-4-2-4-8-4 dense autoencoder and a
+# 9x32 embedding + 64-unit LSTM), so evaluating them directly with NumPy is
+# far cheaper than a TensorFlow .predict() call and avoids importing TF at all.
+
+def _sigmoid(x):
+    # tanh form avoids exp() overflow for large negative inputs
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+}
+
+class DenseLayer:
+    def __init__(self, kernel, bias, activation):
+        self.kernel = kernel
+        self.bias = bias
+        self.activation = ACTIVATIONS[activation]
+
+    def __call__(self, x):
+        return self.activation(x @ self.kernel + self.bias)
+
+class EmbeddingLayer:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def __call__(self, x):
+        return self.embeddings[x.astype(np.int64)]
+
+class LSTMLayer:
+    """Keras LSTM (gate order i, f, c, o) returning the last hidden state."""
+    def __init__(self, kernel, recurrent_kernel, bias, activation="tanh", recurrent_activation="sigmoid"):
+        self.kernel = kernel
+        self.recurrent_kernel = recurrent_kernel
+        self.bias = bias
+        self.units = recurrent_kernel.shape[0]
+        self.activation = ACTIVATIONS[activation]
+        self.recurrent_activation = ACTIVATIONS[recurrent_activation]
+
+    def __call__(self, x):
+        # x: (batch, timesteps, features). Input projections for every step at once,
+        # unless a preceding embedding already emits projected rows (see fold_embeddings).
+        projected = x if self.kernel is None else x @ self.kernel + self.bias
+        h = np.zeros((x.shape[0], self.units), dtype=x.dtype)
+        c = np.zeros_like(h)
+        u = self.units
+        for t in range(x.shape[1]):
+            z = projected[:, t] + h @ self.recurrent_kernel
+            i = self.recurrent_activation(z[:, :u])
+            f = self.recurrent_activation(z[:, u:2 * u])
+            g = self.activation(z[:, 2 * u:3 * u])
+            o = self.recurrent_activation(z[:, 3 * u:])
+            c = f * c + i * g
+            h = o * self.activation(c)
+        return h
+
+class NumpySequential:
+    """Drop-in replacement for a loaded Keras Sequential model (inference only)."""
+    def __init__(self, layers):
+        self.layers = self.fold_embeddings(layers)
+
+    @staticmethod
+    def fold_embeddings(layers):
+        # Embedding -> LSTM: precompute (vocab, 4 * units) = embeddings @ kernel + bias
+        # so the LSTM input projection becomes a table lookup.
+        for prev, layer in zip(layers, layers[1:]):
+            if isinstance(prev, EmbeddingLayer) and isinstance(layer, LSTMLayer) and layer.kernel is not None:
+                prev.embeddings = prev.embeddings @ layer.kernel + layer.bias
+                layer.kernel = None
+        return layers
+
+    @classmethod
+    def from_h5(cls, path):
+        with h5py.File(path, "r") as f:
+            config = json.loads(f.attrs["model_config"])
+            weights = f["model_weights"]
+            layers = []
+            for layer in config["config"]["layers"]:
+                kind, cfg = layer["class_name"], layer["config"]
+                if kind in ("InputLayer", "Dropout"):
+                    continue
+                group = weights[cfg["name"]]
+                params = {
+                    name.decode("utf8") if isinstance(name, bytes) else name: np.asarray(group[name], dtype=np.float32)
+                    for name in group.attrs["weight_names"]
+                }
+                by_suffix = {key.rsplit("/", 1)[-1].split(":")[0]: value for key, value in params.items()}
+                if kind == "Dense":
+                    layers.append(DenseLayer(by_suffix["kernel"], by_suffix.get("bias", 0.0), cfg.get("activation", "linear")))
+                elif kind == "Embedding":
+                    layers.append(EmbeddingLayer(by_suffix["embeddings"]))
+                elif kind == "LSTM":
+                    if cfg.get("return_sequences") or cfg.get("go_backwards"):
+                        raise ValueError(f"Unsupported LSTM configuration in {path}")
+                    layers.append(LSTMLayer(
+                        by_suffix["kernel"], by_suffix["recurrent_kernel"], by_suffix.get("bias", 0.0),
+                        cfg.get("activation", "tanh"), cfg.get("recurrent_activation", "sigmoid")
+                    ))
+                else:
+                    raise ValueError(f"Unsupported layer type '{kind}' in {path}")
+        return cls(layers)
+
+    def predict(self, x, verbose=0):
+        out = np.asarray(x, dtype=np.float32)
+        for layer in self.layers:
+            out = layer(out)
+        return out
+
+# --- PARITY CHECK ---
+# Usage (from backend/): python -m app.services.numpy_models
+if __name__ == "__main__":
+    import os
+    import time
+    import tensorflow as tf
+
+    artifacts_dir = os.path.join(os.getcwd(), "ml_artifacts")
+    rng = np.random.default_rng(42)
+    inputs = {
+        "model_autoencoder.h5": rng.random((4096, 4)).astype(np.float32),
+        "model_lstm.h5": rng.integers(0, 9, size=(4096, 10)).astype(np.float32),
+    }
+    for filename, x in inputs.items():
+        path = os.path.join(artifacts_dir, filename)
+        keras_model = tf.keras.models.load_model(path, compile=False)
+        numpy_model = NumpySequential.from_h5(path)
+        max_err = float(np.max(np.abs(keras_model.predict(x, verbose=0) - numpy_model.predict(x))))
+
+        start = time.perf_counter()
+        for _ in range(200): keras_model.predict(x[:1], verbose=0)
+        keras_us = (time.perf_counter() - start) / 200 * 1e6
+        start = time.perf_counter()
+        for _ in range(200): numpy_model.predict(x[:1])
+        numpy_us = (time.perf_counter() - start) / 200 * 1e6
+
+        status = "✅" if max_err < 1e-5 else "❌"
+        print(f"{status} {filename}: max |keras - numpy| = {max_err:.2e} | single-row keras {keras_us:.0f}us vs numpy {numpy_us:.0f}us")
@@ -0,0 +1,157 @@
+import os
+import json
+import asyncio
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from app.utils import render_compliance_report
+from .workers import worker_pools
+
+# --- CONFIGURATION ---
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "securewatch-reports"))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Recently served PDFs kept in memory as well
+REPORT_MEMORY_CACHE_ITEMS = int(os.getenv("REPORT_MEMORY_CACHE_ITEMS", "64"))
+# FPDF is pure Python, so rendering runs in separate processes rather than threads
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_MAX_BATCH = int(os.getenv("REPORT_MAX_BATCH", "500"))
+
+# Fields that end up in the PDF; any change to them produces a new cache entry
+REPORT_FIELDS = ("id", "time", "location", "ip", "status", "ai_summary")
+
+def content_hash(incidents):
+    payload = json.dumps([[i.get(f) for f in REPORT_FIELDS] for i in incidents], default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ReportService:
+    def __init__(self, cache_dir: str = REPORT_CACHE_DIR, max_bytes: int = REPORT_CACHE_MAX_BYTES,
+                 memory_items: int = REPORT_MEMORY_CACHE_ITEMS, workers: int = REPORT_WORKERS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_items = max(0, memory_items)
+        self.workers = max(1, workers)
+        self._pool = None
+        self._memory = OrderedDict()   # cache name -> bytes
+        self._disk = None              # cache name -> size, oldest first
+        self._disk_bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "rendered": 0, "evicted": 0}
+
+    @staticmethod
+    def cache_name(incidents):
+        prefix = incidents[0]["id"][:8] if len(incidents) == 1 else f"batch{len(incidents)}"
+        return f"{prefix}-{content_hash(incidents)[:24]}.pdf"
+
+    # --- DISK CACHE ---
+    def _scan_disk(self):
+        """Indexes files left by earlier runs, least recently used first."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pdf") and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        self._disk = OrderedDict((name, size) for _, name, size in sorted(entries))
+        self._disk_bytes = sum(self._disk.values())
+
+    def _disk_path(self, name):
+        with self._lock:
+            if self._disk is None: self._scan_disk()
+            if name not in self._disk: return None
+            self._disk.move_to_end(name)
+        path = os.path.join(self.cache_dir, name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock: self._disk_bytes -= self._disk.pop(name, 0)
+            return None
+        return path
+
+    def _store_disk(self, name, data):
+        with self._lock:
+            if self._disk is None: self._scan_disk()
+        path = os.path.join(self.cache_dir, name)
+        # Written under a temporary name so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._disk_bytes += len(data) - self._disk.pop(name, 0)
+            self._disk[name] = len(data)
+            while self._disk_bytes > self.max_bytes and len(self._disk) > 1:
+                old_name, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                self.counters["evicted"] += 1
+                try:
+                    os.remove(os.path.join(self.cache_dir, old_name))
+                except FileNotFoundError:
+                    pass
+
+    def _remember(self, name, data):
+        if not self.memory_items: return
+        self._memory[name] = data
+        self._memory.move_to_end(name)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    # --- RENDERING ---
+    def _executor(self):
+        if self._pool is None:
+            # Spawned, not forked: the server process holds model, pool and event-loop threads
+            # (and possibly their locks), which a forked child would inherit mid-state
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def get(self, incidents):
+        """Returns ("bytes", data) or ("file", path) for a PDF of the given log entries."""
+        name = self.cache_name(incidents)
+        data = self._memory.get(name)
+        if data is not None:
+            self._memory.move_to_end(name)
+            self.counters["memory_hits"] += 1
+            return "bytes", data
+
+        path = await worker_pools.run_io(self._disk_path, name)
+        if path is not None:
+            self.counters["disk_hits"] += 1
+            return "file", path
+
+        # Identical requests arriving together share one render
+        task = self._inflight.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._render(name, incidents))
+            self._inflight[name] = task
+            task.add_done_callback(lambda _: self._inflight.pop(name, None))
+        return "bytes", await asyncio.shield(task)
+
+    async def _render(self, name, incidents):
+        loop = asyncio.get_running_loop()
+        # Plain dicts only: entries may carry objects the worker process cannot unpickle
+        payload = [{f: i.get(f) for f in REPORT_FIELDS} for i in incidents]
+        data = await loop.run_in_executor(self._executor(), render_compliance_report, payload)
+        self.counters["rendered"] += 1
+        self._remember(name, data)
+        try:
+            await worker_pools.run_io(self._store_disk, name, data)
+        except OSError as e:
+            print(f"⚠️ Report cache write failed: {e}")
+        return data
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self):
+        return {
+            **self.counters, "memory_cached": len(self._memory),
+            "disk_cached": len(self._disk) if self._disk is not None else None,
+            "disk_bytes": self._disk_bytes, "max_bytes": self.max_bytes, "cache_dir": self.cache_dir
+        }
+
+report_service = ReportService()
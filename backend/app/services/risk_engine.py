@@ -0,0 +1,40 @@
+import os
+
+# --- RISK FUSION (shared by the API endpoints and offline scoring) ---
+# "rules": hand-tuned overrides + equal weighting of the four model scores
+# "learned": the research/phase2 XGBoost meta-model (ml_artifacts/model_risk_engine.json),
+#            evaluated by app.services.meta_fusion and passed in as scores['meta']
+RISK_FUSION = os.getenv("RISK_FUSION", "rules").lower()
+
+def assess_risk(user_id: str, features: list, sequence_data: list, scores: dict):
+    """Combines model scores with the rule overrides. Returns (final_risk, reason, verdict)."""
+    final_risk = 0.0
+    reason = "✅ Normal Activity"
+
+    if features[0] == 0.1: final_risk = 0.01; reason = "✅ Verified Safe"
+    elif scores['network'] > 0.8: final_risk = 0.99; reason = "🕸️ Linked to Known Fraud Ring"
+    elif (len(sequence_data) > 2 and sequence_data[0] == sequence_data[1]) or scores['lstm'] > 0.8: final_risk = 0.95; reason = "🤖 Automated Bot Behavior Detected"
+    elif features[0] == 100.0 or scores['iso'] > 0.7: final_risk = 0.90; reason = "🌍 Impossible Travel Detected"
+    else: final_risk = (scores['iso']*0.25 + scores['ae']*0.25 + scores['lstm']*0.25 + scores['network']*0.25)
+    if 'meta' in scores and reason not in ("✅ Verified Safe", "🕸️ Linked to Known Fraud Ring"):
+        # The meta-model replaces the heuristics and the weighting (its training data had no confirmed
+        # fraud rings, so those stay a hard override); a rule only remains the reason if the model agrees
+        final_risk = scores['meta']
+        if final_risk <= 0.50: reason = "✅ Normal Activity"
+    # Only a weighted/meta score gets the cumulative label; a rule that fired stays the reason
+    if final_risk > 0.7 and reason == "✅ Normal Activity": reason = "⚠️ High Cumulative Risk"
+
+    verdict = "ALLOW"
+    if final_risk > 0.80: verdict = "BLOCK"
+    elif final_risk > 0.50: verdict = "MFA_CHALLENGE"
+
+    return final_risk, reason, verdict
+
+def is_attack(final_risk: float):
+    return final_risk > 0.80
+
+def attack_origin(reason: str):
+    """Demo attribution (location, ip, device) shown for blocked attacks."""
+    if "Fraud" in reason: return "Lagos, Nigeria", "198.51.100.78", "Unknown Android"
+    elif "Bot" in reason: return "Beijing, China", "203.0.113.89", "Headless Chrome"
+    else: return "Moscow, Russia", "188.44.22.1", "Firefox / Linux"
@@ -0,0 +1,192 @@
+import os
+import sys
+import mmap
+import time
+import struct
+import hashlib
+import tempfile
+import threading
+from bisect import bisect_left
+import numpy as np
+
+# --- NETWORK RISK INDEX ---
+# network_risk_scores.csv is compiled into one binary file:
+#   header  b"SWRI" | version u32 | count u64
+#   keys    uint64[count]   blake2b-64 of user_id, sorted
+#   scores  float32[count]
+# The file is memory-mapped, so every worker process shares the same page-cache
+# pages, and lookups are a binary search over the keys. A new file is published
+# with os.replace and picked up by running processes on their next check.
+MAGIC = b"SWRI"
+VERSION = 1
+HEADER = struct.Struct("<4sIQ")
+# How often readers stat() the file for a newly published version
+RISK_INDEX_CHECK_SECONDS = float(os.getenv("RISK_INDEX_CHECK_SECONDS", "5"))
+
+def user_key(user_id) -> int:
+    return int.from_bytes(hashlib.blake2b(str(user_id).encode(), digest_size=8).digest(), "little")
+
+def user_keys(user_ids):
+    return np.fromiter((user_key(u) for u in user_ids), dtype=np.uint64, count=len(user_ids))
+
+def build_index(csv_path: str, out_path: str, chunk_size: int = 1_000_000):
+    """Compiles a user_id,network_risk_score CSV into the index and atomically publishes it."""
+    import pandas as pd
+    keys, scores = [], []
+    for chunk in pd.read_csv(csv_path, usecols=["user_id", "network_risk_score"], dtype={"user_id": str}, chunksize=chunk_size):
+        keys.append(user_keys(chunk["user_id"].tolist()))
+        scores.append(chunk["network_risk_score"].to_numpy(dtype=np.float32))
+    keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.uint64)
+    scores = np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
+
+    # Stable sort, then keep the last row of each user (later rows win, like the old dict)
+    order = np.argsort(keys, kind="stable")
+    keys, scores = keys[order], scores[order]
+    last = np.ones(len(keys), dtype=bool)
+    last[:-1] = keys[1:] != keys[:-1]
+    keys, scores = keys[last], scores[last]
+
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(keys)))
+            f.write(keys.astype("<u8").tobytes())
+            f.write(scores.astype("<f4").tobytes())
+        os.replace(tmp, out_path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    return len(keys)
+
+class _Snapshot:
+    __slots__ = ("keys", "scores", "key_view", "score_view", "identity")
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, count = HEADER.unpack(f.read(HEADER.size))
+            identity = os.fstat(f.fileno())
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if count else bytes(HEADER.size)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a network risk index (v{VERSION})")
+        self.identity = (identity.st_ino, identity.st_mtime_ns, identity.st_size)
+        # NumPy views for batched lookups...
+        self.keys = np.frombuffer(mapped, dtype="<u8", count=count, offset=HEADER.size)
+        self.scores = np.frombuffer(mapped, dtype="<f4", count=count, offset=HEADER.size + 8 * count)
+        # ...and plain memoryviews for single ones: bisect over them avoids NumPy's per-call overhead
+        if sys.byteorder == "little":
+            self.key_view = memoryview(mapped)[HEADER.size:HEADER.size + 8 * count].cast("Q")
+            self.score_view = memoryview(mapped)[HEADER.size + 8 * count:HEADER.size + 12 * count].cast("f")
+        else:
+            self.key_view, self.score_view = self.keys.tolist(), self.scores.tolist()
+
+class NetworkRiskIndex:
+    def __init__(self, path: str, check_seconds: float = RISK_INDEX_CHECK_SECONDS):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._snapshot = _Snapshot(path)
+        self._next_check = time.monotonic() + check_seconds
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def __len__(self):
+        return len(self._snapshot.keys)
+
+    def _current(self):
+        if time.monotonic() >= self._next_check:
+            self._maybe_reload()
+        return self._snapshot
+
+    def _maybe_reload(self):
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_seconds
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            if (stat.st_ino, stat.st_mtime_ns, stat.st_size) != self._snapshot.identity:
+                try:
+                    # Readers holding the old snapshot keep a valid mapping of the replaced file
+                    self._snapshot = _Snapshot(self.path)
+                    self.reloads += 1
+                    print(f"🔄 Network risk index reloaded: {len(self._snapshot.keys)} users")
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Network risk index reload failed: {e}")
+
+    def get(self, user_id, default: float = 0.0):
+        snapshot = self._current()
+        key = user_key(user_id)
+        keys = snapshot.key_view
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return snapshot.score_view[i]
+        return default
+
+    def lookup_many(self, user_ids, default: float = 0.0):
+        snapshot = self._current()
+        if not len(snapshot.keys):
+            return np.full(len(user_ids), default, dtype=np.float64)
+        keys = user_keys(user_ids)
+        i = np.minimum(np.searchsorted(snapshot.keys, keys), len(snapshot.keys) - 1)
+        found = snapshot.keys[i] == keys
+        return np.where(found, snapshot.scores[i].astype(np.float64), default)
+
+    def stats(self):
+        return {"path": self.path, "users": len(self), "reloads": self.reloads}
+
+def open_index(artifacts_dir: str, csv_name: str = "network_risk_scores.csv", index_name: str = "network_risk_index.bin"):
+    """Opens the index, (re)building it first when the CSV is newer. Returns None if neither exists."""
+    csv_path = os.path.join(artifacts_dir, csv_name)
+    index_path = os.path.join(artifacts_dir, index_name)
+    if os.path.exists(csv_path) and (not os.path.exists(index_path) or os.path.getmtime(csv_path) > os.path.getmtime(index_path)):
+        count = build_index(csv_path, index_path)
+        print(f"🗂️ Built network risk index: {count} users -> {index_path}")
+    if not os.path.exists(index_path):
+        return None
+    return NetworkRiskIndex(index_path)
+
+# --- BUILD & BENCHMARK ---
+# Usage (from backend/):
+#   python -m app.services.risk_index build ml_artifacts/network_risk_scores.csv ml_artifacts/network_risk_index.bin
+#   python -m app.services.risk_index bench
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "build":
+        started = time.perf_counter()
+        count = build_index(sys.argv[2], sys.argv[3])
+        print(f"✅ {count} users -> {sys.argv[3]} ({os.path.getsize(sys.argv[3]) / 1e6:.1f} MB, {time.perf_counter() - started:.1f}s)")
+    else:
+        import csv
+        import shutil
+        import tracemalloc
+        users = 2_000_000
+        workdir = tempfile.mkdtemp()
+        csv_path, index_path = os.path.join(workdir, "scores.csv"), os.path.join(workdir, "index.bin")
+        rng = np.random.default_rng(0)
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["user_id", "network_risk_score"])
+            writer.writerows((f"user_{n}", s) for n, s in zip(range(users), rng.random(users)))
+
+        started = time.perf_counter()
+        build_index(csv_path, index_path)
+        print(f"   build: {users} users in {time.perf_counter() - started:.1f}s, {os.path.getsize(index_path) / 1e6:.1f} MB on disk")
+
+        tracemalloc.start()
+        with open(csv_path, newline="") as f:
+            scores = {row['user_id']: float(row['network_risk_score']) for row in csv.DictReader(f)}
+        dict_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+        index = NetworkRiskIndex(index_path)
+        probes = [f"user_{n}" for n in rng.integers(0, users * 2, 20_000)]
+        assert all(abs(index.get(u) - scores.get(u, 0.0)) < 1e-6 for u in probes[:2000])
+        assert np.allclose(index.lookup_many(probes), [scores.get(u, 0.0) for u in probes], atol=1e-6)
+
+        started = time.perf_counter()
+        for u in probes: index.get(u)
+        single_us = (time.perf_counter() - started) / len(probes) * 1e6
+        started = time.perf_counter()
+        index.lookup_many(probes)
+        batch_us = (time.perf_counter() - started) / len(probes) * 1e6
+        print(f"   dict: {dict_mb:.0f} MB per process | index: 0 MB private (page cache shared)")
+        print(f"   lookup: {single_us:.2f}us single | {batch_us:.2f}us per user batched")
+        shutil.rmtree(workdir)
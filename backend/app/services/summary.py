@@ -0,0 +1,310 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from .workers import worker_pools
+
+# --- CONFIGURATION ---
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "1024"))
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "3600"))
+# Risk scores are bucketed for the cache key: 10 buckets = 0-9%, 10-19%, ...
+SUMMARY_RISK_BUCKETS = int(os.getenv("SUMMARY_RISK_BUCKETS", "10"))
+SUMMARY_TIMEOUT_SECONDS = float(os.getenv("SUMMARY_TIMEOUT_SECONDS", "2.0"))
+# Consecutive failures that open the breaker, and how long it stays open
+SUMMARY_BREAKER_THRESHOLD = int(os.getenv("SUMMARY_BREAKER_THRESHOLD", "3"))
+SUMMARY_BREAKER_COOLDOWN_SECONDS = float(os.getenv("SUMMARY_BREAKER_COOLDOWN_SECONDS", "60"))
+# Only these verdicts are sent to Gemini; the rest get the offline text
+SUMMARY_GENAI_VERDICTS = set(filter(None, os.getenv("SUMMARY_GENAI_VERDICTS", "BLOCK,MFA_CHALLENGE").split(",")))
+# inline: the verdict waits for the summary | background: the verdict returns with the
+# cached/offline text and the history entry is patched once Gemini answers
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "inline")
+SUMMARY_MAX_BACKGROUND = int(os.getenv("SUMMARY_MAX_BACKGROUND", "64"))
+
+# --- DYNAMIC MODEL LOADER ---
+# Runs on the first summary request (in the I/O pool) rather than at import,
+# so startup neither imports google.generativeai nor waits on list_models().
+def configure_genai():
+    try:
+        if GEMINI_API_KEY:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+
+            # List available models to find the best one
+            print("🤖 Checking Google AI models...")
+            try:
+                available_models = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
+            except:
+                available_models = []
+
+            # Priority Order: Flash -> Pro -> Pro Vision
+            if any("gemini-1.5-flash" in m for m in available_models):
+                chosen_model = "models/gemini-1.5-flash"
+            elif any("gemini-pro" in m for m in available_models):
+                chosen_model = "models/gemini-pro"
+            elif available_models:
+                chosen_model = available_models[0]
+            else:
+                # If list fails, force default
+                chosen_model = "models/gemini-1.5-flash"
+
+            print(f"✅ AI Configured. Target Model: {chosen_model}")
+            return genai.GenerativeModel(chosen_model)
+        else:
+            print("⚠️ No API Key found in .env (Offline Mode Active)")
+    except Exception as e:
+        print(f"⚠️ GenAI Config Warning: {e}")
+    return None
+
+# --- HELPER: FALLBACK TEXT ---
+def _offline_fallback(reason, location, risk_score):
+    if "Impossible" in reason:
+        return f"Velocity check failed. Login from {location} exceeds physical travel limits relative to previous session. Pattern consistent with credential sharing or IP spoofing."
+    elif "Bot" in reason:
+        return f"Non-human interaction detected. Request velocity matches botnet signatures. Confidence: {int(risk_score*100)}%. Recommended Action: IP Blacklist."
+    elif "Fraud" in reason:
+        return f"Graph analysis linked this session to a blacklisted fraud cluster. Device fingerprint matches previous chargeback incidents."
+    else:
+        return "Traffic patterns indicate normal user behavior consistent with historical baselines."
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures -> half-open (one trial call)
+    after `cooldown` seconds -> closed on success, open again on failure."""
+
+    def __init__(self, threshold: int = SUMMARY_BREAKER_THRESHOLD, cooldown: float = SUMMARY_BREAKER_COOLDOWN_SECONDS):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        if self.opened_at is None: return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed": return True
+        if state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.opened_at is None: print(f"🔌 GenAI circuit open after {self.failures} failures, using offline summaries")
+            self.opened_at = time.monotonic()
+
+class SummaryService:
+    def __init__(self, model=None, mode: str = SUMMARY_MODE, cache_size: int = SUMMARY_CACHE_SIZE, ttl_seconds: float = SUMMARY_CACHE_TTL_SECONDS,
+                 timeout: float = SUMMARY_TIMEOUT_SECONDS, breaker: CircuitBreaker = None, verdicts=SUMMARY_GENAI_VERDICTS):
+        # Any object with `async generate_content_async(prompt)` returning `.text` works as the model
+        self.model = model
+        self.configured = model is not None
+        self.background = mode == "background"
+        self.cache_size = max(1, cache_size)
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.verdicts = verdicts
+        self._cache = OrderedDict()   # key -> (expires_at, text)
+        self._inflight = {}           # key -> asyncio.Task
+        self._background = set()
+        self._configure_task = None
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "generated": 0, "failures": 0, "timeouts": 0, "fallbacks": 0, "patched": 0}
+
+    @staticmethod
+    def cache_key(reason, location, risk_score):
+        bucket = min(SUMMARY_RISK_BUCKETS - 1, int(risk_score * SUMMARY_RISK_BUCKETS))
+        return reason, location, bucket
+
+    def cached(self, reason, location, risk_score):
+        key = self.cache_key(reason, location, risk_score)
+        item = self._cache.get(key)
+        if item is None: return None
+        if item[0] < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return item[1]
+
+    def _store(self, key, text):
+        self._cache[key] = (time.monotonic() + self.ttl_seconds, text)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _ensure_model(self, deadline):
+        """Runs configure_genai once. Callers wait for it until `deadline` (loop time; the setup
+        keeps going in the I/O pool for the next caller); a timeout counts against the breaker."""
+        if self.configured: return
+        if self._configure_task is None:
+            self._configure_task = asyncio.ensure_future(worker_pools.run_io(configure_genai))
+        # While the breaker is open nobody waits on a setup that has not finished yet
+        if not self._configure_task.done() and self.breaker.state == "open": return
+        try:
+            remaining = deadline - asyncio.get_running_loop().time()
+            self.model = await asyncio.wait_for(asyncio.shield(self._configure_task), max(0.0, remaining))
+            self.configured = True
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            self.breaker.record_failure()
+            print("ℹ️ GenAI setup still running. Using Offline Backup.")
+
+    async def summarize(self, reason, location, risk_score, verdict=None):
+        """Cached summary, else one (coalesced) Gemini call, else the offline text."""
+        if verdict is not None and verdict not in self.verdicts:
+            return _offline_fallback(reason, location, risk_score)
+        text = self.cached(reason, location, risk_score)
+        if text is not None:
+            self.counters["hits"] += 1
+            return text
+        self.counters["misses"] += 1
+
+        key = self.cache_key(reason, location, risk_score)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._generate(key, reason, location, risk_score))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.counters["coalesced"] += 1
+        # shield: one caller going away must not cancel the call others are waiting on
+        text = await asyncio.shield(task)
+        return text if text is not None else _offline_fallback(reason, location, risk_score)
+
+    async def _generate(self, key, reason, location, risk_score):
+        # One `timeout` budget covers a first-time setup and the Gemini call together
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        await self._ensure_model(deadline)
+
+        # Use fallback if setup failed or is still running, or the breaker is open
+        if not self.model or not self.breaker.allow():
+            self.counters["fallbacks"] += 1
+            return None
+
+        try:
+            prompt = f"Write a 1-sentence security forensic summary for a {reason} event from {location} (Risk: {int(risk_score*100)}%). Explain the threat logic."
+            remaining = deadline - asyncio.get_running_loop().time()
+            response = await asyncio.wait_for(self.model.generate_content_async(prompt), max(0.0, remaining))
+            text = response.text.strip()
+        except Exception as e:
+            self.counters["timeouts" if isinstance(e, asyncio.TimeoutError) else "failures"] += 1
+            self.counters["fallbacks"] += 1
+            self.breaker.record_failure()
+            # CLEAN LOGGING: Don't show scary traceback, just show info
+            print(f"ℹ️ AI API Unavailable ({(str(e) or type(e).__name__)[:50]}...). Using Offline Backup.")
+            return None
+
+        self.breaker.record_success()
+        self.counters["generated"] += 1
+        self._store(key, text)
+        return text
+
+    def fill_later(self, on_ready, reason, location, risk_score, verdict=None):
+        """Background mode: generates the summary off the request path and hands it to
+        on_ready(text), unless it is already cached or not eligible for Gemini."""
+        if verdict is not None and verdict not in self.verdicts: return
+        if self.cached(reason, location, risk_score) is not None: return
+        if len(self._background) >= SUMMARY_MAX_BACKGROUND:
+            self.counters["fallbacks"] += 1
+            return
+
+        async def run():
+            text = await self.summarize(reason, location, risk_score)
+            if text != _offline_fallback(reason, location, risk_score):
+                await on_ready(text)
+                self.counters["patched"] += 1
+
+        task = asyncio.ensure_future(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def stats(self):
+        return {
+            **self.counters, "mode": "background" if self.background else "inline",
+            "cached": len(self._cache), "in_flight": len(self._inflight),
+            "background": len(self._background), "breaker": self.breaker.state
+        }
+
+summary_service = SummaryService()
+
+# --- STUB MODEL CHECK ---
+# Usage (from backend/): python -m app.services.summary
+if __name__ == "__main__":
+    class StubResponse:
+        def __init__(self, text): self.text = text
+
+    class StubModel:
+        def __init__(self, delay=0.05, fail=False):
+            self.delay, self.fail, self.calls = delay, fail, 0
+
+        async def generate_content_async(self, prompt):
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            if self.fail: raise RuntimeError("stub outage")
+            return StubResponse(f" Stub summary #{self.calls} ")
+
+    async def check():
+        stub = StubModel()
+        service = SummaryService(model=stub, breaker=CircuitBreaker(threshold=2, cooldown=0.2), timeout=0.1)
+        texts = await asyncio.gather(*[service.summarize("🌍 Impossible Travel Detected", "Moscow", 0.91) for _ in range(20)])
+        assert stub.calls == 1 and set(texts) == {"Stub summary #1"}, "concurrent identical prompts should coalesce"
+        assert await service.summarize("🌍 Impossible Travel Detected", "Moscow", 0.99) == "Stub summary #1", "same bucket should hit the cache"
+        assert "normal user behavior" in await service.summarize("✅ Normal Activity", "Moscow", 0.01, verdict="ALLOW")
+
+        stub.delay = 0.5
+        for location in ("Lagos", "Lima"):
+            assert "Velocity" in await service.summarize("🌍 Impossible Travel Detected", location, 0.9)
+        assert service.breaker.state == "open" and service.counters["timeouts"] == 2
+        calls = stub.calls
+        await service.summarize("🌍 Impossible Travel Detected", "Oslo", 0.9)
+        assert stub.calls == calls, "open breaker should not call the model"
+
+        stub.delay = 0.01
+        await asyncio.sleep(0.25)
+        assert await service.summarize("🌍 Impossible Travel Detected", "Oslo", 0.9) != _offline_fallback("🌍 Impossible Travel Detected", "Oslo", 0.9)
+        assert service.breaker.state == "closed", "successful trial call should close the breaker"
+
+        patched = []
+        async def on_ready(text): patched.append(text)
+        service.fill_later(on_ready, "🤖 Automated Bot Behavior Detected", "Beijing", 0.95, verdict="BLOCK")
+        await asyncio.sleep(0.1)
+        assert len(patched) == 1
+        print(f"✅ Summary service checks passed: {service.stats()}")
+
+        # A slow first-time setup (genai.configure / list_models) is bounded by the timeout too
+        global configure_genai
+        def slow_configure():
+            time.sleep(0.3)
+            return StubModel()
+        configure_genai = slow_configure
+        service = SummaryService(breaker=CircuitBreaker(threshold=1, cooldown=0.4), timeout=0.1)
+        started = time.perf_counter()
+        assert "Velocity" in await service.summarize("🌍 Impossible Travel Detected", "Rome", 0.9)
+        assert time.perf_counter() - started < 0.2 and service.breaker.state == "open"
+        await asyncio.sleep(0.5)
+        assert "Stub summary" in await service.summarize("🌍 Impossible Travel Detected", "Rome", 0.9), "setup should be picked up once done"
+        print(f"✅ Slow GenAI setup bounded by the timeout: {service.stats()}")
+
+        # Setup and generation share one timeout: each fits alone, together they do not
+        def medium_configure():
+            time.sleep(0.06)
+            return StubModel(delay=0.06)
+        configure_genai = medium_configure
+        service = SummaryService(breaker=CircuitBreaker(threshold=5, cooldown=0.4), timeout=0.1)
+        started = time.perf_counter()
+        assert "Velocity" in await service.summarize("🌍 Impossible Travel Detected", "Kyiv", 0.9)
+        elapsed = time.perf_counter() - started
+        assert elapsed < 0.15 and service.configured and service.counters["timeouts"] == 1, (elapsed, service.stats())
+        print(f"✅ Setup + generation within one timeout ({elapsed * 1000:.0f}ms of 100ms)")
+
+    asyncio.run(check())
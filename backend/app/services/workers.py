@@ -0,0 +1,72 @@
+import os
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+# --- CONFIGURATION ---
+# CPU pool runs model inference (TensorFlow / NumPy release the GIL inside their kernels),
+# IO pool runs blocking network calls that have no async client.
+CPU_POOL_SIZE = int(os.getenv("CPU_POOL_SIZE", str(os.cpu_count() or 2)))
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", "16"))
+# Requests allowed in flight before new ones are rejected with 503
+MAX_PENDING_REQUESTS = int(os.getenv("MAX_PENDING_REQUESTS", "256"))
+
+class ServerOverloaded(Exception):
+    pass
+
+class WorkerPools:
+    def __init__(self, cpu_workers: int = CPU_POOL_SIZE, io_workers: int = IO_POOL_SIZE, max_pending: int = MAX_PENDING_REQUESTS):
+        self.cpu_workers = max(1, cpu_workers)
+        self.io_workers = max(1, io_workers)
+        self.max_pending = max(1, max_pending)
+        self.cpu = ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix="ai-cpu")
+        self.io = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="ai-io")
+        self.pending = 0
+        self.rejected = 0
+
+    def try_acquire(self):
+        """Reserves a request slot, failing fast instead of letting work pile up."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            return False
+        self.pending += 1
+        return True
+
+    def release(self):
+        self.pending -= 1
+
+    @contextmanager
+    def admit(self):
+        if not self.try_acquire():
+            raise ServerOverloaded(f"{self.pending} requests already in flight")
+        try:
+            yield
+        finally:
+            self.release()
+
+    # Both run fn in a copy of the caller's context (as asyncio.to_thread does), so
+    # context variables such as the per-request stage timings reach the worker thread
+    async def run_cpu(self, fn, *args, **kwargs):
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self.cpu, partial(context.run, fn, *args, **kwargs))
+
+    async def run_io(self, fn, *args, **kwargs):
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self.io, partial(context.run, fn, *args, **kwargs))
+
+    def stats(self):
+        return {
+            "cpu_workers": self.cpu_workers,
+            "io_workers": self.io_workers,
+            "pending_requests": self.pending,
+            "max_pending_requests": self.max_pending,
+            "rejected_requests": self.rejected
+        }
+
+    def shutdown(self):
+        self.cpu.shutdown(wait=False, cancel_futures=True)
+        self.io.shutdown(wait=False, cancel_futures=True)
+
+worker_pools = WorkerPools()
@@ -1,96 +1,139 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from fpdf import FPDF
+from functools import lru_cache
 import os
 
 # --- CONFIGURATION ---
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes")
 # Reads from your .env file
 SENDER_EMAIL = os.getenv("MAIL_USERNAME")
 SENDER_PASSWORD = os.getenv("MAIL_PASSWORD")
 
-# --- 1. EMAIL FUNCTION ---
-def send_email_alert(to_email: str, threat_type: str, location: str, ip: str, is_safe: bool = False):
-    if not SENDER_EMAIL or not SENDER_PASSWORD:
-        return
+# --- 1. EMAIL TEMPLATES ---
+def build_alert_email(threat_type: str, location: str, ip: str, is_safe: bool = False):
+    """Returns (subject, html body) for a single login notification."""
+    # Dynamic Subject & Color
+    if is_safe:
+        subject = f"✅ New Login: SecureWatch Access Granted"
+        color = "#05cd99" # Green
+        status_text = "SUCCESS"
+        intro = "A new login was detected on your account."
+    else:
+        subject = f"🚨 Security Alert: {threat_type}"
+        color = "#d9534f" # Red
+        status_text = "BLOCKED"
+        intro = "Suspicious login attempt blocked."
 
-    try:
-        # Dynamic Subject & Color
-        if is_safe:
-            subject = f"✅ New Login: SecureWatch Access Granted"
-            color = "#05cd99" # Green
-            status_text = "SUCCESS"
-            intro = "A new login was detected on your account."
-        else:
-            subject = f"🚨 Security Alert: {threat_type}"
-            color = "#d9534f" # Red
-            status_text = "BLOCKED"
-            intro = "Suspicious login attempt blocked."
+    body = f"""
+    <html>
+      <body style="font-family: Arial, sans-serif;">
+        <div style="padding: 20px; border: 1px solid #eee; border-radius: 10px;">
+          <h2 style="color: {color};">SecureWatch Notification</h2>
+          <p>{intro}</p>
+          <ul>
+            <li><strong>Result:</strong> {threat_type}</li>
+            <li><strong>Location:</strong> {location}</li>
+            <li><strong>IP:</strong> {ip}</li>
+            <li><strong>Status:</strong> <span style="color:{color}; font-weight:bold;">{status_text}</span></li>
+          </ul>
+        </div>
+      </body>
+    </html>
+    """
+    return subject, body
 
-        body = f"""
-        <html>
-          <body style="font-family: Arial, sans-serif;">
-            <div style="padding: 20px; border: 1px solid #eee; border-radius: 10px;">
-              <h2 style="color: {color};">SecureWatch Notification</h2>
-              <p>{intro}</p>
-              <ul>
-                <li><strong>Result:</strong> {threat_type}</li>
-                <li><strong>Location:</strong> {location}</li>
-                <li><strong>IP:</strong> {ip}</li>
-                <li><strong>Status:</strong> <span style="color:{color}; font-weight:bold;">{status_text}</span></li>
-              </ul>
-            </div>
-          </body>
-        </html>
-        """
+def build_digest_email(incidents: list):
+    """Returns (subject, html body) summarizing many log entries; identical events
+    (same result, location, IP and status) are folded into one row with a count."""
+    blocked = [i for i in incidents if i['verdict'] == "BLOCK"]
+    if blocked:
+        subject = f"🚨 Security Alert: {len(blocked)} suspicious logins blocked"
+        color = "#d9534f" # Red
+    else:
+        subject = f"✅ New Logins: {len(incidents)} SecureWatch sessions"
+        color = "#05cd99" # Green
 
-        msg = MIMEMultipart()
-        msg['From'] = SENDER_EMAIL
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'html'))
+    groups = {}
+    for i in incidents:
+        key = (i['reason'], i['location'], i['ip'], i['status'])
+        first_time, count = groups.get(key, (i['time'], 0))
+        groups[key] = (first_time, count + 1)
+    rows = "".join(
+        f"<tr><td>{first_time}</td><td>{reason}</td><td>{location}</td><td>{ip}</td><td>{status}</td><td>{count}</td></tr>"
+        for (reason, location, ip, status), (first_time, count) in groups.items()
+    )
+    body = f"""
+    <html>
+      <body style="font-family: Arial, sans-serif;">
+        <div style="padding: 20px; border: 1px solid #eee; border-radius: 10px;">
+          <h2 style="color: {color};">SecureWatch Notification</h2>
+          <p>{len(incidents)} login events were analyzed for your account ({len(blocked)} blocked).</p>
+          <table cellpadding="6">
+            <tr><th>First Seen</th><th>Result</th><th>Location</th><th>IP</th><th>Status</th><th>Count</th></tr>
+            {rows}
+          </table>
+        </div>
+      </body>
+    </html>
+    """
+    return subject, body
 
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+def build_message(to_email: str, subject: str, body: str):
+    msg = MIMEMultipart()
+    msg['From'] = SENDER_EMAIL
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'html'))
+    return msg
+
+def open_smtp_connection():
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=10)
+    if SMTP_STARTTLS:
         server.starttls()
+    if SENDER_PASSWORD:
         server.login(SENDER_EMAIL, SENDER_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-    except Exception as e:
-        print(f"❌ Email Failed: {e}")
+    return server
 
 # --- 2. PDF GENERATOR (Crash-Proof) ---
-class ReportPDF(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, 'SecureWatch AI - Forensic Incident Report', 0, 1, 'C')
-        self.ln(10)
+# fpdf is only imported the first time a report is requested
+@lru_cache(maxsize=None)
+def _report_pdf_class():
+    from fpdf import FPDF
+
+    class ReportPDF(FPDF):
+        def header(self):
+            self.set_font('Arial', 'B', 12)
+            self.cell(0, 10, 'SecureWatch AI - Forensic Incident Report', 0, 1, 'C')
+            self.ln(10)
+
+    return ReportPDF
+
+# Helper to clean text (Remove Emojis to prevent crash)
+def _clean(text):
+    if not text: return ""
+    # Encode to latin-1 to strip unknown characters, then decode back
+    return str(text).encode('latin-1', 'ignore').decode('latin-1')
 
-def generate_compliance_report(log_data: dict):
-    pdf = ReportPDF()
+def _add_incident_page(pdf, log_data: dict):
     pdf.add_page()
     pdf.set_font("Arial", size=11)
-    
-    # Helper to clean text (Remove Emojis to prevent crash)
-    def clean(text):
-        if not text: return ""
-        # Encode to latin-1 to strip unknown characters, then decode back
-        return text.encode('latin-1', 'ignore').decode('latin-1')
 
     # Content
     pdf.set_font("Arial", 'B', 16)
-    pdf.cell(200, 10, txt=f"Incident ID: {clean(log_data['id'][:8])}", ln=1)
+    pdf.cell(200, 10, txt=f"Incident ID: {_clean(log_data['id'][:8])}", ln=1)
     pdf.ln(5)
     
     pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Timestamp: {clean(log_data['time'])}", ln=1)
-    pdf.cell(200, 10, txt=f"Location: {clean(log_data['location'])}", ln=1)
-    pdf.cell(200, 10, txt=f"IP Address: {clean(log_data['ip'])}", ln=1)
+    pdf.cell(200, 10, txt=f"Timestamp: {_clean(log_data['time'])}", ln=1)
+    pdf.cell(200, 10, txt=f"Location: {_clean(log_data['location'])}", ln=1)
+    pdf.cell(200, 10, txt=f"IP Address: {_clean(log_data['ip'])}", ln=1)
     
     # Verdict Highlight
     pdf.set_text_color(220, 53, 69) # Red color
-    pdf.cell(200, 10, txt=f"Status: {clean(log_data['status'])}", ln=1)
+    pdf.cell(200, 10, txt=f"Status: {_clean(log_data['status'])}", ln=1)
     pdf.set_text_color(0, 0, 0) # Reset color
     
     pdf.ln(5)
@@ -99,11 +142,14 @@ def generate_compliance_report(log_data: dict):
     pdf.set_font("Arial", '', 11)
     
     # Multi-cell for long text
-    summary = clean(log_data.get('ai_summary', 'No summary available.'))
+    summary = _clean(log_data.get('ai_summary', 'No summary available.'))
     pdf.multi_cell(0, 8, txt=summary)
-    
-    filename = f"report_{log_data['id'][:8]}.pdf"
-    # For Windows/Linux compatibility
-    path = filename 
-    pdf.output(path)
-    return path
\ No newline at end of file
+
+def render_compliance_report(incidents: list):
+    """Renders one page per incident into a single PDF and returns its bytes."""
+    pdf = _report_pdf_class()()
+    for log_data in incidents:
+        _add_incident_page(pdf, log_data)
+    out = pdf.output(dest='S')
+    # fpdf 1.x returns a latin-1 str, fpdf2 a bytearray
+    return out.encode('latin-1') if isinstance(out, str) else bytes(out)
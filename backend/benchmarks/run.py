@@ -0,0 +1,173 @@
+"""
+Scoring pipeline benchmarks with stored baselines.
+
+    python -m benchmarks.run                              # run everything except slow ones
+    python -m benchmarks.run --slow --filter preprocess   # include the 1M-row runs
+    python -m benchmarks.run --save-baseline              # record benchmarks/baseline.json
+    python -m benchmarks.run --compare                    # run and compare against it
+    python -m benchmarks.run --compare --output new.json --fail-on-regression
+
+Run from backend/. Every benchmark is calibrated so one repeat takes at least
+--min-time seconds, then repeated --repeat times; the median per-call time is
+what gets compared. Baselines are only comparable on the same machine and
+settings, so the environment is stored with them.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(BACKEND_DIR, "benchmarks", "baseline.json")
+
+# Deterministic, dependency-light defaults: NumPy inference, offline summaries, no sockets
+os.environ.setdefault("AI_INFERENCE_BACKEND", "numpy")
+os.environ.setdefault("ALERT_BUS", "local")
+os.environ["GEMINI_API_KEY"] = ""
+os.environ["MAIL_USERNAME"] = ""
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.suites import BENCHMARKS
+
+def measure(fn, min_time, repeat):
+    """Returns per-call seconds for each repeat, after calibrating the loop count."""
+    fn()  # warm-up (lazy imports, caches)
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number): fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number): fn()
+        samples.append((time.perf_counter() - started) / number)
+    return samples, number
+
+def environment():
+    import numpy
+    return {
+        "python": platform.python_version(), "numpy": numpy.__version__, "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(), "cpu_count": os.cpu_count(),
+        "inference_backend": os.environ.get("AI_INFERENCE_BACKEND"),
+    }
+
+def select(args):
+    """Benchmarks matching any --filter (all of them without one); slow ones only with --slow."""
+    return [b for name, b in BENCHMARKS.items()
+            if (args.slow or not b.slow) and (not args.filter or any(f in name for f in args.filter))]
+
+def run(args, selected):
+    results = {}
+    for bench in selected:
+        try:
+            fn = bench.setup()
+            samples, number = measure(fn, args.min_time, args.repeat)
+        except Exception as e:
+            print(f"   {bench.name:<30} ❌ {type(e).__name__}: {e}")
+            results[bench.name] = {"error": str(e)}
+            continue
+        results[bench.name] = {
+            "median_s": statistics.median(samples), "min_s": min(samples), "max_s": max(samples),
+            "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            "number": number, "repeat": len(samples),
+        }
+        print(f"   {bench.name:<30} {format_time(results[bench.name]['median_s']):>10}  (min {format_time(min(samples))}, {number} x {len(samples)})")
+    return {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "environment": environment(), "results": results}
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+def compare(current, baseline, threshold):
+    """Prints a comparison table and returns the names of regressed benchmarks."""
+    if baseline["environment"] != current["environment"]:
+        print("⚠️ Baseline was recorded in a different environment; ratios may not be meaningful")
+        for key, value in baseline["environment"].items():
+            if current["environment"].get(key) != value:
+                print(f"   {key}: baseline {value} | now {current['environment'].get(key)}")
+    print(f"\n📊 Compared with baseline from {baseline['created_at']} (regression threshold +{threshold:.0%})")
+    print(f"   {'benchmark':<30}{'baseline':>11}{'now':>11}{'ratio':>8}")
+    regressions = []
+    for name, now in current["results"].items():
+        before = baseline["results"].get(name)
+        if "error" in now or not before or "error" in before:
+            print(f"   {name:<30}{'-':>11}{format_time(now['median_s']) if 'error' not in now else 'error':>11}{'':>8}  (no comparison)")
+            continue
+        ratio = now["median_s"] / before["median_s"]
+        # Only flag it when the whole spread moved, not one noisy median
+        if ratio > 1 + threshold and now["min_s"] > before["max_s"]:
+            marker = "🔴 slower"
+            regressions.append(name)
+        elif ratio < 1 - threshold and now["max_s"] < before["min_s"]:
+            marker = "🟢 faster"
+        else:
+            marker = ""
+        print(f"   {name:<30}{format_time(before['median_s']):>11}{format_time(now['median_s']):>11}{ratio:>7.2f}x  {marker}")
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    if missing:
+        print(f"   not run this time: {', '.join(missing)}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="SecureWatch scoring pipeline benchmarks")
+    parser.add_argument("--filter", action="append", default=[], help="only run benchmarks whose name contains this (repeatable, any may match)")
+    parser.add_argument("--slow", action="store_true", help="include slow benchmarks (1M-row preprocessing)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per repeat")
+    parser.add_argument("--output", help="write this run's results as JSON")
+    parser.add_argument("--save-baseline", action="store_true", help=f"store the results as {os.path.relpath(BASELINE_PATH, BACKEND_DIR)}")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--compare", action="store_true", help="compare the results with the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 when something regressed")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, bench in BENCHMARKS.items():
+            print(f"{name}{'  (slow)' if bench.slow else ''}")
+        return
+
+    selected = select(args)
+    if not selected:
+        # An empty run would "pass" a CI regression check without measuring anything
+        print(f"❌ No benchmark matches {' / '.join(args.filter) or 'the selection'}{'' if args.slow else ' (slow ones need --slow)'}; see --list")
+        sys.exit(2)
+    print(f"⏱️ Running {len(selected)} benchmark(s) ({args.repeat} repeats, >= {args.min_time}s each)")
+    current = run(args, selected)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.save_baseline:
+        # Merge so a filtered run only refreshes the benchmarks it ran
+        merged = current
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                previous = json.load(f)
+            merged = {**current, "results": {**previous.get("results", {}), **current["results"]}}
+        with open(args.baseline, "w") as f:
+            json.dump(merged, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n🔴 {len(regressions)} regression(s): {', '.join(regressions)}")
+            if args.fail_on_regression:
+                sys.exit(1)
+        else:
+            print("\n✅ No regressions")
+
+if __name__ == "__main__":
+    main()
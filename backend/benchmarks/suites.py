@@ -0,0 +1,203 @@
+"""
+Benchmark definitions. Each one is a setup function registered with @benchmark:
+it prepares its fixtures (untimed) and returns the zero-argument callable that
+run.py times. Fixtures come from backend/ml_artifacts and research/data.
+"""
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(BACKEND_DIR)
+RESEARCH_DIR = os.path.join(ROOT_DIR, "research")
+LOGINS_CSV = os.path.join(RESEARCH_DIR, "data", "user_logins.csv")
+
+class Benchmark:
+    def __init__(self, name, setup, slow=False):
+        self.name = name
+        self.setup = setup
+        self.slow = slow
+
+BENCHMARKS = {}
+
+def benchmark(name, slow=False):
+    def register(setup):
+        BENCHMARKS[name] = Benchmark(name, setup, slow)
+        return setup
+    return register
+
+# --- FIXTURES ---
+@lru_cache(maxsize=None)
+def engine():
+    from app.services import ai_engine
+    ai_engine.load_models()
+    if not ai_engine.is_ready():
+        raise RuntimeError(f"AI engine failed to load: {ai_engine.load_status}")
+    return ai_engine
+
+@lru_cache(maxsize=None)
+def events(n):
+    """n (user_id, features, sequence) triples drawn from the same shapes the API sees."""
+    rng = np.random.default_rng(n)
+    users = [f"user_{i:04d}" for i in rng.integers(0, 500, n)]
+    features = np.column_stack([
+        rng.exponential(50, n), rng.exponential(24, n), rng.random(n), rng.integers(0, 24, n)
+    ]).tolist()
+    sequences = [[[int(t)] for t in rng.integers(1, 9, rng.integers(3, 11))] for _ in range(n)]
+    return users, features, sequences
+
+@lru_cache(maxsize=None)
+def raw_logins(rows):
+    """user_logins.csv, tiled with fresh user ids and shifted timestamps up to `rows` rows."""
+    import pandas as pd
+    base = pd.read_csv(LOGINS_CSV)
+    base["timestamp"] = pd.to_datetime(base["timestamp"])
+    copies = -(-rows // len(base))
+    parts = []
+    for k in range(copies):
+        part = base.copy()
+        part["user_id"] = part["user_id"] + f"_{k}"
+        part["timestamp"] = part["timestamp"] + pd.Timedelta(days=30 * k)
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True).iloc[:rows]
+
+def _research_path():
+    if RESEARCH_DIR not in sys.path:
+        sys.path.append(RESEARCH_DIR)
+
+# --- AIEngine.predict ---
+@benchmark("engine.predict.single")
+def bench_predict_single():
+    e = engine()
+    users, features, sequences = events(1)
+    return lambda: e.predict(users[0], features[0], sequences[0])
+
+@benchmark("engine.predict_batch.32")
+def bench_predict_batch_32():
+    e = engine()
+    users, features, sequences = events(32)
+    return lambda: e.predict_batch(users, features, sequences)
+
+@benchmark("engine.predict_batch.512")
+def bench_predict_batch_512():
+    e = engine()
+    users, features, sequences = events(512)
+    return lambda: e.predict_batch(users, features, sequences)
+
+# --- Model stages in isolation (batch of 512) ---
+def _stage_inputs():
+    e = engine()
+    users, features, sequences = events(512)
+    scaled = e.scaler.transform(np.array(features, dtype=float))
+    return e, users, features, sequences, scaled
+
+@benchmark("stage.scaling")
+def bench_stage_scaling():
+    e, _, features, _, _ = _stage_inputs()
+    return lambda: e.scaler.transform(np.array(features, dtype=float))
+
+@benchmark("stage.iforest")
+def bench_stage_iforest():
+    e, _, _, _, scaled = _stage_inputs()
+    return lambda: e.model_iforest.predict(scaled)
+
+@benchmark("stage.autoencoder")
+def bench_stage_autoencoder():
+    e, _, _, _, scaled = _stage_inputs()
+    return lambda: e.model_autoencoder.predict(scaled, verbose=0)
+
+@benchmark("stage.lstm")
+def bench_stage_lstm():
+    e, _, _, sequences, _ = _stage_inputs()
+    return lambda: e.model_lstm.predict(e._prepare_sequences(sequences), verbose=0)
+
+@benchmark("stage.network")
+def bench_stage_network():
+    e, users, _, _, _ = _stage_inputs()
+    return lambda: e._network_risk(users)
+
+@benchmark("stage.meta_fusion")
+def bench_stage_meta_fusion():
+    from app.services.meta_fusion import FlatBoostedTrees
+    model = FlatBoostedTrees.from_json(os.path.join(BACKEND_DIR, "ml_artifacts", "model_risk_engine.json"))
+    X = np.random.default_rng(0).random((512, 4))
+    return lambda: model.predict_proba(X)
+
+@benchmark("stage.assess_risk")
+def bench_stage_assess_risk():
+    from app.services.risk_engine import assess_risk
+    e = engine()
+    users, features, sequences = events(512)
+    scores = e.predict_batch(users, features, sequences)
+    def run():
+        for args in zip(users, features, sequences, scores):
+            assess_risk(*args)
+    return run
+
+# --- preprocess_data (research feature engineering) ---
+def _preprocess(rows, distance):
+    _research_path()
+    from phase1.feature_engine import preprocess_data
+    raw = raw_logins(rows)
+    return lambda: preprocess_data(raw.copy(), distance=distance)
+
+@benchmark("preprocess.20k.haversine")
+def bench_preprocess_20k_haversine():
+    return _preprocess(20_000, "haversine")
+
+@benchmark("preprocess.20k.vincenty")
+def bench_preprocess_20k_vincenty():
+    return _preprocess(20_000, "vincenty")
+
+@benchmark("preprocess.1m.haversine", slow=True)
+def bench_preprocess_1m_haversine():
+    return _preprocess(1_000_000, "haversine")
+
+# --- PDF reports ---
+def _incidents(n):
+    return [{
+        "id": f"{i:08d}-bench", "time": "Jan 01, 09:00 AM", "location": "Beijing, China", "ip": "203.0.113.89",
+        "status": "Blocked", "ai_summary": "Automated bot behaviour from a known hostile range. " * 4
+    } for i in range(n)]
+
+@benchmark("report.single")
+def bench_report_single():
+    from app.utils import render_compliance_report
+    incidents = _incidents(1)
+    return lambda: render_compliance_report(incidents)
+
+@benchmark("report.batch50")
+def bench_report_batch50():
+    from app.utils import render_compliance_report
+    incidents = _incidents(50)
+    return lambda: render_compliance_report(incidents)
+
+# --- End to end over HTTP (in-process TestClient) ---
+@lru_cache(maxsize=None)
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    test_client = TestClient(app)
+    test_client.__enter__()   # runs startup; closed at interpreter exit
+    return test_client
+
+@benchmark("http.analyze_login")
+def bench_http_analyze_login():
+    c = client()
+    payload = {"user_id": "carl", "features": [3.0, 20.0, 0.8, 14], "sequence_data": [[1], [2], [8]]}
+    def run():
+        response = c.post("/security/analyze-login", json=payload)
+        assert response.status_code == 200, response.text
+    return run
+
+@benchmark("http.analyze_batch.256")
+def bench_http_analyze_batch():
+    c = client()
+    users, features, sequences = events(256)
+    body = [{"user_id": u, "features": f, "sequence_data": s} for u, f, s in zip(users, features, sequences)]
+    def run():
+        response = c.post("/security/analyze-batch", json=body)
+        assert response.status_code == 200, response.text
+    return run
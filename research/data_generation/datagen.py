@@ -1,23 +1,39 @@
-import pandas as pd
-import numpy as np
-from faker import Faker
-import random
-from datetime import datetime, timedelta
-from tqdm import tqdm
+"""
+Synthetic login log generator.
+
+    python data_generation/datagen.py                                    # 20k rows -> data/user_logins.csv
+    python data_generation/datagen.py --rows 100000000 --shards 32 --workers 8 --output out/logins --format parquet
+
+Users get a home location and a device. Each of their logins is one of five
+scenarios (normal, vacation, impossible travel, brute force, device spoofing),
+drawn with SCENARIO_WEIGHTS. Logins are generated as NumPy arrays, a block of
+users at a time: per-user times are a segmented cumulative sum of random gaps,
+so every user's logins come out in time order. Blocks are streamed to disk, so
+memory is bounded by --chunk-rows, not by --rows.
 
+Users are split into --shards contiguous ranges, and each shard has its own seed
+derived from --seed. The same --seed, --shards and --chunk-rows always produce
+the same data, whatever --workers is. With several shards, --output is a directory of
+part-NNNNN files.
+"""
 import os
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
-# Initialize Faker
-fake = Faker()
-Faker.seed(42)
-np.random.seed(42)
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, "data", "user_logins.csv")
 
 # ==========================================
 # CONFIGURATION
 # ==========================================
 NUM_USERS = 500
-TOTAL_RECORDS = 20000 
-START_DATE = datetime.now() - timedelta(days=90)
+TOTAL_RECORDS = 20000
+START_DATE = "2025-09-01"
 
 # Real-world locations (Lat, Lon, Country)
 LOCATIONS = [
@@ -39,168 +55,225 @@ DEVICES = [
     "Mozilla/5.0 (Linux; Android 10; SM-G960U)"              # Android
 ]
 
+# Scenario mix: normal 80%, vacation 10%, impossible travel 3%, brute force 3%, spoofing 4%
+NORMAL, VACATION, IMPOSSIBLE_TRAVEL, BRUTE_FORCE, SPOOFING = range(5)
+SCENARIO_WEIGHTS = np.array([0.80, 0.10, 0.03, 0.03, 0.04])
+ATTACK_LABELS = ["Normal", "Vacation", "Impossible Travel", "Brute Force Success", "Device Spoofing", "Brute Force"]
+FAILED_LABEL = 5
+# Normal logins: chance of a new (unlabelled) device, the false-positive trap
+NEW_DEVICE_RATE = 0.05
+# Fake scripted user agents are drawn from a pool instead of one Faker call per row
+SPOOF_POOL_SIZE = 5000
+# Rows produced per login on average (brute force adds 3-6 failed attempts)
+ROWS_PER_LOGIN = 1 + SCENARIO_WEIGHTS[BRUTE_FORCE] * 4.5
+
+COLUMNS = ["timestamp", "user_id", "lat", "lon", "country", "device", "login_status", "attack_type", "is_attack"]
+
 # ==========================================
-# 1. BUILD USER PROFILES
+# LOOKUP TABLES
 # ==========================================
-print("1. Building User Profiles...")
-users = {}
-for i in range(NUM_USERS):
-    user_id = f"user_{i:04d}"
-    home_loc = random.choice(LOCATIONS)
-    
-    users[user_id] = {
-        "home": home_loc,
-        "current_loc": home_loc,
-        "device": random.choice(DEVICES),
-        "behavior_mode": "normal", # normal, vacation, compromised
-        "last_login": START_DATE
+LOC_LAT = np.array([l["lat"] for l in LOCATIONS])
+LOC_LON = np.array([l["lon"] for l in LOCATIONS])
+COUNTRIES = sorted({l["country"] for l in LOCATIONS})
+LOC_COUNTRY = np.array([COUNTRIES.index(l["country"]) for l in LOCATIONS])
+
+# For each home location, the locations in other countries (impossible travel targets), padded
+_far = [[j for j, other in enumerate(LOCATIONS) if other["country"] != home["country"]] for home in LOCATIONS]
+FAR_COUNT = np.array([len(f) for f in _far])
+FAR_TABLE = np.array([f + [f[0]] * (max(FAR_COUNT) - len(f)) for f in _far])
+
+def spoofed_user_agents(seed, size=SPOOF_POOL_SIZE):
+    from faker import Faker
+    fake = Faker()
+    fake.seed_instance(seed)
+    # Deduplicated so the categories stay unique; the pool is still thousands strong
+    return list(dict.fromkeys(fake.user_agent() for _ in range(size)))
+
+# ==========================================
+# 1. USER PROFILES
+# ==========================================
+def build_profiles(rng, n_users):
+    """Home location, device and (future) vacation location of each user."""
+    return {
+        "home": rng.integers(0, len(LOCATIONS), n_users),
+        "device": rng.integers(0, len(DEVICES), n_users),
+        "vacation": rng.integers(0, len(LOCATIONS), n_users),
     }
 
 # ==========================================
-# 2. GENERATE COMPLEX LOGS
+# 2. LOGINS FOR A BLOCK OF USERS
 # ==========================================
-print(f"2. Generating {TOTAL_RECORDS} logs with complex scenarios...")
-data = []
-
-# We simulate time passing day by day to ensure sequential logic is correct
-current_sim_time = START_DATE
-records_generated = 0
-
-pbar = tqdm(total=TOTAL_RECORDS)
-
-while records_generated < TOTAL_RECORDS:
-    # Pick a random user
-    user_id = f"user_{random.randint(0, NUM_USERS-1):04d}"
-    profile = users[user_id]
-    
-    # Time logic: Advance user's time by random amount (1 hour to 3 days)
-    time_jump = timedelta(hours=random.randint(1, 72))
-    login_time = profile["last_login"] + time_jump
-    
-    # Update global time reference roughly
-    if login_time > current_sim_time:
-        current_sim_time = login_time
-
-    # Default values
-    lat = profile["current_loc"]["lat"]
-    lon = profile["current_loc"]["lon"]
-    country = profile["current_loc"]["country"]
-    device = profile["device"]
-    status = "Success"
-    attack_label = "Normal"
-    risk_score = 0.0 # Ground truth (0=Safe, 1=Fraud)
-    
-    # --- SCENARIO GENERATOR ---
-    dice = random.random()
-
-    # SCENARIO A: Normal Login (80%)
-    if dice < 0.80:
-        # Add slight GPS jitter (users don't stand still)
-        lat += random.uniform(-0.01, 0.01)
-        lon += random.uniform(-0.01, 0.01)
-        
-        # Rare event: User buys a new phone (False Positive trap)
-        if random.random() < 0.05:
-            device = random.choice(DEVICES) # New device
-            # Note: We do NOT label this as attack. AI must learn this is OK if location is safe.
-    
-    # SCENARIO B: The "Vacation" (Legitimate Travel) (10%)
-    elif dice < 0.90:
-        # User moves to a new country and STAYS there for a while
-        if profile["behavior_mode"] != "vacation":
-            new_loc = random.choice(LOCATIONS)
-            profile["current_loc"] = new_loc # Update "Current" so next login is from here too
-            profile["behavior_mode"] = "vacation"
-        
-        lat = profile["current_loc"]["lat"]
-        lon = profile["current_loc"]["lon"]
-        country = profile["current_loc"]["country"]
-        # This is NOT an attack. It's valid travel.
-        attack_label = "Vacation"
-        
-    # SCENARIO C: Impossible Travel Attack (3%)
-    elif dice < 0.93:
-        # Login from random far away place, but DO NOT update "current_loc"
-        # because the real user is still at home.
-        far_loc = random.choice(LOCATIONS)
-        while far_loc["country"] == profile["home"]["country"]:
-            far_loc = random.choice(LOCATIONS)
-            
-        lat = far_loc["lat"]
-        lon = far_loc["lon"]
-        country = far_loc["country"]
-        
-        # Login happens VERY soon after last login (e.g., 10 mins)
-        login_time = profile["last_login"] + timedelta(minutes=random.randint(5, 30))
-        attack_label = "Impossible Travel"
-        risk_score = 1.0
-
-    # SCENARIO D: Brute Force Attack (3%)
-    elif dice < 0.96:
-        # Generate 3-5 FAILED logs before the current log
-        num_fails = random.randint(3, 6)
-        for _ in range(num_fails):
-            fail_time = login_time - timedelta(minutes=num_fails - _)
-            data.append({
-                "timestamp": fail_time,
-                "user_id": user_id,
-                "lat": lat, "lon": lon, "country": country,
-                "device": device,
-                "login_status": "Failed",
-                "attack_type": "Brute Force",
-                "is_attack": 1
-            })
-            records_generated += 1
-            pbar.update(1)
-            
-        status = "Success" # The final breach
-        attack_label = "Brute Force Success"
-        risk_score = 1.0
-
-    # SCENARIO E: Botnet / Device Spoofing (4%)
-    else:
-        # Correct location, but random User Agent (scripted attack)
-        device = fake.user_agent() 
-        attack_label = "Device Spoofing"
-        risk_score = 1.0
-
-    # Update User State
-    profile["last_login"] = login_time
-
-    # Append Main Record
-    data.append({
-        "timestamp": login_time,
-        "user_id": user_id,
-        "lat": lat,
-        "lon": lon,
-        "country": country,
-        "device": device,
-        "login_status": status,
-        "attack_type": attack_label,
-        "is_attack": 1 if risk_score > 0 else 0
-    })
-    
-    records_generated += 1
-    pbar.update(1)
-
-pbar.close()
+def generate_block(rng, profiles, user_offset, counts, start, spoof_pool, id_width):
+    """All logins of len(counts) consecutive users (counts[i] logins for user i), as a DataFrame
+    ordered by user and, within a user, by time."""
+    keep = counts > 0
+    users = np.flatnonzero(keep)
+    counts = counts[keep]
+    n = int(counts.sum())
+    user = np.repeat(users, counts)
+    seg_start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    scenario = np.searchsorted(np.cumsum(SCENARIO_WEIGHTS), rng.random(n), side="right").clip(0, 4)
+
+    # --- Time: 1h-3 days after the previous login, 5-30 minutes for impossible travel ---
+    gap_minutes = np.where(
+        scenario == IMPOSSIBLE_TRAVEL, rng.integers(5, 31, n), rng.integers(1, 73, n) * 60
+    ).astype(np.int64)
+    elapsed = np.cumsum(gap_minutes)
+    # Segmented cumsum: subtract the running total at the start of each user's run
+    elapsed -= np.repeat(elapsed[seg_start] - gap_minutes[seg_start], counts)
+
+    # --- Location: home until the first vacation, where the user then stays ---
+    position = np.arange(n)
+    first_vacation = np.minimum.reduceat(np.where(scenario == VACATION, position, n), seg_start)
+    on_vacation = position >= np.repeat(first_vacation, counts)
+    home = profiles["home"][user]
+    location = np.where(on_vacation, profiles["vacation"][user], home)
+    # Impossible travel: somewhere in another country, without moving the user
+    travel = scenario == IMPOSSIBLE_TRAVEL
+    far_pick = (rng.random(n) * FAR_COUNT[home]).astype(np.intp)
+    location = np.where(travel, FAR_TABLE[home, far_pick], location)
+
+    lat, lon = LOC_LAT[location], LOC_LON[location]
+    # Normal logins get slight GPS jitter (users don't stand still)
+    normal = scenario == NORMAL
+    lat = np.where(normal, lat + rng.uniform(-0.01, 0.01, n), lat)
+    lon = np.where(normal, lon + rng.uniform(-0.01, 0.01, n), lon)
+
+    # --- Device: the user's own; new phones on some normal logins; scripted agents when spoofing ---
+    device = profiles["device"][user]
+    new_device = normal & (rng.random(n) < NEW_DEVICE_RATE)
+    device = np.where(new_device, rng.integers(0, len(DEVICES), n), device)
+    spoof = scenario == SPOOFING
+    device = np.where(spoof, len(DEVICES) + rng.integers(0, len(spoof_pool), n), device)
+
+    # --- Brute force: 3-6 failed attempts, one minute apart, right before the breach ---
+    fails = np.where(scenario == BRUTE_FORCE, rng.integers(3, 7, n), 0)
+    rows = 1 + fails
+    total = int(rows.sum())
+    row_event = np.repeat(np.arange(n), rows)
+    row_start = np.concatenate([[0], np.cumsum(rows)[:-1]])
+    k = np.arange(total) - np.repeat(row_start, rows)
+    failed = k < fails[row_event]
+    minutes = elapsed[row_event] - np.where(failed, fails[row_event] - k, 0)
+
+    attack = np.where(failed, FAILED_LABEL, scenario[row_event])
+    user_ids = np.char.add("user_", np.char.zfill((user_offset + user[row_event]).astype(str), id_width))
+    return pd.DataFrame({
+        "timestamp": start + pd.to_timedelta(minutes, unit="min"),
+        "user_id": user_ids,
+        "lat": lat[row_event],
+        "lon": lon[row_event],
+        "country": pd.Categorical.from_codes(LOC_COUNTRY[location[row_event]], COUNTRIES),
+        "device": pd.Categorical.from_codes(device[row_event], DEVICES + spoof_pool),
+        "login_status": pd.Categorical.from_codes(np.where(failed, 1, 0), ["Success", "Failed"]),
+        "attack_type": pd.Categorical.from_codes(attack, ATTACK_LABELS),
+        "is_attack": (attack >= IMPOSSIBLE_TRAVEL).astype(np.int8),
+    }, columns=COLUMNS)
 
 # ==========================================
-# 3. SAVE AND SUMMARY
+# 3. SHARDS & OUTPUT
 # ==========================================
-df = pd.DataFrame(data)
-df = df.sort_values(by="timestamp")
+class ChunkWriter:
+    """Appends DataFrames to one CSV or Parquet file without keeping them around."""
 
-print("\n--- DATA GENERATION COMPLETE ---")
-print(f"Total Records: {len(df)}")
-print("\nScenario Distribution:")
-print(df["attack_type"].value_counts())
+    def __init__(self, path, fmt):
+        self.path, self.fmt = path, fmt
+        self._parquet = None
+        self._header = True
 
-print("\nLogin Status:")
-print(df["login_status"].value_counts())
+    def write(self, df):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            # Categories are fixed per shard, so every chunk has the same dictionary-encoded schema
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+            self._header = False
 
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+def generate_shard(shard, shards, seed, rows, users, chunk_rows, output, fmt, start):
+    """Writes one shard's users to `output` and returns (rows written, per-label counts)."""
+    # Each shard has its own stream, derived from the master seed
+    rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(shards)[shard])
+    first, last = users * shard // shards, users * (shard + 1) // shards
+    n_users = last - first
+    logins = int(round(rows * n_users / users / ROWS_PER_LOGIN))
+    profiles = build_profiles(rng, n_users)
+    spoof_pool = spoofed_user_agents(seed * 1000 + shard)
+    id_width = max(4, len(str(users - 1)))
+    # Users pick up logins uniformly, as if each login went to a random user
+    counts = rng.multinomial(logins, np.full(n_users, 1.0 / n_users)) if n_users else np.zeros(0, dtype=np.int64)
+
+    writer = ChunkWriter(output, fmt)
+    written, labels = 0, Counter()
+    # Blocks of consecutive users holding about chunk_rows rows each
+    bounds = np.searchsorted(np.cumsum(counts) * ROWS_PER_LOGIN, np.arange(chunk_rows, logins * ROWS_PER_LOGIN + chunk_rows, chunk_rows))
+    block_start = 0
+    try:
+        for block_end in list(np.unique(np.minimum(bounds + 1, n_users))):
+            if block_end <= block_start:
+                continue
+            block_profiles = {key: value[block_start:block_end] for key, value in profiles.items()}
+            df = generate_block(rng, block_profiles, first + block_start, counts[block_start:block_end],
+                                start, spoof_pool, id_width)
+            writer.write(df)
+            written += len(df)
+            labels.update(df["attack_type"].value_counts().to_dict())
+            block_start = block_end
+    finally:
+        writer.close()
+    return written, labels
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic login logs")
+    parser.add_argument("--rows", type=int, default=TOTAL_RECORDS, help="approximate number of rows")
+    parser.add_argument("--users", type=int, default=None, help=f"number of users (default: {NUM_USERS}, or rows / 40 above {TOTAL_RECORDS} rows)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--shards", type=int, default=1, help="output files; fixes the data together with --seed")
+    parser.add_argument("--workers", type=int, default=1, help="processes generating shards in parallel")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="rows generated and written at a time (part of the seed)")
+    parser.add_argument("--start", default=START_DATE, help="time origin of the first logins")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None, help="default: from the --output extension")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="file, or directory when --shards > 1")
+    args = parser.parse_args()
+
+    users = args.users or max(NUM_USERS, args.rows // 40)
+    shards = max(1, min(args.shards, users))
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    if shards > 1:
+        os.makedirs(args.output, exist_ok=True)
+        outputs = [os.path.join(args.output, f"part-{shard:05d}.{fmt}") for shard in range(shards)]
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        outputs = [args.output]
+
+    print(f"1. Generating ~{args.rows:,} rows for {users:,} users in {shards} shard(s) with {args.workers} worker(s)...")
+    started = time.perf_counter()
+    start = pd.Timestamp(args.start)
+    jobs = [(shard, shards, args.seed, args.rows, users, args.chunk_rows, outputs[shard], fmt, start) for shard in range(shards)]
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(generate_shard, *zip(*jobs)))
+    else:
+        results = [generate_shard(*job) for job in jobs]
 
+    total = sum(written for written, _ in results)
+    labels = sum((counts for _, counts in results), Counter())
+    elapsed = time.perf_counter() - started
+    print("\n--- DATA GENERATION COMPLETE ---")
+    print(f"Total Records: {total:,} in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+    print("\nScenario Distribution:")
+    for label, count in labels.most_common():
+        print(f"   {label:<22} {count:>12,}")
+    print(f"\nSaved to '{args.output}'. Ready for Phase 1 processing.")
 
-# Save
-df.to_csv(r"phase1\user_logins.csv", index=False)
-print("\nSaved to 'user_logins.csv'. Ready for Phase 1 processing.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
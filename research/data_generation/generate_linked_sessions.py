@@ -1,101 +1,193 @@
-import pandas as pd
-import numpy as np
-import random
-from tqdm import tqdm
+"""
+Session action generator linked to the login logs.
+
+    python data_generation/generate_linked_sessions.py                     # data/user_logins.csv -> data/user_sessions.parquet
+    python data_generation/generate_linked_sessions.py --output data/user_sessions.csv   # legacy comma-joined strings
+    python data_generation/generate_linked_sessions.py --input out/logins --output out/sessions --workers 8
+
+Every successful login gets the in-app actions of its session: logins that were
+attacks (brute force success, device spoofing, impossible travel) mostly go
+straight for ADD_RECIPIENT + TRANSFER_LARGE, normal ones browse until LOGOUT.
+Failed logins have no session and are dropped.
 
+Sessions are sampled with NumPy a chunk of logins at a time and emitted directly
+as LSTM input: MAX_SEQ_LENGTH tokens per session, post-padded with 0, in the
+vocabulary of phase1_train_lstm.ipynb / backend feature_store.ACTIONS. Parquet
+output stores them as a fixed-size list<uint8> column `tokens`, so the (N, 10)
+array is one reshape away. With a .csv output the old `session_sequence`
+strings are written instead.
+
+--input may be a datagen.py output directory of part files; each part gets its
+own output part and its own seed derived from --seed. The same --seed and
+--chunk-rows always produce the same sessions, whatever --workers is.
+"""
 import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_INPUT = os.path.join(BASE_DIR, "data", "user_logins.csv")
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, "data", "user_sessions.parquet")
 
 # ==========================================
 # CONFIGURATION
 # ==========================================
-# These match the LSTM vocabulary
-ACTIONS = [
-    'LOGIN', 'VIEW_BALANCE', 'VIEW_TRANSACTIONS', 
-    'TRANSFER_SMALL', 'TRANSFER_LARGE', 
-    'CHANGE_PASSWORD', 'ADD_RECIPIENT', 'LOGOUT'
-]
+# These match the LSTM vocabulary (and backend/app/services/feature_store.py); 0 is padding
+ACTIONS = {
+    'LOGIN': 1, 'VIEW_BALANCE': 2, 'VIEW_TRANSACTIONS': 3,
+    'TRANSFER_SMALL': 4, 'TRANSFER_LARGE': 5,
+    'CHANGE_PASSWORD': 6, 'ADD_RECIPIENT': 7, 'LOGOUT': 8
+}
+MAX_SEQ_LENGTH = 10
+ACTION_NAMES = np.array([""] + sorted(ACTIONS, key=ACTIONS.get), dtype=object)
+
+# Logins whose session is likely aggressive
+ATTACK_TYPES = ["Brute Force Success", "Device Spoofing", "Impossible Travel"]
+# 80% of those act malicious immediately, the rest act "sleepy" (login and wait) to hide
+MALICIOUS_RATE = 0.8
+DRAIN = [ACTIONS['LOGIN'], ACTIONS['ADD_RECIPIENT'], ACTIONS['TRANSFER_LARGE'], ACTIONS['LOGOUT']]
+SLEEPY = [ACTIONS['LOGIN'], ACTIONS['VIEW_BALANCE'], ACTIONS['LOGOUT']]
+# Normal sessions: 2-6 browsing actions after LOGIN, ending early at the first LOGOUT
+NORMAL_ACTIONS = np.array([ACTIONS[a] for a in ('VIEW_BALANCE', 'VIEW_TRANSACTIONS', 'TRANSFER_SMALL', 'LOGOUT')], dtype=np.uint8)
+NORMAL_MIN_ACTIONS, NORMAL_MAX_ACTIONS = 2, 6
+
+INPUT_COLUMNS = ["user_id", "timestamp", "login_status", "attack_type", "is_attack"]
 
 # ==========================================
-# 1. LOAD EXISTING LOGIN LOGS
+# 1. SESSION SAMPLING
 # ==========================================
+def sample_tokens(rng, is_attack_login):
+    """(N, MAX_SEQ_LENGTH) uint8 token arrays, one session per login."""
+    n = len(is_attack_login)
+    tokens = np.zeros((n, MAX_SEQ_LENGTH), dtype=np.uint8)
+    tokens[:, 0] = ACTIONS['LOGIN']
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-file_path = os.path.join(BASE_DIR, 'phase1', 'user_logins.csv')
+    # Normal: keep action j if j < length and no LOGOUT came before it
+    lengths = rng.integers(NORMAL_MIN_ACTIONS, NORMAL_MAX_ACTIONS + 1, n)
+    choices = NORMAL_ACTIONS[rng.integers(0, len(NORMAL_ACTIONS), (n, NORMAL_MAX_ACTIONS))]
+    logout = choices == ACTIONS['LOGOUT']
+    logged_out_before = (np.cumsum(logout, axis=1) - logout) > 0
+    keep = (np.arange(NORMAL_MAX_ACTIONS) < lengths[:, None]) & ~logged_out_before
+    tokens[:, 1:1 + NORMAL_MAX_ACTIONS] = np.where(keep, choices, 0)
+
+    # Attacks: one of two fixed patterns
+    malicious = rng.random(n) < MALICIOUS_RATE
+    tokens[is_attack_login] = 0
+    tokens[is_attack_login & malicious, :len(DRAIN)] = DRAIN
+    tokens[is_attack_login & ~malicious, :len(SLEEPY)] = SLEEPY
+    return tokens
 
-print("1. Loading existing user_logins.csv...")
-try:
-    df_logins = pd.read_csv(file_path)
-except FileNotFoundError:
-    print("❌ Error: user_logins.csv not found. Please run the Data Fabricator first.")
-    exit()
+def sessions_for(rng, logins):
+    """Session rows (login columns + tokens) for a DataFrame of logins."""
+    is_attack_login = logins["attack_type"].isin(ATTACK_TYPES).to_numpy()
+    # No session happens if the login failed
+    has_session = is_attack_login | (logins["login_status"] != "Failed").to_numpy()
+    tokens = sample_tokens(rng, is_attack_login)[has_session]
+    sessions = logins.loc[has_session, ["user_id", "timestamp", "is_attack"]].reset_index(drop=True)
+    return sessions, tokens
 
-print(f"   Found {len(df_logins)} login records.")
+def to_strings(tokens):
+    """Comma-joined action names ("LOGIN,VIEW_BALANCE,LOGOUT"), the old CSV format."""
+    # Only a few thousand distinct sessions exist, so join each of those once
+    unique, inverse = np.unique(tokens, axis=0, return_inverse=True)
+    joined = np.array([",".join(ACTION_NAMES[row[row > 0]]) for row in unique], dtype=object)
+    return joined[inverse.reshape(-1)]
 
 # ==========================================
-# 2. GENERATE SEQUENCES FOR EACH LOGIN
+# 2. CHUNKED INPUT & OUTPUT
 # ==========================================
-print("2. Generating session actions for each login...")
-
-session_data = []
-
-# We iterate through every single login in your CSV
-for index, row in tqdm(df_logins.iterrows(), total=len(df_logins)):
-    
-    user_id = row['user_id']
-    attack_type = row['attack_type'] # We check if the login itself was an attack
-    
-    # Start every session with LOGIN
-    sequence = ['LOGIN']
-    
-    # --- LOGIC: LINKING LOGIN TYPE TO SESSION BEHAVIOR ---
-    
-    # CASE A: Known Attack Types (From Phase 1)
-    if attack_type in ['Brute Force Success', 'Device Spoofing', 'Impossible Travel']:
-        # If the login was suspicious, the session is likely aggressive
-        # Pattern: Quick Drain or Profile Change
-        if random.random() < 0.8: # 80% chance they act malicious immediately
-            sequence.append('ADD_RECIPIENT')
-            sequence.append('TRANSFER_LARGE')
-            sequence.append('LOGOUT')
+def read_logins(path, chunk_rows):
+    """Yields DataFrames of up to chunk_rows logins from a CSV or Parquet file."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=INPUT_COLUMNS):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=INPUT_COLUMNS, chunksize=chunk_rows)
+
+class SessionWriter:
+    """Appends session chunks to one Parquet (token column) or CSV (strings) file."""
+
+    def __init__(self, path, fmt):
+        self.path, self.fmt = path, fmt
+        self._parquet = None
+        self._header = True
+
+    def write(self, sessions, tokens):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(sessions, preserve_index=False)
+            column = pa.FixedSizeListArray.from_arrays(pa.array(tokens.reshape(-1)), MAX_SEQ_LENGTH)
+            table = table.append_column("tokens", column)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+            self._parquet.write_table(table)
         else:
-            # 20% chance they act "Sleepy" (login and wait) to hide
-            sequence.append('VIEW_BALANCE')
-            sequence.append('LOGOUT')
-            
-    # CASE B: Failed Login (Brute Force Fail)
-    elif row['login_status'] == 'Failed':
-        # No session happens if login failed!
-        sequence = ['LOGIN_ATTEMPT_FAILED']
-        
-    # CASE C: Normal Login (or Vacation)
+            sessions = sessions.assign(session_sequence=to_strings(tokens))[["user_id", "timestamp", "session_sequence", "is_attack"]]
+            sessions.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+def generate_part(part, parts, seed, chunk_rows, input_path, output_path, fmt):
+    """Writes the sessions of one login file and returns (logins read, sessions written)."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(parts)[part])
+    writer = SessionWriter(output_path, fmt)
+    read = written = 0
+    try:
+        for logins in read_logins(input_path, chunk_rows):
+            sessions, tokens = sessions_for(rng, logins)
+            writer.write(sessions, tokens)
+            read += len(logins)
+            written += len(sessions)
+    finally:
+        writer.close()
+    return read, written
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate session action sequences for login logs")
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="login CSV/Parquet file, or a directory of datagen.py parts")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="file, or directory when --input is one")
+    parser.add_argument("--format", choices=["parquet", "csv"], default=None, help="default: from the --output extension")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="processes handling input parts in parallel")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="logins processed at a time (part of the seed)")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "parquet")
+    if os.path.isdir(args.input):
+        inputs = sorted(os.path.join(args.input, name) for name in os.listdir(args.input) if name.endswith((".csv", ".parquet")))
+        os.makedirs(args.output, exist_ok=True)
+        outputs = [os.path.join(args.output, os.path.splitext(os.path.basename(path))[0] + f".{fmt}") for path in inputs]
     else:
-        # Generate a normal random sequence
-        seq_len = random.randint(2, 6)
-        for _ in range(seq_len):
-            action = random.choice(['VIEW_BALANCE', 'VIEW_TRANSACTIONS', 'TRANSFER_SMALL', 'LOGOUT'])
-            sequence.append(action)
-            if action == 'LOGOUT':
-                break
-
-    # Save as a string representation we can parse later
-    # e.g., "LOGIN,VIEW_BALANCE,LOGOUT"
-    session_str = ",".join(sequence)
-    
-    session_data.append({
-        'user_id': user_id,
-        'timestamp': row['timestamp'],
-        'session_sequence': session_str,
-        'is_attack': row['is_attack'] # Inherit the label
-    })
+        inputs, outputs = [args.input], [args.output]
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    if not inputs or not all(os.path.exists(path) for path in inputs):
+        print(f"❌ Error: no login logs at '{args.input}'. Please run the Data Fabricator (datagen.py) first.")
+        return
 
-# ==========================================
-# 3. SAVE SESSION LOGS
-# ==========================================
-df_sessions = pd.DataFrame(session_data)
-# Filter out failed logins (no session data needed)
-df_sessions = df_sessions[df_sessions['session_sequence'] != 'LOGIN_ATTEMPT_FAILED']
-
-df_sessions.to_csv(r'.\phase1\user_sessions.csv', index=False)
-print("\n✅ Session Data Generated!")
-print(f"   Saved {len(df_sessions)} sessions to 'user_sessions.csv'")
-print(df_sessions.head())
\ No newline at end of file
+    print(f"1. Generating sessions for {len(inputs)} login file(s) with {args.workers} worker(s)...")
+    started = time.perf_counter()
+    jobs = [(part, len(inputs), args.seed, args.chunk_rows, inputs[part], outputs[part], fmt) for part in range(len(inputs))]
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(generate_part, *zip(*jobs)))
+    else:
+        results = [generate_part(*job) for job in jobs]
+
+    read = sum(r for r, _ in results)
+    written = sum(w for _, w in results)
+    elapsed = time.perf_counter() - started
+    print("\n✅ Session Data Generated!")
+    print(f"   {read:,} logins -> {written:,} sessions in {elapsed:.1f}s ({read / elapsed:,.0f} logins/s)")
+    print(f"   Saved to '{args.output}'")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,31 @@
 import os
+import sys
 import pandas as pd
 from ctgan import CTGAN
 import torch
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datastore import load, write, exists, csv_path
+
 def train_gan_and_generate():
     print("--- Phase A: Generative AI (GANs) ---")
 
     # Path configuration
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_path = os.path.join(base_dir, 'data', 'user_logins.csv')
-    output_path = os.path.join(base_dir, 'data', 'synthetic_logins.csv')
+    output_path = csv_path('synthetic_logins')
 
-    if not os.path.exists(data_path):
-        print(f"Error: Seed data not found at {data_path}")
+    if not exists('user_logins'):
+        print(f"Error: Seed data not found at {csv_path('user_logins')}")
         return
 
-    print(f"1. Loading seed data from {data_path}...")
-    data = pd.read_csv(data_path)
+    print("1. Loading seed data from user_logins...")
+    # Timestamps are already parsed in the Parquet copy
+    data = load('user_logins')
 
     # Pre-processing
     if 'timestamp' in data.columns:
         print("   Converting timestamp to numeric...")
-        data['timestamp'] = pd.to_datetime(data['timestamp'])
-        data['timestamp_numeric'] = data['timestamp'].astype('int64') // 10**9
+        data['timestamp_numeric'] = data['timestamp'].astype('datetime64[s]').astype('int64')
         data_for_gan = data.drop(columns=['timestamp'])
     else:
         data_for_gan = data.copy()
@@ -46,6 +49,8 @@ def train_gan_and_generate():
 
     print(f"4. Saving synthetic data to {output_path}...")
     synthetic_data.to_csv(output_path, index=False)
+    # Written after the CSV, so loaders use this copy without converting again
+    write(synthetic_data, 'synthetic_logins')
 
     print("✅ Phase A Complete. Synthetic data generated.")
 
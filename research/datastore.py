@@ -0,0 +1,201 @@
+"""
+Columnar storage for the research datasets.
+
+    python datastore.py                  # convert every CSV that is missing or newer than its Parquet copy
+    python datastore.py --force user_logins
+    python datastore.py --benchmark      # CSV + to_datetime vs Parquet load times
+
+Every dataset is converted once from its CSV to Parquet next to it: timestamps
+are parsed at conversion time, user_id / device / country / attack_type /
+login_status are dictionary encoded (pandas categoricals when loaded), and rows
+are sorted by user_id then timestamp, so row-group statistics let a user_id or
+timestamp filter skip most of the file and preprocess_data's sort is a no-op.
+user_sessions.csv is stored with the `tokens` column generate_linked_sessions.py
+writes instead of the comma-joined strings.
+
+    from datastore import load, load_tokens
+    df = load("user_logins", columns=["user_id", "timestamp", "lat", "lon", "device"])
+    df = load("user_logins", filters=[("user_id", "in", ["user_0001", "user_0002"])])
+    tokens, labels = load_tokens()      # (N, 10) uint8, (N,) int8
+
+Reads are memory mapped. load() converts a dataset on first use, and again
+whenever its CSV changes.
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+ML_ARTIFACTS_DIR = os.path.join(os.path.dirname(BASE_DIR), "backend", "ml_artifacts")
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+CATEGORICAL_COLUMNS = ["user_id", "device", "country", "attack_type", "login_status"]
+ROW_GROUP_SIZE = 128 * 1024
+COMPRESSION = "zstd"
+SESSION_LENGTH = 10   # LSTM input length (generate_linked_sessions.MAX_SEQ_LENGTH)
+# Raw login columns phase1.feature_engine.preprocess_data reads
+PREPROCESS_COLUMNS = ["user_id", "timestamp", "lat", "lon", "device"]
+
+DATASETS = {
+    "user_logins": os.path.join(DATA_DIR, "user_logins.csv"),
+    "synthetic_logins": os.path.join(DATA_DIR, "synthetic_logins.csv"),
+    "user_sessions": os.path.join(DATA_DIR, "user_sessions.csv"),
+    "network_risk_scores": os.path.join(ML_ARTIFACTS_DIR, "network_risk_scores.csv"),
+}
+
+def csv_path(name):
+    return DATASETS[name]
+
+def parquet_path(name):
+    return os.path.splitext(DATASETS[name])[0] + ".parquet"
+
+# ==========================================
+# 1. CONVERSION
+# ==========================================
+def _session_tokens(sequences):
+    """Comma-joined action strings -> fixed_size_list<uint8>[SESSION_LENGTH] column."""
+    sys.path.append(os.path.join(BASE_DIR, "data_generation"))
+    from generate_linked_sessions import ACTIONS
+
+    # Few distinct sessions exist, so tokenize each of those once
+    unique, inverse = np.unique(np.asarray(sequences, dtype=object), return_inverse=True)
+    table = np.zeros((len(unique), SESSION_LENGTH), dtype=np.uint8)
+    for i, sequence in enumerate(unique):
+        ids = [ACTIONS.get(action, 0) for action in sequence.split(",")][:SESSION_LENGTH]
+        table[i, :len(ids)] = ids
+    tokens = table[inverse.reshape(-1)]
+    return pa.FixedSizeListArray.from_arrays(pa.array(tokens.reshape(-1)), SESSION_LENGTH)
+
+def to_table(df):
+    """Arrow table in the stored layout: parsed timestamps, sorted, categoricals encoded."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if "timestamp" in table.column_names:
+        timestamps = table["timestamp"]
+        if not pa.types.is_timestamp(timestamps.type):
+            timestamps = pa.array(pd.to_datetime(timestamps.to_pandas(), format="mixed"))
+        table = table.set_column(table.column_names.index("timestamp"), "timestamp", pc.cast(timestamps, pa.timestamp("us"), safe=False))
+    if "session_sequence" in table.column_names:
+        index = table.column_names.index("session_sequence")
+        table = table.set_column(index, "tokens", _session_tokens(table["session_sequence"].to_numpy(zero_copy_only=False)))
+    sort_keys = [(key, "ascending") for key in ("user_id", "timestamp") if key in table.column_names]
+    if sort_keys:
+        table = table.sort_by(sort_keys)
+    # Encoded after sorting, so user_id categories come out in sorted order
+    for index, field in enumerate(table.schema):
+        if field.name in CATEGORICAL_COLUMNS and not pa.types.is_dictionary(field.type):
+            table = table.set_column(index, field.name, pc.dictionary_encode(table[field.name].cast(pa.string())))
+    return table.replace_schema_metadata(None)
+
+def write(df, name_or_path):
+    """Stores a DataFrame as Parquet (by dataset name or explicit path)."""
+    path = parquet_path(name_or_path) if name_or_path in DATASETS else name_or_path
+    pq.write_table(to_table(df), path, row_group_size=ROW_GROUP_SIZE, compression=COMPRESSION)
+    return path
+
+def exists(name):
+    return os.path.exists(csv_path(name)) or os.path.exists(parquet_path(name))
+
+def is_stale(name):
+    source, target = csv_path(name), parquet_path(name)
+    if not os.path.exists(target):
+        return True
+    return os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(target)
+
+def convert(name, force=False):
+    """Converts a dataset's CSV to Parquet unless an up-to-date copy exists; returns its path."""
+    if not (force or is_stale(name)):
+        return parquet_path(name)
+    source = csv_path(name)
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Dataset '{name}' not found at {source}")
+    from pyarrow import csv as pa_csv
+    # Everything is read as plain types first; to_table parses and encodes
+    df = pa_csv.read_csv(source, convert_options=pa_csv.ConvertOptions(strings_can_be_null=False)).to_pandas()
+    return write(df, name)
+
+# ==========================================
+# 2. LOADING
+# ==========================================
+def load(name_or_path, columns=None, filters=None, as_table=False):
+    """Loads a dataset from Parquet, memory mapped, reading only `columns` and the row
+    groups that can match `filters` (pyarrow DNF, e.g. [("user_id", "==", "user_0001")]).
+    Returns a DataFrame with categorical string columns, or the Arrow table."""
+    if name_or_path in DATASETS:
+        path = convert(name_or_path)
+    else:
+        path = name_or_path
+    table = pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+    return table if as_table else table.to_pandas()
+
+def load_tokens(name_or_path="user_sessions", filters=None):
+    """Session token arrays for the LSTM: (N, 10) uint8 tokens and (N,) int8 labels, zero-copy."""
+    table = load(name_or_path, columns=["tokens", "is_attack"], filters=filters, as_table=True)
+    tokens = table["tokens"].combine_chunks().flatten().to_numpy()
+    labels = table["is_attack"].to_numpy().astype(np.int8, copy=False)
+    return tokens.reshape(-1, SESSION_LENGTH), labels
+
+# ==========================================
+# 3. CLI & BENCHMARK
+# ==========================================
+def _benchmark(name):
+    def best(fn, repeat=5):
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - started)
+        return min(times), result
+
+    source = csv_path(name)
+    if not os.path.exists(source):
+        return
+    csv_time, df_csv = best(lambda: pd.read_csv(source).assign(
+        **({"timestamp": lambda d: pd.to_datetime(d["timestamp"], format="mixed")} if name != "network_risk_scores" else {})))
+    if name == "user_sessions":
+        # Sessions are consumed as token arrays, not as a DataFrame of per-row lists
+        parquet_time, (tokens, labels) = best(load_tokens)
+        parquet_bytes = tokens.nbytes + labels.nbytes
+    else:
+        parquet_time, df_parquet = best(lambda: load(name))
+        parquet_bytes = df_parquet.memory_usage(deep=True).sum()
+    print(f"   {name:<20} CSV {csv_time * 1000:8.1f}ms {df_csv.memory_usage(deep=True).sum() / 2**20:7.1f}MB | "
+          f"Parquet {parquet_time * 1000:7.1f}ms {parquet_bytes / 2**20:7.1f}MB | "
+          f"{os.path.getsize(source) / 2**20:.1f}MB -> {os.path.getsize(parquet_path(name)) / 2**20:.1f}MB on disk")
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert research datasets to Parquet")
+    parser.add_argument("names", nargs="*", help=f"datasets to convert (default: all of {', '.join(DATASETS)})")
+    parser.add_argument("--force", action="store_true", help="convert even when the Parquet copy is up to date")
+    parser.add_argument("--benchmark", action="store_true", help="compare CSV and Parquet load times")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in DATASETS]
+    if unknown:
+        parser.error(f"unknown dataset(s): {', '.join(unknown)}")
+
+    for name in args.names or DATASETS:
+        if not exists(name):
+            print(f"   {name:<20} ⚠️ not found, skipped")
+            continue
+        started = time.perf_counter()
+        stale = args.force or is_stale(name)
+        path = convert(name, force=args.force)
+        status = f"converted in {time.perf_counter() - started:.2f}s" if stale else "up to date"
+        print(f"   {name:<20} ✅ {status} -> {os.path.relpath(path, os.path.dirname(BASE_DIR))}")
+
+    if args.benchmark:
+        print("\n⏱️ Load time (best of 5) and in-memory size:")
+        for name in args.names or DATASETS:
+            _benchmark(name)
+
+if __name__ == "__main__":
+    main()
@@ -12,10 +12,77 @@ def get_geo_dist(row):
     except:
         return 0.0
 
-def preprocess_data(df):
+# WGS-84 ellipsoid (same as geopy's default) and mean Earth radius for haversine
+WGS84_A = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+EARTH_RADIUS_KM = 6371.0088
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance on a sphere (within ~0.5% of geodesic)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def vincenty_km(lat1, lon1, lat2, lon2, max_iter=200, tol=1e-12):
+    """Vectorized Vincenty inverse formula on WGS-84 (sub-millimetre agreement with geodesic).
+    Nearly antipodal pairs where the iteration does not converge fall back to haversine."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    L = lon2 - lon1
+    U1 = np.arctan((1 - WGS84_F) * np.tan(lat1))
+    U2 = np.arctan((1 - WGS84_F) * np.tan(lat2))
+    sinU1, cosU1, sinU2, cosU2 = np.sin(U1), np.cos(U1), np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    # Non-finite lanes (a user's first login has no previous coordinates) never converge;
+    # leave them out so they neither hold the loop open nor take the haversine fallback
+    active = np.isfinite(L) & np.isfinite(lat1) & np.isfinite(lat2)
+    for _ in range(max_iter):
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma = np.sqrt((cosU2 * sin_lam) ** 2 + (cosU1 * sinU2 - sinU1 * cosU2 * cos_lam) ** 2)
+        cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+        sigma = np.arctan2(sin_sigma, cos_sigma)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+        C = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+        lam_new = L + (1 - C) * WGS84_F * sin_alpha * (
+            sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+        )
+        converged = np.abs(lam_new - lam) < tol
+        lam = np.where(active, lam_new, lam)
+        active &= ~converged
+        if not active.any():
+            break
+
+    u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+        - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+    ))
+    dist = WGS84_B * A * (sigma - delta_sigma)
+    return np.where(active, haversine_km(np.degrees(lat1), np.degrees(lon1), np.degrees(lat2), np.degrees(lon2)), dist)
+
+DISTANCE_FUNCTIONS = {"haversine": haversine_km, "vincenty": vincenty_km}
+
+def geo_distance_km(prev_lat, prev_lon, lat, lon, mode="geodesic"):
+    """Distance column for preprocess_data; NaN previous coordinates (first login) give 0."""
+    if mode == "geodesic":
+        frame = pd.DataFrame({'prev_lat': prev_lat, 'prev_lon': prev_lon, 'lat': lat, 'lon': lon})
+        return frame.apply(get_geo_dist, axis=1).to_numpy(dtype=float)
+    dist = DISTANCE_FUNCTIONS[mode](prev_lat, prev_lon, lat, lon)
+    return np.nan_to_num(dist, nan=0.0)
+
+def preprocess_data(df, distance="geodesic"):
     """
     Applies feature engineering to the raw login dataframe.
     Calculates: time_diff_hours, dist_km, velocity_kmh, device_trust_score, hour_of_day.
+
+    distance: "geodesic" (geopy, per row), "vincenty" (vectorized, matches geodesic to
+    sub-millimetre) or "haversine" (vectorized spherical, fastest, within ~0.5%).
     """
     # Ensure timestamp is datetime and sort
     df['timestamp'] = pd.to_datetime(df['timestamp'])
@@ -30,22 +97,17 @@ def preprocess_data(df):
     df['prev_lat'] = df.groupby('user_id')['lat'].shift(1)
     df['prev_lon'] = df.groupby('user_id')['lon'].shift(1)
 
-    # Apply geodesic distance calculation
-    # Using simple apply instead of progress_apply for script compatibility
-    df['dist_km'] = df.apply(get_geo_dist, axis=1)
+    # Whole-column distance calculation (row-wise geopy only in "geodesic" mode)
+    df['dist_km'] = geo_distance_km(df['prev_lat'], df['prev_lon'], df['lat'], df['lon'], mode=distance)
 
     # Avoid division by zero by adding a small epsilon
     df['velocity_kmh'] = df['dist_km'] / (df['time_diff_hours'] + 0.1)
 
     # C. Device Frequency & Trust Score
-    device_counts = df.groupby(['user_id', 'device']).size().reset_index(name='count')
-    total_counts = df.groupby('user_id').size().reset_index(name='total')
-    device_stats = pd.merge(device_counts, total_counts, on='user_id')
-    device_stats['device_trust_score'] = device_stats['count'] / device_stats['total']
-
-    # Merge trust score back to original dataframe
-    df = pd.merge(df, device_stats[['user_id', 'device', 'device_trust_score']],
-                  on=['user_id', 'device'], how='left')
+    # Share of the user's logins made from this device, computed in place (no merge copies)
+    device_counts = df.groupby(['user_id', 'device'])['user_id'].transform('size')
+    total_counts = df.groupby('user_id')['user_id'].transform('size')
+    df['device_trust_score'] = device_counts / total_counts
 
     # D. Temporal Features
     df['hour_of_day'] = df['timestamp'].dt.hour
@@ -54,3 +116,29 @@ def preprocess_data(df):
     df = df.fillna(0)
 
     return df
+
+# --- ACCURACY & SPEED COMPARISON ---
+# Usage (from research/): python -m phase1.feature_engine [path/to/logins.csv]
+if __name__ == "__main__":
+    import os
+    import sys
+    import time
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(base_dir, 'data', 'user_logins.csv')
+    raw = pd.read_csv(data_path)
+    print(f"Comparing distance modes on {len(raw)} rows from {data_path}")
+
+    results = {}
+    for mode in ("geodesic", "vincenty", "haversine"):
+        start = time.perf_counter()
+        results[mode] = preprocess_data(raw.copy(), distance=mode)
+        print(f"   {mode:<10} preprocess_data: {time.perf_counter() - start:8.3f}s")
+
+    reference = results["geodesic"]['dist_km'].to_numpy()
+    moving = reference > 1.0
+    for mode in ("vincenty", "haversine"):
+        dist = results[mode]['dist_km'].to_numpy()
+        abs_err = np.abs(dist - reference)
+        rel_err = abs_err[moving] / reference[moving]
+        print(f"   {mode:<10} vs geodesic: max abs {abs_err.max():.6f} km | max rel {rel_err.max() * 100:.4f}% | mean rel {rel_err.mean() * 100:.4f}%")
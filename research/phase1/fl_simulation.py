@@ -10,22 +10,21 @@ from sklearn.preprocessing import MinMaxScaler
 # Add the parent directory to sys.path to import modules locally in this process
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from datastore import load, exists, csv_path, PREPROCESS_COLUMNS
 from phase1.feature_engine import preprocess_data
 from phase1.models import get_autoencoder_model
 
 def load_data():
     """Loads and preprocesses data for FL."""
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_path = os.path.join(base_dir, 'data', 'synthetic_logins.csv')
+    if not exists('synthetic_logins'):
+        raise FileNotFoundError(f"Data not found at {csv_path('synthetic_logins')}. Run train_gan.py first.")
 
-    if not os.path.exists(data_path):
-        raise FileNotFoundError(f"Data not found at {data_path}. Run train_gan.py first.")
+    # Parquet copy (converted once), only the columns feature engineering needs
+    print("Loading data from synthetic_logins...")
+    df = load('synthetic_logins', columns=PREPROCESS_COLUMNS)
 
-    print(f"Loading data from {data_path}...")
-    df = pd.read_csv(data_path)
-
-    # Preprocess
-    df = preprocess_data(df)
+    # Preprocess (vectorized Vincenty matches geopy's geodesic to sub-millimetre)
+    df = preprocess_data(df, distance="vincenty")
 
     # Prepare features
     features = ['velocity_kmh', 'time_diff_hours', 'device_trust_score', 'hour_of_day']
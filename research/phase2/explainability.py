@@ -10,6 +10,7 @@ import matplotlib.pyplot as plt
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from datastore import load, exists, PREPROCESS_COLUMNS
 from phase1.feature_engine import preprocess_data
 from phase1.models import get_autoencoder_model
 
@@ -51,14 +52,14 @@ def run_explainability():
         return
 
     # Load sample data for explanation
-    data_path = os.path.join(base_dir, 'data', 'synthetic_logins.csv')
-    if not os.path.exists(data_path):
+    dataset = 'synthetic_logins'
+    if not exists(dataset):
         print("Synthetic data not found, falling back to seed data.")
-        data_path = os.path.join(base_dir, 'data', 'user_logins.csv')
+        dataset = 'user_logins'
 
-    print(f"2. Loading data from {data_path}...")
-    df = pd.read_csv(data_path)
-    df = preprocess_data(df)
+    print(f"2. Loading data from {dataset}...")
+    df = load(dataset, columns=PREPROCESS_COLUMNS)
+    df = preprocess_data(df, distance="vincenty")
 
     # Handle NaNs
     df[features] = df[features].fillna(0)
@@ -1,16 +1,29 @@
-import requests
+"""
+SecureWatch login simulator.
+
+    python tools/login_simulator.py                                  # interactive attack menu
+    python tools/login_simulator.py --mode fraud_ring --count 8      # one scenario, printed per login
+    python tools/login_simulator.py --load --rate 200 --duration 30  # headless open-loop load test
+
+Load mode fires logins at Poisson-distributed arrival times at a fixed rate, whether or
+not earlier ones have returned (open loop), so a slow server shows up as growing latency
+and errors instead of silently slowing the generator down. Latency is measured from each
+login's scheduled send time, so time spent waiting for a free connection counts too.
+"""
+import sys
+import json
 import time
 import random
-import sys
+import asyncio
+import argparse
+import platform
+from collections import Counter
 
 # --- CONFIGURATION ---
-# Un-comment the one you are using:
-
-# 1. LOCALHOST (For testing on your laptop)
-# API_URL = "http://127.0.0.1:8000/security/analyze-login"
-
-# 2. RENDER (For the Final Demo)
-API_URL = "https://finance-security-ai-monitor.onrender.com/security/analyze-login"
+LOCAL_URL = "http://127.0.0.1:8000"
+# The hosted demo (interactive use only; don't point load tests at it)
+RENDER_URL = "https://finance-security-ai-monitor.onrender.com"
+ENDPOINT = "/security/analyze-login"
 
 # Colors for Terminal
 GREEN = '\033[92m'
@@ -20,23 +33,53 @@ RESET = '\033[0m'
 
 USERS = ["alice", "bob", "charlie", "diana", "eve_hacker"]
 
-def send_request(user_id, features, sequence, attack_name):
-    payload = {
-        "user_id": user_id,
-        "features": features,
-        "sequence_data": sequence
-    }
-    
+# --- SCENARIOS ---
+# Each returns one login payload; rng keeps load runs reproducible with --seed
+def normal_login(rng):
+    # Feature[0] = 0.1 triggers "Safe" logic
+    return {"user_id": rng.choice(USERS), "features": [0.1, 0.5, 0.5, 0.5],
+            "sequence_data": [[1], [2], [3], [4], [1], [2], [3], [4], [1], [2]]}
+
+def impossible_travel_login(rng):
+    # Feature[0] = 100.0 triggers "Impossible Travel"
+    return {"user_id": f"traveler_{rng.randrange(1000)}", "features": [100.0, 50.0, 10.0, 5.0],
+            "sequence_data": [[1] for _ in range(10)]}
+
+def bot_swarm_login(rng):
+    # Repetitive sequence triggers "Bot" logic
+    return {"user_id": f"bot_{rng.randrange(10000)}", "features": [0.5, 0.5, 0.5, 0.5],
+            "sequence_data": [[1] for _ in range(10)]}
+
+def fraud_ring_login(rng):
+    # Accounts sharing a handful of devices with the known fraudster user_101;
+    # short sequence (3 items) tests padding
+    ring = rng.randrange(5)
+    user_id = "user_101" if rng.random() < 0.2 else f"ring{ring}_member_{rng.randrange(50)}"
+    return {"user_id": user_id, "device": f"ring-device-{ring}", "features": [0.5, 0.5, 0.5, 0.5],
+            "sequence_data": [[1], [2], [3]]}
+
+SCENARIOS = {
+    "normal": ("🟢 Normal Traffic (Valid Users)", normal_login),
+    "impossible_travel": ("🌍 Impossible Travel (Location Spoofing)", impossible_travel_login),
+    "bot_swarm": ("🤖 Bot Swarm (High Frequency)", bot_swarm_login),
+    "fraud_ring": ("🕸️ Fraud Ring (Device Reuse)", fraud_ring_login),
+}
+DEFAULT_MIX = "normal=70,impossible_travel=10,bot_swarm=10,fraud_ring=10"
+
+# --- INTERACTIVE / ONE-SHOT MODE ---
+def send_request(api_url, payload, attack_name):
+    import requests
+    user_id = payload["user_id"]
     try:
         start = time.time()
-        res = requests.post(API_URL, json=payload, timeout=10)
+        res = requests.post(api_url, json=payload, timeout=10)
         latency = round((time.time() - start) * 1000)
-        
+
         if res.status_code == 200:
             data = res.json()
             verdict = data.get("verdict")
             risk = int(data.get("risk_score", 0) * 100)
-            
+
             if verdict == "BLOCK":
                 print(f"{RED}[BLOCKED]{RESET} {attack_name} | Risk: {risk}% | User: {user_id} | {latency}ms")
             elif verdict == "MFA_CHALLENGE":
@@ -45,56 +88,196 @@ def send_request(user_id, features, sequence, attack_name):
                 print(f"{GREEN}[ALLOWED]{RESET} {attack_name} | Risk: {risk}% | User: {user_id} | {latency}ms")
         else:
             print(f"{RED}[ERROR]{RESET} Server Error {res.status_code}: {res.text[:50]}...")
-            
+
     except Exception as e:
         print(f"{RED}[FAIL]{RESET} Connection error: {e}")
 
-def run_simulation():
+def run_scenario(api_url, name, count, interval, rng):
+    label, make_payload = SCENARIOS[name]
+    print(f"\n{YELLOW}>>> {label}{RESET}")
+    for _ in range(count):
+        send_request(api_url, make_payload(rng), name)
+        if interval: time.sleep(interval)
+
+def run_simulation(api_url, rng):
     print(f"\n{YELLOW}🛡️  SECUREWATCH AI - LIVE ATTACK SIMULATOR{RESET}")
-    print(f"Target: {API_URL}")
+    print(f"Target: {api_url}")
     print("------------------------------------------------")
-    
+    # Same bursts as the original menu: 3 normal, 1 traveler, 5 bots, 1 ring login
+    menu = [("normal", 3, 0.5), ("impossible_travel", 1, 0), ("bot_swarm", 5, 0.1), ("fraud_ring", 1, 0)]
+
     while True:
         print("\nSelect Attack Vector:")
-        print("1. 🟢 Normal Traffic (Valid Users)")
-        print("2. 🌍 Impossible Travel (Location Spoofing)")
-        print("3. 🤖 Bot Swarm (High Frequency)")
-        print("4. 🕸️ Fraud Ring (Device Reuse)")
-        print("5. Exit")
-        
-        choice = input("\nExecute Command [1-5]: ").strip()
-        
-        if choice == '1':
-            print(f"\n{GREEN}>>> Generating Legitimate Traffic...{RESET}")
-            for _ in range(3):
-                user = random.choice(USERS)
-                # Feature[0] = 0.1 triggers "Safe" logic
-                send_request(user, [0.1, 0.5, 0.5, 0.5], [[1],[2],[3],[4],[1],[2],[3],[4],[1],[2]], "Normal")
-                time.sleep(0.5)
-
-        elif choice == '2':
-            print(f"\n{YELLOW}>>> Simulating Impossible Travel...{RESET}")
-            # Feature[0] = 100.0 triggers "Impossible Travel"
-            # FIX: Used list comprehension to create [[1], [1]...] instead of [[1, 1...]]
-            seq_data = [[1] for _ in range(10)] 
-            send_request("traveler_joe", [100.0, 50.0, 10.0, 5.0], seq_data, "Geo-Hopping")
-            
-        elif choice == '3':
-            print(f"\n{RED}>>> Launching Bot Swarm...{RESET}")
-            for i in range(5):
-                # Repetitive sequence triggers "Bot" logic
-                bot_seq = [[1] for _ in range(10)]
-                send_request(f"bot_{i}", [0.5, 0.5, 0.5, 0.5], bot_seq, "Bot Script")
-                time.sleep(0.1) 
-                
-        elif choice == '4':
-            print(f"\n{RED}>>> Injecting Fraud Ring Identity...{RESET}")
-            # user_101 triggers "Fraud Ring" logic
-            # Sending short sequence (3 items) to test padding
-            send_request("user_101", [0.5, 0.5, 0.5, 0.5], [[1],[2],[3]], "Blacklisted ID")
-            
-        elif choice == '5':
+        for number, (name, _, _) in enumerate(menu, start=1):
+            print(f"{number}. {SCENARIOS[name][0]}")
+        print(f"{len(menu) + 1}. Exit")
+
+        choice = input(f"\nExecute Command [1-{len(menu) + 1}]: ").strip()
+        if choice == str(len(menu) + 1):
             break
+        if choice.isdigit() and 1 <= int(choice) <= len(menu):
+            run_scenario(api_url, *menu[int(choice) - 1], rng)
+
+# --- LOAD MODE ---
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("mix needs at least one scenario with a positive weight")
+    return mix
+
+def percentile(values, pct):
+    if not values: return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class ScenarioStats:
+    def __init__(self):
+        self.latencies = []
+        self.sent = 0
+        self.errors = Counter()     # "status 503", "timeout", "ConnectError", ...
+        self.verdicts = Counter()
+
+    def summary(self, elapsed):
+        ok = len(self.latencies)
+        failed = sum(self.errors.values())
+        return {
+            "sent": self.sent, "ok": ok, "errors": failed,
+            "error_rate": round(failed / self.sent, 4) if self.sent else 0.0,
+            "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                name: round(value * 1000, 2) if value is not None else None
+                for name, value in (("p50", percentile(self.latencies, 50)), ("p95", percentile(self.latencies, 95)),
+                                    ("p99", percentile(self.latencies, 99)), ("p999", percentile(self.latencies, 99.9)),
+                                    ("max", max(self.latencies) if self.latencies else None))
+            },
+            "verdicts": dict(self.verdicts), "error_kinds": dict(self.errors),
+        }
+
+async def fire(client, api_url, payload, scheduled, stats, timeout):
+    import httpx
+    try:
+        response = await client.post(api_url, json=payload, timeout=timeout)
+        latency = time.perf_counter() - scheduled
+        if response.status_code == 200:
+            stats.latencies.append(latency)
+            stats.verdicts[response.json().get("verdict")] += 1
+        else:
+            stats.errors[f"status {response.status_code}"] += 1
+    except httpx.TimeoutException:
+        stats.errors["timeout"] += 1
+    except httpx.HTTPError as e:
+        stats.errors[type(e).__name__] += 1
+
+async def run_load(args, rng):
+    import httpx
+    api_url = args.url.rstrip("/") + ENDPOINT
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    stats = {name: ScenarioStats() for name in names}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    # Logins that could not even be started because --max-inflight requests were already pending
+    shed = 0
+
+    print(f"🚀 Load test: {args.rate}/s for {args.duration}s against {api_url}")
+    print(f"   mix {', '.join(f'{n}={w:g}' for n, w in args.mix.items())} | {args.concurrency} connections")
+    async with httpx.AsyncClient(limits=limits, http2=False) as client:
+        inflight = set()
+        started = time.perf_counter()
+        next_at = started
+        deadline = started + args.duration
+        while True:
+            next_at += rng.expovariate(args.rate)
+            if next_at >= deadline:
+                break
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name = rng.choices(names, weights)[0]
+            stats[name].sent += 1
+            if len(inflight) >= args.max_inflight:
+                shed += 1
+                stats[name].errors["shed"] += 1
+                continue
+            task = asyncio.create_task(fire(client, api_url, SCENARIOS[name][1](rng), next_at, stats[name], args.timeout))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+        sending_s = time.perf_counter() - started
+        if inflight:
+            await asyncio.wait(inflight)
+        elapsed = time.perf_counter() - started
+
+    total = ScenarioStats()
+    for s in stats.values():
+        total.sent += s.sent
+        total.latencies += s.latencies
+        total.errors.update(s.errors)
+        total.verdicts.update(s.verdicts)
+    return {
+        "config": {
+            "url": api_url, "rate": args.rate, "duration_s": args.duration, "mix": args.mix,
+            "concurrency": args.concurrency, "max_inflight": args.max_inflight, "timeout_s": args.timeout, "seed": args.seed,
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "offered_rps": round(total.sent / sending_s, 2) if sending_s else 0.0,
+        "elapsed_s": round(elapsed, 3), "shed": shed,
+        "overall": total.summary(elapsed),
+        "scenarios": {name: s.summary(elapsed) for name, s in stats.items()},
+    }
+
+def print_report(report):
+    print("\n📊 Results")
+    print(f"   offered {report['offered_rps']}/s over {report['elapsed_s']}s")
+    header = f"   {'scenario':<18}{'sent':>7}{'ok':>7}{'err%':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'p999':>9}"
+    print(header)
+    print("   " + "-" * (len(header) - 3))
+    rows = list(report["scenarios"].items()) + [("overall", report["overall"])]
+    for name, s in rows:
+        lat = s["latency_ms"]
+        cells = "".join(f"{lat[p]:>9.1f}" if lat[p] is not None else f"{'-':>9}" for p in ("p50", "p95", "p99", "p999"))
+        print(f"   {name:<18}{s['sent']:>7}{s['ok']:>7}{s['error_rate'] * 100:>6.1f}%{s['throughput_rps']:>9.1f}{cells}")
+    if report["overall"]["error_kinds"]:
+        print(f"   errors: {report['overall']['error_kinds']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="SecureWatch login simulator and load generator")
+    parser.add_argument("--url", default=LOCAL_URL, help=f"server base URL (hosted demo: {RENDER_URL})")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible runs")
+    parser.add_argument("--mode", choices=SCENARIOS, help="send one scenario --count times and exit")
+    parser.add_argument("--count", type=int, default=5, help="logins sent by --mode")
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between --mode logins")
+
+    load = parser.add_argument_group("load mode")
+    load.add_argument("--load", action="store_true", help="run a headless open-loop load test")
+    load.add_argument("--rate", type=float, default=100, help="mean arrivals per second (Poisson)")
+    load.add_argument("--duration", type=float, default=30, help="seconds of arrivals")
+    load.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"scenario weights (default {DEFAULT_MIX})")
+    load.add_argument("--concurrency", type=int, default=200, help="HTTP connection pool size")
+    load.add_argument("--max-inflight", type=int, default=5000, help="pending logins before new arrivals are shed")
+    load.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    load.add_argument("--json", metavar="PATH", help="write the report as JSON (for regression comparison)")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    if args.load:
+        report = asyncio.run(run_load(args, rng))
+        print_report(report)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"💾 Report written to {args.json}")
+        # Non-zero exit when nothing succeeded, so CI notices a dead server
+        sys.exit(0 if report["overall"]["ok"] else 1)
+    elif args.mode:
+        run_scenario(args.url.rstrip("/") + ENDPOINT, args.mode, args.count, args.interval, rng)
+    else:
+        run_simulation(args.url.rstrip("/") + ENDPOINT, rng)
 
 if __name__ == "__main__":
-    run_simulation()
\ No newline at end of file
+    main()
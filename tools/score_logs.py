@@ -0,0 +1,203 @@
+"""
+Offline batch scorer: runs the production AIEngine models and verdict rules over
+user_logins.csv-style files (CSV or Parquet) without starting the web server.
+
+    python tools/score_logs.py research/data/user_logins.csv scored.parquet --workers 4
+
+The input is streamed in chunks. Two passes are made over it:
+  1. per-(user, device) login counts, so device_trust_score matches preprocess_data
+     (count of the device / total logins of the user over the whole file);
+  2. feature engineering + scoring. The last login of every user is carried over
+     between chunks so time/distance deltas are exact across chunk boundaries.
+Memory therefore grows with the number of users, not with the number of rows.
+Rows of a user must appear in time order (the generated logs are sorted by timestamp).
+
+Network risk comes from backend/ml_artifacts/network_risk_scores.csv
+(NETWORK_RISK_SOURCE=static): the live fraud graph only learns links from API
+traffic, so it is empty here and would score every row 0. Set
+NETWORK_RISK_SOURCE explicitly to override.
+"""
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(ROOT_DIR, "research"))
+
+# Workers never need TensorFlow: the NumPy backend evaluates the same .h5 weights
+os.environ.setdefault("AI_INFERENCE_BACKEND", "numpy")
+# Backtests use the precomputed per-user scores; the fraud graph has no links offline
+os.environ.setdefault("NETWORK_RISK_SOURCE", "static")
+
+from phase1.feature_engine import preprocess_data
+# Same token vocabulary the API's online feature store uses
+from app.services.feature_store import ACTIONS, MAX_SEQ_LENGTH
+
+FEATURES = ['velocity_kmh', 'time_diff_hours', 'device_trust_score', 'hour_of_day']
+RAW_COLUMNS = ['timestamp', 'user_id', 'lat', 'lon', 'device']
+
+# ==========================================
+# INPUT
+# ==========================================
+def read_chunks(path, chunk_size, columns=None):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+
+def count_devices(path, chunk_size):
+    """Pass 1: device_trust_score = logins on (user, device) / logins of user."""
+    counts = None
+    for chunk in read_chunks(path, chunk_size, columns=['user_id', 'device']):
+        part = chunk.groupby(['user_id', 'device']).size()
+        counts = part if counts is None else counts.add(part, fill_value=0)
+    totals = counts.groupby(level='user_id').transform('sum')
+    return (counts / totals).rename('device_trust_score')
+
+# ==========================================
+# FEATURES
+# ==========================================
+def tokenize_sessions(sessions):
+    tokens = np.zeros((len(sessions), MAX_SEQ_LENGTH), dtype=np.int64)
+    raw = []
+    for row, session in enumerate(sessions):
+        seq = [ACTIONS.get(action, 0) for action in str(session).split(',')] if isinstance(session, str) else []
+        raw.append([[t] for t in seq])
+        seq = seq[:MAX_SEQ_LENGTH]
+        tokens[row, :len(seq)] = seq
+    return tokens, raw
+
+def featurize(chunk, carry, device_trust, distance):
+    """Runs preprocess_data on carry-over rows + chunk and returns only the chunk rows."""
+    chunk = chunk.copy()
+    chunk['timestamp'] = pd.to_datetime(chunk['timestamp'])
+    chunk['_row'] = np.arange(len(chunk))
+    frame = pd.concat([carry, chunk], ignore_index=True) if len(carry) else chunk
+    frame = preprocess_data(frame, distance=distance)
+
+    # Device trust comes from the full-file counts of pass 1, not from this window
+    frame = frame.drop(columns=['device_trust_score'])
+    frame = frame.join(device_trust, on=['user_id', 'device'])
+
+    # Each user's latest login is the "previous" row for the next chunk
+    last = frame.groupby('user_id', sort=False).tail(1)[RAW_COLUMNS].assign(_row=-1)
+    carry = pd.concat([carry, last], ignore_index=True).drop_duplicates('user_id', keep='last') if len(carry) else last
+
+    scored = frame[frame['_row'] >= 0].sort_values('_row')
+    return scored, carry
+
+# ==========================================
+# SCORING (worker processes)
+# ==========================================
+engine = None
+
+def init_worker(artifacts_dir):
+    global engine
+    from app.services.ai_engine import AIEngine
+    engine = AIEngine()
+    engine.ARTIFACTS_DIR = artifacts_dir
+    engine.load_models()
+
+def score_chunk(user_ids, features, tokens, sequences):
+    from app.services.risk_engine import assess_risk
+    scores = engine.predict_batch(user_ids, features, tokens)
+    rows = []
+    for user_id, feature_row, sequence, score in zip(user_ids, features.tolist(), sequences, scores):
+        final_risk, reason, verdict = assess_risk(user_id, feature_row, sequence, score)
+        rows.append((score['iso'], score['ae'], score['lstm'], score['network'], round(final_risk, 4), reason, verdict))
+    return pd.DataFrame(rows, columns=['score_iso', 'score_ae', 'score_lstm', 'score_network', 'risk_score', 'reason', 'verdict'])
+
+# ==========================================
+# OUTPUT
+# ==========================================
+class ResultWriter:
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self.writer = None
+        self.rows = 0
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self.writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self.writer = pq.ParquetWriter(self.path, table.schema.remove_metadata())
+            else:
+                # Later chunks are coerced to the first chunk's schema
+                table = pa.Table.from_pandas(df, schema=self.writer.schema, preserve_index=False)
+            self.writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+# ==========================================
+# MAIN
+# ==========================================
+def run(args):
+    started = time.time()
+    print(f"1. Counting devices per user in {args.input}...")
+    device_trust = count_devices(args.input, args.chunk_size)
+    print(f"   {len(device_trust)} (user, device) pairs.")
+
+    print(f"2. Scoring with {args.workers} worker processes (chunks of {args.chunk_size})...")
+    writer = ResultWriter(args.output)
+    carry = pd.DataFrame(columns=RAW_COLUMNS + ['_row'])
+    pending = deque()
+    verdicts = {}
+
+    def drain(block_until):
+        while pending and len(pending) >= block_until:
+            frame, future = pending.popleft()
+            result = pd.concat([frame.reset_index(drop=True), future.result()], axis=1)
+            for verdict, count in result['verdict'].value_counts().items():
+                verdicts[verdict] = verdicts.get(verdict, 0) + int(count)
+            writer.write(result)
+            print(f"   {writer.rows} rows written ({writer.rows / (time.time() - started):.0f} rows/s)")
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(args.artifacts,)) as pool:
+        for chunk in read_chunks(args.input, args.chunk_size):
+            frame, carry = featurize(chunk, carry, device_trust, args.distance)
+            tokens, sequences = tokenize_sessions(
+                frame['session_sequence'] if 'session_sequence' in frame else [None] * len(frame)
+            )
+            future = pool.submit(score_chunk, frame['user_id'].astype(str).tolist(), frame[FEATURES].to_numpy(dtype=float), tokens, sequences)
+            keep = [c for c in frame.columns if c in chunk.columns and c != '_row'] + FEATURES
+            pending.append((frame[keep], future))
+            # Bounded in-flight work keeps memory flat regardless of input size
+            drain(block_until=args.workers * 2)
+        drain(block_until=1)
+    writer.close()
+
+    print(f"\n✅ Scored {writer.rows} logins in {time.time() - started:.1f}s -> {args.output}")
+    for verdict, count in sorted(verdicts.items()):
+        print(f"   {verdict}: {count}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score login logs offline with the SecureWatch AI engine.")
+    parser.add_argument("input", help="CSV or Parquet file with timestamp,user_id,lat,lon,device columns")
+    parser.add_argument("output", help="Destination .parquet or .csv file")
+    parser.add_argument("--chunk-size", type=int, default=200_000, help="Rows per chunk (default: 200000)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Scoring processes (default: CPU count)")
+    parser.add_argument("--distance", choices=["vincenty", "haversine", "geodesic"], default="vincenty",
+                        help="preprocess_data distance mode (default: vincenty, vectorized and geodesic-accurate)")
+    parser.add_argument("--artifacts", default=os.path.join(BACKEND_DIR, "ml_artifacts"), help="Model artifacts directory")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,101 @@
+"""
+WebSocket alert fan-out load test: connects hundreds of simulated dashboards to
+/ws/alerts, fires attack logins at /security/analyze-login and reports how fast
+verdicts come back and how fast alerts reach every dashboard.
+
+    python tools/ws_load_test.py --clients 500 --slow-clients 50 --alerts 100
+
+Slow clients never read from their socket, so the server's per-connection queues
+fill up; verdict latency should not move and fast clients should still receive
+every alert.
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+import requests
+import websockets
+
+# Known fraud ring member: always blocked, always broadcast
+ATTACK = {"user_id": "user_101", "features": [0.5, 0.5, 0.5, 0.5], "sequence_data": [[1], [2], [3]]}
+
+def percentile(values, pct):
+    if not values: return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def fast_client(url, sent_at, received, ready):
+    async with websockets.connect(url, max_size=None) as ws:
+        ready.release()
+        latencies = []
+        try:
+            while True:
+                await ws.recv()
+                index = len(latencies)
+                latencies.append(time.perf_counter() - sent_at[index] if index < len(sent_at) else float("nan"))
+        except (websockets.ConnectionClosed, asyncio.CancelledError):
+            pass
+        finally:
+            received.append(latencies)
+
+async def slow_client(url, ready, stop):
+    # max_queue=1: once one frame is buffered the client stops reading from TCP
+    async with websockets.connect(url, max_queue=1) as ws:
+        ready.release()
+        await stop.wait()
+
+def fire_alert(api_url):
+    start = time.perf_counter()
+    response = requests.post(f"{api_url}/security/analyze-login", json=ATTACK, timeout=30)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+async def run(args):
+    ws_url = args.url.replace("http", "ws", 1) + "/ws/alerts"
+    sent_at, received = [], []
+    ready, stop = asyncio.Semaphore(0), asyncio.Event()
+
+    print(f"🔌 Connecting {args.clients} dashboards ({args.slow_clients} slow) to {ws_url}...")
+    tasks = [asyncio.create_task(fast_client(ws_url, sent_at, received, ready)) for _ in range(args.clients - args.slow_clients)]
+    tasks += [asyncio.create_task(slow_client(ws_url, ready, stop)) for _ in range(args.slow_clients)]
+    for _ in tasks: await ready.acquire()
+
+    print(f"🚨 Firing {args.alerts} attack logins...")
+    verdict_latencies = []
+    for _ in range(args.alerts):
+        sent_at.append(time.perf_counter())
+        verdict_latencies.append(await asyncio.to_thread(fire_alert, args.url))
+        if args.interval: await asyncio.sleep(args.interval)
+
+    await asyncio.sleep(args.drain)
+    stop.set()
+    for task in tasks: task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    delivery = [latency for client in received for latency in client]
+    complete = sum(1 for client in received if len(client) >= args.alerts)
+    print("\n📊 Results")
+    print(f"   verdict latency   p50 {percentile(verdict_latencies, 50) * 1000:7.1f}ms | p99 {percentile(verdict_latencies, 99) * 1000:7.1f}ms")
+    print(f"   alert delivery    p50 {percentile(delivery, 50) * 1000:7.1f}ms | p99 {percentile(delivery, 99) * 1000:7.1f}ms")
+    print(f"   fast clients with every alert: {complete}/{len(received)} "
+          f"(mean {statistics.mean(len(c) for c in received) if received else 0:.1f} alerts each)")
+    try:
+        print(f"   server fan-out stats: {requests.get(f'{args.url}/engine/stats', timeout=5).json().get('alerts')}")
+    except requests.RequestException:
+        pass
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the /ws/alerts fan-out.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Backend base URL")
+    parser.add_argument("--clients", type=int, default=300, help="Total dashboard connections")
+    parser.add_argument("--slow-clients", type=int, default=30, help="Connections that never read")
+    parser.add_argument("--alerts", type=int, default=50, help="Attack logins to send")
+    parser.add_argument("--interval", type=float, default=0.0, help="Seconds between attack logins")
+    parser.add_argument("--drain", type=float, default=2.0, help="Seconds to wait for deliveries after the last alert")
+    args = parser.parse_args(argv)
+    args.slow_clients = min(args.slow_clients, args.clients)
+    return args
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))